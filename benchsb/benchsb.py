@@ -6,16 +6,217 @@ import re
 import time
 from datetime import datetime
 import csv
+import hashlib
+import json
 import math
 import logging
+import random
+import shutil
+import sqlite3
+import statistics
+import threading
+import uuid
 
 # Global logger instance
 logger = logging.getLogger(__name__)
 
+# Databend execution backend: "cli" forks bendsql per statement,
+# "driver" keeps one databend-driver session per thread for the whole run
+bend_backend = "cli"
 
-def get_bendsql_warehouse_from_env():
-    """Retrieve warehouse name from the environment variable."""
-    dsn = os.environ.get("BENDSQL_DSN", "")
+# Per-thread BENDSQL_DSN override, set by the workers of a sharded run
+bendsql_dsn_local = threading.local()
+
+# Estimated client setup time per statement of the CLI backends, keyed by target;
+# each target is measured under its own lock so shards do not wait on each other
+client_setup_times = {}
+client_setup_time_locks = {}
+client_setup_times_lock = threading.Lock()
+
+# Per-thread databend-driver connections, keyed by database
+driver_local = threading.local()
+driver_connections = []
+driver_connections_lock = threading.Lock()
+driver_stats_warning_logged = False
+# Lookups of a driver query's server time in system.query_log, and the pause between them
+DRIVER_QUERY_LOG_ATTEMPTS = 5
+DRIVER_QUERY_LOG_RETRY_INTERVAL = 0.2
+
+# Snowflake execution backend: "cli" runs one snowsql -q process per statement,
+# "session" feeds statements to long-lived interactive snowsql processes
+snow_backend = "cli"
+
+# Per-thread snowsql sessions, keyed by (database, warehouse)
+snowsql_local = threading.local()
+snowsql_sessions = []
+snowsql_sessions_lock = threading.Lock()
+
+# Printed after every statement to delimit its output in a snowsql session
+SNOWSQL_SENTINEL = "__BENCHSB_STATEMENT_DONE__"
+
+# Run-wide per-query timeout in seconds (None disables it) and per-query
+# overrides keyed by query number, set from --query-timeout(-override)
+query_timeout = None
+query_timeout_overrides = {}
+
+# Live progress exporter set from --metrics-port/--metrics-file, None when disabled
+metrics_exporter = None
+
+# Finished queries the rolling latency quantiles of the exporter are taken over
+METRICS_ROLLING_WINDOW = 10
+
+# Extra seconds a CLI client may take to return after its query was
+# cancelled on the server before the client process itself is killed
+QUERY_CANCEL_GRACE = 30
+
+# Server metrics read from Databend's system.query_log for every timed query
+QUERY_LOG_METRICS = (
+    "scan_rows", "scan_bytes", "scan_partitions", "result_rows", "result_bytes",
+    "peak_memory", "spill_bytes", "cpu_usage",
+)
+
+# Concurrent EXPLAIN statements of the plan capture pass
+EXPLAIN_PARALLELISM = 4
+
+# Result formats of the fetch case per client; the databend-driver backend
+# always fetches through the driver's own transport
+FETCH_FORMATS = {"bendsql": ["tsv", "csv"], "snowsql": ["tsv", "csv"]}
+FETCH_CHUNK_SIZE = 1 << 20
+# Seconds between RSS samples while the driver fetches a result in-process
+FETCH_RSS_SAMPLE_INTERVAL = 0.01
+
+# File formats of the ingest case and the compression each is staged with when
+# a variant names none; Parquet compresses its pages, the others whole files
+INGEST_FORMATS = {"csv": "none", "parquet": "snappy", "ndjson": "none"}
+INGEST_COMPRESSIONS = ("none", "gzip", "zstd", "snappy")
+INGEST_REFERENCE_FILE_SIZE = 256 * 1024 * 1024
+# Bounds of the unload MAX_FILE_SIZE per engine; Snowflake caps it at 5 GB
+# (and defaults SINGLE = TRUE unloads to 16 MB), Databend has no cap
+INGEST_MIN_FILE_SIZE = 1024 * 1024
+INGEST_MAX_FILE_SIZE = {"snowsql": 5 * 1024 * 1024 * 1024, "bendsql": None}
+
+# TPC-H generator domains (TPC-H specification, clause 4.2). Columns are in
+# setup.sql order, so CSV parts load positionally; kinds map to Parquet types.
+TPCH_SCHEMA = {
+    "region": [("r_regionkey", "int"), ("r_name", "str"), ("r_comment", "str")],
+    "nation": [("n_nationkey", "int"), ("n_name", "str"), ("n_regionkey", "int"), ("n_comment", "str")],
+    "supplier": [
+        ("s_suppkey", "bigint"), ("s_name", "str"), ("s_address", "str"), ("s_nationkey", "int"),
+        ("s_phone", "str"), ("s_acctbal", "decimal"), ("s_comment", "str"),
+    ],
+    "customer": [
+        ("c_custkey", "bigint"), ("c_name", "str"), ("c_address", "str"), ("c_nationkey", "int"),
+        ("c_phone", "str"), ("c_acctbal", "decimal"), ("c_mktsegment", "str"), ("c_comment", "str"),
+    ],
+    "part": [
+        ("p_partkey", "bigint"), ("p_name", "str"), ("p_mfgr", "str"), ("p_brand", "str"), ("p_type", "str"),
+        ("p_size", "int"), ("p_container", "str"), ("p_retailprice", "decimal"), ("p_comment", "str"),
+    ],
+    "partsupp": [
+        ("ps_partkey", "bigint"), ("ps_suppkey", "bigint"), ("ps_availqty", "bigint"),
+        ("ps_supplycost", "decimal"), ("ps_comment", "str"),
+    ],
+    "orders": [
+        ("o_orderkey", "bigint"), ("o_custkey", "bigint"), ("o_orderstatus", "str"), ("o_totalprice", "decimal"),
+        ("o_orderdate", "date"), ("o_orderpriority", "str"), ("o_clerk", "str"), ("o_shippriority", "int"),
+        ("o_comment", "str"),
+    ],
+    "lineitem": [
+        ("l_orderkey", "bigint"), ("l_partkey", "bigint"), ("l_suppkey", "bigint"), ("l_linenumber", "bigint"),
+        ("l_quantity", "decimal"), ("l_extendedprice", "decimal"), ("l_discount", "decimal"), ("l_tax", "decimal"),
+        ("l_returnflag", "str"), ("l_linestatus", "str"), ("l_shipdate", "date"), ("l_commitdate", "date"),
+        ("l_receiptdate", "date"), ("l_shipinstruct", "str"), ("l_shipmode", "str"), ("l_comment", "str"),
+    ],
+}
+TPCH_BASE_ROWS = {"supplier": 10000, "customer": 150000, "part": 200000, "orders": 1500000}
+TPCH_REGIONS = ["AFRICA", "AMERICA", "ASIA", "EUROPE", "MIDDLE EAST"]
+TPCH_NATIONS = [
+    ("ALGERIA", 0), ("ARGENTINA", 1), ("BRAZIL", 1), ("CANADA", 1), ("EGYPT", 4), ("ETHIOPIA", 0),
+    ("FRANCE", 3), ("GERMANY", 3), ("INDIA", 2), ("INDONESIA", 2), ("IRAN", 4), ("IRAQ", 4), ("JAPAN", 2),
+    ("JORDAN", 4), ("KENYA", 0), ("MOROCCO", 0), ("MOZAMBIQUE", 0), ("PERU", 1), ("CHINA", 2), ("ROMANIA", 3),
+    ("SAUDI ARABIA", 4), ("VIETNAM", 2), ("RUSSIA", 3), ("UNITED KINGDOM", 3), ("UNITED STATES", 1),
+]
+TPCH_COLORS = (
+    "almond antique aquamarine azure beige bisque black blanched blue blush brown burlywood burnished "
+    "chartreuse chiffon chocolate coral cornflower cornsilk cream cyan dark deep dim dodger drab firebrick "
+    "floral forest frosted gainsboro ghost goldenrod green grey honeydew hot indian ivory khaki lace lavender "
+    "lawn lemon light lime linen magenta maroon medium metallic midnight mint misty moccasin navajo navy olive "
+    "orange orchid pale papaya peach peru pink plum powder puff purple red rose rosy royal saddle salmon sandy "
+    "seashell sienna sky slate smoke snow spring steel tan thistle tomato turquoise violet wheat white yellow"
+).split()
+TPCH_TYPES = (
+    ["STANDARD", "SMALL", "MEDIUM", "LARGE", "ECONOMY", "PROMO"],
+    ["ANODIZED", "BURNISHED", "PLATED", "POLISHED", "BRUSHED"],
+    ["TIN", "NICKEL", "BRASS", "STEEL", "COPPER"],
+)
+TPCH_CONTAINERS = (["SM", "LG", "MED", "JUMBO", "WRAP"], ["CASE", "BOX", "BAG", "JAR", "PKG", "PACK", "CAN", "DRUM"])
+TPCH_SEGMENTS = ["AUTOMOBILE", "BUILDING", "FURNITURE", "MACHINERY", "HOUSEHOLD"]
+TPCH_PRIORITIES = ["1-URGENT", "2-HIGH", "3-MEDIUM", "4-NOT SPECIFIED", "5-LOW"]
+TPCH_INSTRUCTIONS = ["DELIVER IN PERSON", "COLLECT COD", "NONE", "TAKE BACK RETURN"]
+TPCH_SHIPMODES = ["REG AIR", "AIR", "RAIL", "SHIP", "TRUCK", "MAIL", "FOB"]
+# Order dates run from STARTDATE to ENDDATE - 151 days; CURRENTDATE splits
+# shipped (F) from open (O) line items
+TPCH_START_DATE = "1992-01-01"
+TPCH_END_DATE = "1998-12-31"
+TPCH_CURRENT_DATE = "1995-06-17"
+# Word lists of the comment text grammar (clause 4.2.2.13)
+TPCH_GRAMMAR = {
+    "noun": "foxes ideas theodolites pinto_beans instructions dependencies excuses platelets asymptotes courts dolphins multipliers sauternes warthogs frets dinos attainments somas Tiresias patterns forges braids hockey_players frays warhorses dugouts notornis epitaphs pearls tithes waters orbits gifts sheaves depths sentiments decoys realms pains grouches escapades",
+    "verb": "sleep wake are cajole haggle nag use boost affix detect integrate maintain nod was lose sublate solve thrash promise engage hinder print x-ray breach eat grow impress mold poach serve run dazzle snooze doze unwind kindle play hang believe doubt",
+    "adjective": "furious sly careful blithe quick fluffy slow quiet ruthless thin close dogged daring brave stealthy permanent enticing idle busy regular final ironic even bold silent",
+    "adverb": "sometimes always never furiously slyly carefully blithely quickly fluffily slowly quietly ruthlessly thinly closely doggedly daringly bravely stealthily permanently enticingly idly busily regularly finally ironically evenly boldly silently",
+    "preposition": "about above according_to across after against along alongside_of among around at atop before behind beneath beside besides between beyond by despite during except for from in_place_of inside instead_of into near of on outside over past since through throughout to toward under until up upon without with within",
+    "auxiliary": "do may might shall will would can could should ought_to must will_have_to shall_have_to could_have_to should_have_to must_have_to need_to try_to",
+    "terminator": ". ; : ? ! --",
+}
+TPCH_TEXT_POOL_SIZE = 4 * 1024 * 1024
+
+# Samples a query needs on each side of a baseline comparison for a verdict;
+# with fewer the bootstrap interval collapses onto the ratio itself
+MIN_COMPARISON_SAMPLES = 3
+
+# Scaling exponent above which a query is flagged as scaling super-linearly
+SUPERLINEAR_EXPONENT = 1.1
+
+# Relative compute of warehouse sizes; each size doubles the nodes of the
+# previous one on both Snowflake and Databend Cloud
+WAREHOUSE_SIZE_NODES = {
+    "XSMALL": 1, "SMALL": 2, "MEDIUM": 4, "LARGE": 8, "XLARGE": 16,
+    "2XLARGE": 32, "3XLARGE": 64, "4XLARGE": 128, "5XLARGE": 256, "6XLARGE": 512,
+}
+
+# Parallel efficiency below which a query (or the suite) stops scaling with size
+SIZE_SWEEP_MIN_EFFICIENCY = 0.75
+
+# Seconds to wait for a warehouse to suspend or to serve queries, and the polling interval
+WAREHOUSE_READY_TIMEOUT = 600
+WAREHOUSE_POLL_INTERVAL = 1.0
+WAREHOUSE_STATES = ("SUSPENDED", "SUSPENDING", "RESUMING", "STARTING", "STARTED", "RUNNING")
+
+# TPC-H query stream permutations (TPC-H specification, Appendix A). Stream 0
+# is the power test order, streams 1..N run concurrently in the throughput
+# test. The first 11 streams cover the minimum stream count up to SF10000.
+TPCH_STREAM_PERMUTATIONS = [
+    [14, 2, 9, 20, 6, 17, 18, 8, 21, 13, 3, 22, 16, 4, 11, 15, 1, 10, 19, 5, 7, 12],
+    [21, 3, 18, 5, 11, 7, 6, 20, 17, 12, 16, 15, 13, 10, 2, 8, 14, 19, 9, 22, 1, 4],
+    [6, 17, 14, 16, 19, 10, 9, 2, 15, 8, 5, 22, 12, 7, 13, 18, 1, 4, 20, 3, 11, 21],
+    [8, 5, 4, 6, 17, 7, 1, 18, 22, 14, 9, 10, 15, 11, 20, 2, 21, 19, 13, 16, 12, 3],
+    [5, 21, 14, 19, 15, 17, 12, 6, 4, 9, 8, 16, 11, 2, 10, 18, 1, 13, 7, 22, 3, 20],
+    [21, 15, 4, 6, 7, 16, 19, 18, 14, 22, 11, 13, 3, 1, 2, 5, 8, 20, 12, 17, 10, 9],
+    [10, 3, 15, 13, 6, 8, 9, 7, 4, 11, 22, 18, 12, 1, 5, 16, 2, 14, 19, 20, 17, 21],
+    [18, 8, 20, 21, 2, 4, 22, 17, 1, 11, 9, 19, 3, 13, 5, 7, 10, 16, 6, 14, 15, 12],
+    [19, 1, 15, 17, 5, 8, 9, 12, 14, 7, 4, 3, 20, 16, 6, 22, 10, 13, 2, 21, 18, 11],
+    [8, 13, 2, 20, 17, 3, 6, 21, 18, 11, 19, 10, 15, 4, 22, 1, 7, 12, 9, 14, 5, 16],
+    [6, 15, 18, 17, 12, 1, 7, 2, 22, 13, 21, 10, 14, 9, 3, 16, 20, 19, 11, 4, 8, 5],
+]
+
+# Marks a TPC metric that departs from the spec and cannot be compared with audited results
+NON_COMPLIANT_METRIC = "non-compliant/indicative"
+
+
+def get_bendsql_warehouse_from_env(dsn=None):
+    """Retrieve warehouse name from a DSN, by default the BENDSQL_DSN environment variable."""
+    dsn = dsn or os.environ.get("BENDSQL_DSN", "")
 
     # Try to match the first format
     match = re.search(r"--([\w-]+)\.gw", dsn)
@@ -30,7 +231,58 @@ def get_bendsql_warehouse_from_env():
     raise ValueError("Could not extract warehouse name from BENDSQL_DSN.")
 
 
-def execute_snowsql(query, database, warehouse):
+def run_client_process(command, timeout=None, timing=None):
+    """Run a SQL client process and return (returncode, stdout, stderr).
+
+    The process is killed after timeout seconds (subprocess.TimeoutExpired).
+    A timing dict is filled with first_byte, the time from spawn to the
+    first byte of output, fetch, the time from there to the end of output,
+    and bytes, the size of the output.
+    """
+    import tempfile
+
+    killed = threading.Event()
+
+    def kill():
+        killed.set()
+        process.kill()
+
+    # stderr goes to a file so a chatty client cannot block on a full pipe
+    with tempfile.TemporaryFile(mode="w+") as stderr_file:
+        start_time = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file, text=True)
+        killer = threading.Timer(timeout, kill) if timeout else None
+        if killer:
+            killer.daemon = True
+            killer.start()
+        try:
+            stdout = process.stdout.read(1)
+            first_byte_time = time.perf_counter()
+            stdout += process.stdout.read()
+            returncode = process.wait()
+        finally:
+            if killer:
+                killer.cancel()
+        end_time = time.perf_counter()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+
+    if killed.is_set():
+        raise subprocess.TimeoutExpired(command, timeout)
+    if timing is not None:
+        timing["first_byte"] = first_byte_time - start_time
+        timing["fetch"] = end_time - first_byte_time
+        timing["bytes"] = len(stdout.encode())
+    return returncode, stdout, stderr
+
+
+def extract_snowsql_rows(output):
+    """Extract the number of rows a snowsql statement returned, or None."""
+    match = re.search(r"(\d+) Row\(s\) produced", output)
+    return int(match.group(1)) if match else None
+
+
+def execute_snowsql(query, database, warehouse, timeout=None, timing=None):
     """Execute an SQL query using snowsql."""
     command = [
         "snowsql",
@@ -40,15 +292,134 @@ def execute_snowsql(query, database, warehouse):
         "PUBLIC",
         "--dbname",
         database,
+        # No banner or progress bar on stdout, only the result and its timing
+        "-o", "friendly=false",
+        "-o", "progress_bar=false",
+        "-o", "timing=true",
         "-q",
         query,
     ]
 
     try:
-        result = subprocess.run(command, text=True, capture_output=True, check=True)
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"snowsql command failed: {e.stderr}")
+        returncode, stdout, stderr = run_client_process(command, timeout, timing)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"snowsql command killed after {timeout:.0f}s")
+    if returncode != 0:
+        raise RuntimeError(f"snowsql command failed: {stderr}")
+    if timing is not None:
+        timing["rows"] = extract_snowsql_rows(stdout)
+    return stdout
+
+
+class SnowsqlSession:
+    """A long-lived interactive snowsql process fed statements over stdin."""
+
+    def __init__(self, database, warehouse):
+        command = [
+            "snowsql",
+            "--warehouse",
+            warehouse,
+            "--schemaname",
+            "PUBLIC",
+            "--dbname",
+            database,
+            "-o", "friendly=false",
+            "-o", "echo=false",
+            "-o", "timing=true",
+            "-o", "progress_bar=false",
+            "-o", "exit_on_error=false",
+        ]
+        # snowsql is a Python application, keep its stdout unbuffered so the
+        # sentinel arrives as soon as the statement finishes
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+
+        start_time = time.time()
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=env,
+        )
+        # The first statement pays for config parsing, login and warehouse setup
+        self.execute("SELECT 1;")
+        self.login_time = time.time() - start_time
+        logger.info(f"🔌 Opened snowsql session for '{database}' on {warehouse}. Login time: {self.login_time:.2f}s")
+
+    def execute(self, query, timing=None):
+        """Run one statement and return its output up to the sentinel.
+
+        A timing dict is filled like run_client_process does, from submit on.
+        """
+        statement = query.strip().rstrip(";")
+        start_time = time.perf_counter()
+        self.process.stdin.write(f"{statement};\n!print {SNOWSQL_SENTINEL}\n")
+        self.process.stdin.flush()
+
+        lines = []
+        first_byte_time = None
+        while True:
+            line = self.process.stdout.readline()
+            if first_byte_time is None:
+                first_byte_time = time.perf_counter()
+            if not line:
+                raise RuntimeError(f"snowsql session exited unexpectedly: {''.join(lines)}")
+            if SNOWSQL_SENTINEL in line:
+                break
+            lines.append(line)
+        end_time = time.perf_counter()
+
+        output = "".join(lines)
+        if timing is not None:
+            timing["first_byte"] = first_byte_time - start_time
+            timing["fetch"] = end_time - first_byte_time
+            timing["bytes"] = len(output.encode())
+            timing["rows"] = extract_snowsql_rows(output)
+        # Snowflake errors are printed as "<6-digit code> (<sqlstate>): <message>"
+        if re.search(r"^\d{6} \(\w+\):", output, re.MULTILINE):
+            raise RuntimeError(f"snowsql command failed: {output}")
+        return output
+
+    def close(self):
+        """Exit the snowsql process, killing it if it does not exit in time."""
+        try:
+            self.process.stdin.write("!exit\n")
+            self.process.stdin.flush()
+            self.process.wait(timeout=10)
+        except Exception:
+            self.process.kill()
+
+
+def get_snowsql_session(database, warehouse):
+    """Return this thread's snowsql session for a database and warehouse."""
+    sessions = getattr(snowsql_local, "sessions", None)
+    if sessions is None:
+        sessions = snowsql_local.sessions = {}
+
+    key = (database, warehouse)
+    if key not in sessions:
+        session = SnowsqlSession(database, warehouse)
+        sessions[key] = session
+        with snowsql_sessions_lock:
+            snowsql_sessions.append(session)
+
+    return sessions[key]
+
+
+def get_snowsql_login_time():
+    """Return the total login time paid by all snowsql sessions and their count."""
+    with snowsql_sessions_lock:
+        return sum(session.login_time for session in snowsql_sessions), len(snowsql_sessions)
+
+
+def close_snowsql_sessions():
+    """Close every snowsql session opened during the run."""
+    with snowsql_sessions_lock:
+        for session in snowsql_sessions:
+            session.close()
+        snowsql_sessions.clear()
 
 
 def extract_snowsql_time(output):
@@ -57,7 +428,7 @@ def extract_snowsql_time(output):
     return match.group(1) if match else None
 
 
-def execute_bendsql(query, database, get_data=False):
+def execute_bendsql(query, database, get_data=False, timeout=None, timing=None):
     """Execute an SQL query using bendsql."""
     if get_data:
         # For data queries, don't use --time=server to get actual results
@@ -65,19 +436,32 @@ def execute_bendsql(query, database, get_data=False):
     else:
         # For performance queries, use --time=server
         command = ["bendsql", "--query=" + query, "--database=" + database, "--time=server"]
+    dsn = getattr(bendsql_dsn_local, "dsn", None)
+    if dsn:
+        command.append("--dsn=" + dsn)
     
-    result = subprocess.run(command, text=True, capture_output=True)
+    try:
+        returncode, stdout, stderr = run_client_process(command, timeout, timing)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"bendsql command killed after {timeout:.0f}s")
 
-    if "APIError: ResponseError" in result.stderr:
+    if "APIError: ResponseError" in stderr:
         raise RuntimeError(
-            f"'APIError: ResponseError' found in bendsql output: {result.stderr}"
+            f"'APIError: ResponseError' found in bendsql output: {stderr}"
         )
-    elif result.returncode != 0:
+    elif returncode != 0:
         raise RuntimeError(
-            f"bendsql command failed with return code {result.returncode}: {result.stderr}"
+            f"bendsql command failed with return code {returncode}: {stderr}"
         )
 
-    return result.stdout
+    if timing is not None and not get_data:
+        # --time=server prints only the elapsed time once the query is done, so
+        # first byte and fetch cannot be told apart; the result size comes from
+        # system.query_log
+        timing["fetch"] = None
+        timing["rows"] = None
+        timing["bytes"] = None
+    return stdout
 
 
 def extract_bendsql_time(output):
@@ -86,16 +470,280 @@ def extract_bendsql_time(output):
     return match.group(1) if match else None
 
 
-def execute_sql(query, sql_tool, database, warehouse=None):
-    """General function to execute a SQL query using the specified tool."""
+def open_driver_connection(database):
+    """Open a new databend-driver session on BENDSQL_DSN using a database."""
+    try:
+        from databend_driver import BlockingDatabendClient
+    except ImportError:
+        raise RuntimeError(
+            "databend-driver is not installed, run 'pip install databend-driver' or use --backend cli"
+        )
+
+    dsn = getattr(bendsql_dsn_local, "dsn", None) or os.environ.get("BENDSQL_DSN", "")
+    if not dsn:
+        raise RuntimeError("BENDSQL_DSN must be set to use --backend driver")
+
+    conn = BlockingDatabendClient(dsn).get_conn()
+    conn.exec(f"USE {database}")
+    return conn
+
+
+def get_driver_connection(database):
+    """Return this thread's authenticated databend-driver session for a database."""
+    connections = getattr(driver_local, "connections", None)
+    if connections is None:
+        connections = driver_local.connections = {}
+
+    if database not in connections:
+        start_time = time.time()
+        conn = open_driver_connection(database)
+        logger.info(f"🔌 Opened databend-driver session for '{database}'. Time: {time.time() - start_time:.2f}s")
+
+        connections[database] = conn
+        with driver_connections_lock:
+            driver_connections.append(conn)
+
+    return connections[database]
+
+
+def close_driver_connections():
+    """Close every databend-driver session opened during the run."""
+    with driver_connections_lock:
+        for conn in driver_connections:
+            close = getattr(conn, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception as e:
+                    logger.warning(f"Failed to close databend-driver session: {e}")
+        driver_connections.clear()
+
+
+def get_driver_server_time(conn, query_id):
+    """Return the server duration in seconds of a finished query from system.query_log, or None.
+
+    Finished queries reach the query log shortly after they return, so the
+    lookup is retried a few times.
+    """
+    if not query_id:
+        return None
+    lookup = f"SELECT query_duration_ms FROM system.query_log WHERE query_id = '{query_id}' AND log_type_name = 'Finish'"
+    for attempt in range(DRIVER_QUERY_LOG_ATTEMPTS):
+        for row in conn.query_iter(lookup):
+            duration_ms = row.values()[0]
+            if duration_ms is not None:
+                return float(duration_ms) / 1000.0
+        time.sleep(DRIVER_QUERY_LOG_RETRY_INTERVAL)
+    return None
+
+
+def execute_bend_driver(query, database, get_data=False, timing=None):
+    """Execute an SQL query over a persistent databend-driver session.
+
+    Returns a tuple of (rows, server_time). rows is only collected when
+    get_data is set; server_time is the query's duration in system.query_log,
+    found by the session's last query id, and None when it cannot be read.
+    Client time is never passed off as server time, it is in the timing dict,
+    which is filled like run_client_process does, from submit on, with the
+    number of rows returned.
+    """
+    global driver_stats_warning_logged
+
+    conn = get_driver_connection(database)
+    rows = [] if get_data else None
+    row_count = 0
+
+    start_time = time.perf_counter()
+    first_byte_time = None
+    try:
+        for row in conn.query_iter(query):
+            if first_byte_time is None:
+                first_byte_time = time.perf_counter()
+            row_count += 1
+            if get_data:
+                rows.append(row.values())
+    except Exception as e:
+        raise RuntimeError(f"databend-driver query failed: {e}")
+    end_time = time.perf_counter()
+    if timing is not None:
+        first_byte_time = first_byte_time or end_time
+        timing["first_byte"] = first_byte_time - start_time
+        timing["fetch"] = end_time - first_byte_time
+        timing["rows"] = row_count
+        # Values are not decoded for timed queries, the size comes from system.query_log
+        timing["bytes"] = None
+    if get_data:
+        return rows, None
+
+    try:
+        last_query_id = getattr(conn, "last_query_id", None)
+        server_time = get_driver_server_time(conn, last_query_id() if last_query_id else None)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read the server time from system.query_log: {e}")
+        server_time = None
+    if server_time is None and not driver_stats_warning_logged:
+        logger.warning("⚠️ No server time for a databend-driver query (no last_query_id or system.query_log entry), it is recorded without one")
+        driver_stats_warning_logged = True
+    return rows, server_time
+
+
+def execute_sql(query, sql_tool, database, warehouse=None, timeout=None, timing=None):
+    """General function to execute a SQL query using the specified tool.
+
+    timeout only bounds the CLI backends, which can kill their client process.
+    A timing dict is filled with the client-side breakdown of the statement.
+    """
     if sql_tool == "snowsql":
-        return execute_snowsql(query, database, warehouse)
+        if snow_backend == "session":
+            return get_snowsql_session(database, warehouse).execute(query, timing)
+        return execute_snowsql(query, database, warehouse, timeout=timeout, timing=timing)
     elif sql_tool == "bendsql":
-        return execute_bendsql(query, database)
+        if bend_backend == "driver":
+            rows, _ = execute_bend_driver(query, database, get_data=True, timing=timing)
+            return "\n".join("\t".join(str(value) for value in row) for row in rows)
+        return execute_bendsql(query, database, timeout=timeout, timing=timing)
     else:
         raise ValueError(f"Unsupported SQL tool: {sql_tool}")
 
 
+class QueryTimeoutError(RuntimeError):
+    """A query exceeded its timeout and was cancelled on the server."""
+
+
+def parse_query_timeout_override(value):
+    """argparse type for QUERY=SECONDS, returns (query number, seconds or None)."""
+    match = re.fullmatch(r"\s*(\d+)\s*=\s*([0-9.]+)\s*", value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid override '{value}', expected QUERY=SECONDS")
+    return int(match.group(1)), float(match.group(2)) or None
+
+
+def get_query_timeout(query_index):
+    """Return the timeout in seconds for a query number, or None for no timeout."""
+    return query_timeout_overrides.get(query_index, query_timeout)
+
+
+def cancel_query(tag, sql_tool, database, warehouse):
+    """Cancel the running query whose text carries the benchsb tag on the server.
+
+    The lookup builds the tag with CONCAT so it never matches its own text.
+    Runs on fresh connections, the query's own session is still blocked on it.
+    """
+    if sql_tool == "snowsql":
+        lookup = (
+            "SELECT query_id FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_WAREHOUSE("
+            f"WAREHOUSE_NAME => '{warehouse}', RESULT_LIMIT => 1000)) "
+            "WHERE execution_status IN ('RUNNING', 'QUEUED', 'RESUMING_WAREHOUSE', 'BLOCKED') "
+            f"AND query_text LIKE CONCAT('%benchsb:', '{tag}', '%');"
+        )
+        cancel = "SELECT SYSTEM$CANCEL_QUERY('{}');"
+
+        def run(sql):
+            return execute_snowsql(sql, database, warehouse)
+    else:
+        lookup = f"SELECT id FROM system.processes WHERE extra_info LIKE CONCAT('%benchsb:', '{tag}', '%');"
+        cancel = "KILL QUERY '{}';"
+        if bend_backend == "driver":
+            def run(sql):
+                conn = open_driver_connection(database)
+                try:
+                    return "\n".join("\t".join(str(value) for value in row.values()) for row in conn.query_iter(sql))
+                finally:
+                    close = getattr(conn, "close", None)
+                    if close:
+                        close()
+        else:
+            def run(sql):
+                return execute_bendsql(sql, database, get_data=True)
+
+    # Query ids of both engines are dashed UUIDs, the tag is undashed
+    query_ids = []
+    for _ in range(3):
+        query_ids = re.findall(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", run(lookup), re.IGNORECASE)
+        if query_ids:
+            break
+        # The query may not be registered yet
+        time.sleep(WAREHOUSE_POLL_INTERVAL)
+
+    if not query_ids:
+        logger.warning(f"⚠️ Could not find the running query tagged {tag} to cancel")
+        return []
+
+    for query_id in query_ids:
+        run(cancel.format(query_id))
+        logger.info(f"🛑 Cancelled query {query_id} on {sql_tool}")
+    return query_ids
+
+
+def execute_timed_sql(query, sql_tool, database, warehouse=None, timeout=None, tag=None, timing=None):
+    """Execute an SQL query and return its server execution time in seconds, or None.
+
+    A tag is put in a leading /* benchsb:<tag> */ comment so the query can be
+    found on the server. With a timeout the query is always tagged and a
+    watchdog cancels it on the server once the timeout expires, raising
+    QueryTimeoutError. A timing dict is filled with the client-side breakdown.
+    """
+    timer = None
+    timed_out = threading.Event()
+    client_timeout = None
+    if timeout or tag:
+        tag = tag or uuid.uuid4().hex
+        query = f"/* benchsb:{tag} */ {query}"
+    if timeout:
+        # CLI clients are killed if they do not return once the query is cancelled
+        client_timeout = timeout + QUERY_CANCEL_GRACE
+        # The watchdog thread must cancel on the warehouse this thread runs on
+        dsn = getattr(bendsql_dsn_local, "dsn", None)
+
+        def watchdog():
+            bendsql_dsn_local.dsn = dsn
+            timed_out.set()
+            logger.warning(f"⏰ Query exceeded its {timeout:.0f}s timeout, cancelling it on the server")
+            try:
+                cancel_query(tag, sql_tool, database, warehouse)
+            except Exception as e:
+                logger.error(f"Failed to cancel query tagged {tag}: {e}")
+
+        timer = threading.Timer(timeout, watchdog)
+        timer.daemon = True
+        timer.start()
+
+    try:
+        if sql_tool == "bendsql" and bend_backend == "driver":
+            _, server_time = execute_bend_driver(query, database, timing=timing)
+        else:
+            output = execute_sql(query, sql_tool, database, warehouse, client_timeout, timing)
+            if sql_tool == "snowsql":
+                time_elapsed = extract_snowsql_time(output)
+            else:
+                time_elapsed = extract_bendsql_time(output)
+            server_time = float(time_elapsed) if time_elapsed else None
+    except Exception as e:
+        if timed_out.is_set():
+            raise QueryTimeoutError(f"TIMEOUT after {timeout:.0f}s") from e
+        raise
+    finally:
+        if timer:
+            timer.cancel()
+
+    # Finished while the watchdog was cancelling it, still over the limit
+    if timed_out.is_set():
+        raise QueryTimeoutError(f"TIMEOUT after {timeout:.0f}s")
+    return server_time
+
+
+def query_scalar(query, sql_tool, database, warehouse=None):
+    """Execute a single-value query and return its value as a string, or None."""
+    if sql_tool == "bendsql" and bend_backend == "cli":
+        output = execute_bendsql(query, database, get_data=True)
+    else:
+        output = execute_sql(query, sql_tool, database, warehouse)
+
+    # bendsql prints the bare value, snowsql wraps it in a "| value |" table row
+    match = re.search(r"^\|?\s*(-?[\w.:-]+)\s*\|?\s*$", output, re.MULTILINE)
+    return match.group(1) if match else None
+
+
 def get_databend_version(database):
     """Get Databend server version."""
     try:
@@ -293,7 +941,7 @@ def get_flamegraph_filename(flamegraph_dir, benchmark_case=None):
     return f"benchmark_{timestamp}_flame.html"
 
 def initialize_flamegraph_index(flamegraph_dir, database=None, warehouse=None, benchmark_case=None):
-    """Initialize empty flamegraph HTML file at the start with system info."""
+    """Initialize empty flamegraph HTML file at the start with system info and return its path."""
     # Generate filename with benchmark_case if provided
     if benchmark_case:
         flamegraph_filename = get_flamegraph_filename(flamegraph_dir, benchmark_case)
@@ -346,6 +994,14 @@ def initialize_flamegraph_index(flamegraph_dir, database=None, warehouse=None, b
         content = content.replace('{{QUERY_ITEMS}}', '')
         content = content.replace('{{FLAMEGRAPH_TEMPLATES}}', '')
         
+        # Queries are appended to a manifest in the per-run payload directory,
+        # the index itself is written once and only references it
+        run_dir = get_flamegraph_run_dir(flamegraph_dir, flamegraph_filename)
+        os.makedirs(run_dir, exist_ok=True)
+        open(os.path.join(run_dir, "manifest.js"), 'w', encoding='utf-8').close()
+        manifest_src = f"{os.path.basename(run_dir)}/manifest.js"
+        content = content.replace('{{FLAMEGRAPH_MANIFEST}}', f'<script src="{manifest_src}"></script>')
+        
         # Add JavaScript to initialize system settings if available
         if system_settings:
             import json
@@ -374,57 +1030,50 @@ def initialize_flamegraph_index(flamegraph_dir, database=None, warehouse=None, b
         
     except Exception as e:
         logger.error(f"❌ Failed to initialize flamegraph index: {e}")
+    
+    return index_path
 
 
-def update_flamegraph_index_incremental(flamegraph_dir, query_index, sql_query, flamegraph_content, execution_time):
-    """Update flamegraph HTML file incrementally after each query."""
-    flamegraph_filename = get_flamegraph_filename(flamegraph_dir)
-    index_path = os.path.join(flamegraph_dir, flamegraph_filename)
+def get_flamegraph_run_dir(flamegraph_dir, flamegraph_filename):
+    """Return the per-run payload directory that belongs to a flamegraph index file."""
+    return os.path.join(flamegraph_dir, os.path.splitext(flamegraph_filename)[0])
+
+
+def update_flamegraph_index_incremental(flamegraph_dir, flamegraph_filename, query_index, sql_query, flamegraph_content, execution_time):
+    """Write one query's flamegraph payload and append it to the run manifest.
+
+    flamegraph_filename is the index of the current run, as created by
+    initialize_flamegraph_index. Each payload is written once into the
+    per-run directory and the manifest is only appended to, so the cost per
+    query does not grow with the number of queries already profiled.
+    """
+    import base64
+    import gzip
+    import json
+
+    run_dir = get_flamegraph_run_dir(flamegraph_dir, flamegraph_filename)
+    payload_filename = f"query_{query_index:02d}.js"
     
     try:
-        # Read current index content
-        with open(index_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Store the payload gzip compressed, the viewer only loads and
+        # decompresses it when the query's flamegraph is opened
+        raw_content = flamegraph_content.encode('utf-8')
+        compressed = base64.b64encode(gzip.compress(raw_content, compresslevel=9)).decode('ascii')
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, payload_filename), 'w', encoding='utf-8') as f:
+            f.write(f'registerFlamegraphPayload({query_index}, "{compressed}");\n')
         
         # Keep original SQL for JavaScript formatting
-        sql_display = sql_query.strip()
+        item = {
+            "index": query_index,
+            "time": execution_time,
+            "sql": sql_query.strip(),
+            "payload": f"{os.path.basename(run_dir)}/{payload_filename}",
+        }
+        with open(os.path.join(run_dir, "manifest.js"), 'a', encoding='utf-8') as f:
+            f.write(f"addQueryItem({json.dumps(item)});\n")
         
-        # Create new query item HTML
-        query_item = f'''            <li class="query-item">
-                <div class="query-header">
-                    <div class="query-title">Query {query_index:02d}</div>
-                    <div class="query-time">{execution_time:.3f}s</div>
-                </div>
-                <div class="query-sql"><pre>{sql_display}</pre></div>
-                <button class="flamegraph-toggle" onclick="toggleFlamegraph({query_index})">
-                    🔥 View Flamegraph Analysis
-                </button>
-                <div class="flamegraph-content" id="flamegraph-{query_index}" style="display: none;">
-                    <div class="loading">Loading flamegraph...</div>
-                </div>
-            </li>'''
-        
-        # Create flamegraph template with SVG content only
-        flamegraph_template = f'''        <script type="text/html" id="flamegraph-template-{query_index}">
-{flamegraph_content}
-        </script>'''
-        
-        # Find insertion points and add new content
-        # Insert query item before the closing </ul> of query-list
-        query_list_end = content.find('</ul>', content.find('class="query-list"'))
-        if query_list_end != -1:
-            content = content[:query_list_end] + query_item + '\n        ' + content[query_list_end:]
-        
-        # Insert template before the closing </body>
-        body_end = content.rfind('</body>')
-        if body_end != -1:
-            content = content[:body_end] + flamegraph_template + '\n    ' + content[body_end:]
-        
-        # Write updated content
-        with open(index_path, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        logger.info(f"📊 Updated flamegraph file with Query {query_index:02d}: {os.path.abspath(index_path)}")
+        logger.info(f"📊 Added Query {query_index:02d} to flamegraph run: {os.path.abspath(run_dir)} ({len(raw_content)/1024:.1f} KB -> {len(compressed)/1024:.1f} KB)")
         
     except Exception as e:
         logger.error(f"❌ Failed to update flamegraph index: {e}")
@@ -537,8 +1186,59 @@ def setup_database(database_name, sql_tool, warehouse):
     return elapsed_time
 
 
+def get_warehouse_state(sql_tool, warehouse, database):
+    """Return the Snowflake warehouse state from SHOW WAREHOUSES, or None if unknown."""
+    output = execute_sql(f"SHOW WAREHOUSES LIKE '{warehouse}';", sql_tool, database, warehouse)
+    for line in output.splitlines():
+        if re.search(rf"(^|[\s|]){re.escape(warehouse)}([\s|]|$)", line, re.IGNORECASE):
+            for token in re.findall(r"[A-Za-z]+", line):
+                if token.upper() in WAREHOUSE_STATES:
+                    return token.upper()
+    return None
+
+
+def wait_for_warehouse_state(sql_tool, warehouse, database, states):
+    """Poll SHOW WAREHOUSES until the warehouse reaches one of states."""
+    deadline = time.time() + WAREHOUSE_READY_TIMEOUT
+    while True:
+        state = get_warehouse_state(sql_tool, warehouse, database)
+        if state is None:
+            logger.warning(f"⚠️ Could not read the state of warehouse {warehouse}, not waiting for {'/'.join(states)}")
+            return
+        if state in states:
+            return
+        if time.time() > deadline:
+            raise RuntimeError(f"Warehouse {warehouse} still {state} after {WAREHOUSE_READY_TIMEOUT}s")
+        time.sleep(WAREHOUSE_POLL_INTERVAL)
+
+
+def wait_for_warehouse_ready(sql_tool, warehouse, database):
+    """Block until the warehouse is serving queries.
+
+    Snowflake reports STARTED in SHOW WAREHOUSES once it can run queries.
+    Databend Cloud resumes a warehouse on any query, so a trivial probe query
+    is retried until it succeeds.
+    """
+    if sql_tool == "snowsql":
+        wait_for_warehouse_state(sql_tool, warehouse, database, ("STARTED",))
+        return
+
+    deadline = time.time() + WAREHOUSE_READY_TIMEOUT
+    while True:
+        try:
+            execute_sql("SELECT 1;", sql_tool, database, warehouse)
+            return
+        except Exception as e:
+            if time.time() > deadline:
+                raise RuntimeError(f"Warehouse {warehouse} not ready after {WAREHOUSE_READY_TIMEOUT}s: {e}")
+            time.sleep(WAREHOUSE_POLL_INTERVAL)
+
+
 def restart_warehouse(sql_tool, warehouse, database):
-    """Restart a specific warehouse by suspending and then resuming it."""
+    """Restart a specific warehouse by suspending and then resuming it.
+
+    Returns the suspend latency, the resume-to-ready latency and their sum.
+    """
     start_time = time.time()
     
     if sql_tool == "bendsql":
@@ -549,16 +1249,78 @@ def restart_warehouse(sql_tool, warehouse, database):
     logger.info(f"Suspending warehouse {warehouse}...")
     execute_sql(alter_suspend, sql_tool, database, warehouse)
 
-    time.sleep(2)
+    if sql_tool == "snowsql":
+        wait_for_warehouse_state(sql_tool, warehouse, database, ("SUSPENDED",))
+    else:
+        # Any query would resume a Databend Cloud warehouse, so its state
+        # cannot be polled; give the suspension a moment to settle instead
+        time.sleep(2)
+    suspend_time = time.time() - start_time
+
+    resume_start_time = time.time()
     if sql_tool == "bendsql":
         alter_resume = f"ALTER WAREHOUSE '{warehouse}' RESUME;"
     else:
         alter_resume = f"ALTER WAREHOUSE {warehouse} RESUME;"
 
     execute_sql(alter_resume, sql_tool, database, warehouse)
+    wait_for_warehouse_ready(sql_tool, warehouse, database)
+    resume_time = time.time() - resume_start_time
     
     elapsed_time = time.time() - start_time
-    logger.info(f"Warehouse {warehouse} restarted. Time: {elapsed_time:.2f}s")
+    logger.info(f"Warehouse {warehouse} restarted. Time: {elapsed_time:.2f}s (suspend {suspend_time:.2f}s, resume to ready {resume_time:.2f}s)")
+    return {"suspend_time": suspend_time, "resume_time": resume_time, "restart_time": elapsed_time}
+
+
+def get_warehouse_size(sql_tool, warehouse, database):
+    """Return the Snowflake warehouse size from SHOW WAREHOUSES, or None if unknown."""
+    if sql_tool != "snowsql":
+        return None
+    output = execute_sql(f"SHOW WAREHOUSES LIKE '{warehouse}';", sql_tool, database, warehouse)
+    for line in output.splitlines():
+        if re.search(rf"(^|[\s|]){re.escape(warehouse)}([\s|]|$)", line, re.IGNORECASE):
+            for token in re.findall(r"[\w-]+", line):
+                normalized = normalize_warehouse_size(token)
+                if normalized in WAREHOUSE_SIZE_NODES:
+                    return normalized
+    return None
+
+
+def normalize_warehouse_size(size):
+    """Normalize spellings such as X-Small, xsmall or XXLARGE to a WAREHOUSE_SIZE_NODES key."""
+    normalized = size.upper().replace("-", "").replace("_", "")
+    return {"XXLARGE": "2XLARGE", "XXXLARGE": "3XLARGE"}.get(normalized, normalized)
+
+
+def get_run_warehouse_size(args):
+    """Return the normalized warehouse size a --size-sweep run was taken at, None outside a sweep.
+
+    History lookups only pair runs of the same size, so a sweep never
+    compares one size against another.
+    """
+    size = getattr(args, "warehouse_size", None)
+    return normalize_warehouse_size(size) if size else None
+
+
+def resize_warehouse(sql_tool, warehouse, database, size, wait=True):
+    """Resize a warehouse and, with wait, block until it serves queries again; returns the time taken."""
+    start_time = time.time()
+    if sql_tool == "bendsql":
+        alter_size = f"ALTER WAREHOUSE \"{warehouse}\" SET WAREHOUSE_SIZE = '{size}';"
+    else:
+        alter_size = f"ALTER WAREHOUSE {warehouse} SET WAREHOUSE_SIZE = '{size}';"
+
+    logger.info(f"📐 Resizing warehouse {warehouse} to {size}...")
+    execute_sql(alter_size, sql_tool, database, warehouse)
+    if not wait:
+        return time.time() - start_time
+    if sql_tool == "snowsql":
+        # Resizing leaves an auto-suspended warehouse suspended, it would never reach STARTED
+        execute_sql(f"ALTER WAREHOUSE {warehouse} RESUME IF SUSPENDED;", sql_tool, database, warehouse)
+    wait_for_warehouse_ready(sql_tool, warehouse, database)
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Warehouse {warehouse} resized to {size}. Time: {elapsed_time:.2f}s")
     return elapsed_time
 
 
@@ -593,287 +1355,3144 @@ def create_ascii_table(data, headers, title=None):
     return '\n'.join(table)
 
 
-def execute_sql_file(sql_file, sql_tool, database, warehouse, suspend, is_setup=False, flamegraph_enabled=False, flamegraph_dir=None, benchmark_case=None):
-    global flamegraph_data_storage
+def create_cold_start_table(results, title):
+    """Create the per-query table of suspend, resume-to-ready and first-query latencies."""
+    table_data = []
+    for r in sorted(results, key=lambda r: r["query_index"]):
+        cold_start = r.get("cold_start")
+        if not cold_start:
+            continue
+        table_data.append([
+            r["query_index"],
+            f"{cold_start['suspend_time']:.2f}",
+            f"{cold_start['resume_time']:.2f}",
+            f"{cold_start['first_query_time']:.2f}",
+            f"{r['server_time']:.2f}" if r.get("server_time") is not None else "-",
+        ])
+    return create_ascii_table(
+        table_data, ["Query", "Suspend(s)", "Resume To Ready(s)", "First Query Wall(s)", "Server(s)"], title
+    )
 
-    
-    # Initialize flamegraph index at the start if flamegraph is enabled
-    if flamegraph_enabled and flamegraph_dir and not is_setup:
-        initialize_flamegraph_index(flamegraph_dir, database, warehouse, benchmark_case)
-    """Execute SQL queries from a file using the specified tool and write results to a file."""
-    with open(sql_file, "r") as file:
-        queries = [query.strip() for query in file.read().split(";") if query.strip()]
 
-    results = []
-    # Create log directory if it doesn't exist
-    log_dir = "log"
-    os.makedirs(log_dir, exist_ok=True)
-    result_file_path = os.path.join(log_dir, "query_results.txt")
-    mode = "a" if os.path.exists(result_file_path) else "w"
-    
-    # Create CSV file for results in log directory
-    csv_file_path = os.path.join(log_dir, "result.csv")
-    with open(csv_file_path, "w", newline="") as csvfile:
-        csv_writer = csv.writer(csvfile)
-        csv_writer.writerow(["Query", "Time(s)"])  # Header
-    
-    total_start_time = time.time()
-    successful_queries = 0
-    total_execution_time = 0.0
-    total_restart_time = 0.0
-    
-    phase = "Setup" if is_setup else "Queries"
-    logger.info(f"\n{'='*50}\n{phase} Execution - {sql_tool} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+def percentile(values, fraction):
+    """Return the linearly interpolated percentile of values, fraction in [0, 1]."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
 
-    with open(result_file_path, mode) as result_file:
-        # Add header for this execution
-        result_file.write(f"\n{'='*50}\n{phase} Execution - {sql_tool} - {datetime.now()}\n{'='*50}\n\n")
-        
-        for index, query in enumerate(queries):
-            query_start_time = time.time()
-            restart_time = 0
-            
-            try:
-                # Print real-time progress
-                logger.info(f"\nQuery {index+1}/{len(queries)} - Started at {datetime.now().strftime('%H:%M:%S')}")
-                logger.info(f"SQL: {query}")
-                
-                if suspend:
-                    restart_time = restart_warehouse(sql_tool, warehouse, database)
-                    total_restart_time += restart_time
 
-                query_exec_start = time.time()
-                output = execute_sql(query, sql_tool, database, warehouse)
+def bootstrap_confidence_interval(samples, confidence=0.95, resamples=1000, seed=0):
+    """Bootstrap a confidence interval for the median of samples."""
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return value, value
 
-                if sql_tool == "snowsql":
-                    time_elapsed = extract_snowsql_time(output)
-                else:
-                    time_elapsed = extract_bendsql_time(output)
-
-                if time_elapsed:
-                    time_elapsed_float = float(time_elapsed)
-                    total_execution_time += time_elapsed_float
-                    successful_queries += 1
-                    
-                    # Generate flamegraph if enabled and using bendsql (use server execution time)
-                    if flamegraph_enabled and sql_tool == "bendsql" and flamegraph_dir and not is_setup:
-                        flamegraph_content, _ = execute_bendsql_flamegraph(query, database)
-                        if flamegraph_content:
-                            logger.info(f"🔥 Flamegraph generated for Query {index+1:02d}")
-                            # Update flamegraph index immediately with server execution time
-                            update_flamegraph_index_incremental(flamegraph_dir, index+1, query, flamegraph_content, time_elapsed_float)
-                        else:
-                            logger.warning(f"⚠️ No flamegraph content generated for Query {index+1:02d}")
-                    
-                    # Write to CSV file
-                    with open(csv_file_path, "a", newline="") as csvfile:
-                        csv_writer = csv.writer(csvfile)
-                        csv_writer.writerow([index + 1, time_elapsed_float])
-                
-                query_total_time = time.time() - query_start_time
-                
-                # Print real-time timing information
-                logger.info(f"Query {index+1} completed:")
-                logger.info(f"  - Server execution time: {time_elapsed}s")
-                logger.info(f"  - Total time (including restart): {query_total_time:.2f}s")
-                if restart_time > 0:
-                    logger.info(f"  - Warehouse restart time: {restart_time:.2f}s")
-                
-                result_file.write(f"SQL: {query}\n")
-                result_file.write(f"Time Elapsed (server): {time_elapsed}s\n")
-                result_file.write(f"Total time (including restart): {query_total_time:.2f}s\n\n")
-                
-                results.append({
-                    "query_index": index + 1,
-                    "server_time": float(time_elapsed) if isinstance(time_elapsed, str) else time_elapsed,
-                    "total_time": query_total_time,
-                    "restart_time": restart_time
-                })
-                
-            except Exception as e:
-                query_total_time = time.time() - query_start_time
-                logger.error(f"Query {index+1} failed: {e}")
-                logger.error(f"  - Total time until failure: {query_total_time:.2f}s")
-                
-                result_file.write(f"SQL: {query}\nError: {e}\n")
-                result_file.write(f"Total time until failure: {query_total_time:.2f}s\n\n")
-                
-                results.append({
-                    "query_index": index + 1,
-                    "error": str(e),
-                    "total_time": query_total_time,
-                    "restart_time": restart_time,
-                    "server_time": 0.0
-                })
+    rng = random.Random(seed)
+    medians = sorted(
+        statistics.median(rng.choices(samples, k=len(samples)))
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return percentile(medians, tail), percentile(medians, 1 - tail)
 
-    total_wall_time = time.time() - total_start_time
-    
-    # Create ASCII table for query times
-    table_data = []
-    for result in results:
-        if "error" not in result:
-            table_data.append([result["query_index"], f"{result['server_time']:.2f}s"])
-    
-    # Sort by query index
-    table_data.sort(key=lambda x: x[0])
-    
-    # Create ASCII table
-    query_times_table = create_ascii_table(table_data, ["Query", "Time(s)"], f"{phase} Query Execution Times:")
-    
-    # Print and write summary statistics
-    summary = f"""
-{phase} Execution Summary ({sql_tool}):
-----------------------------------------
-Total queries: {len(queries)}
-Successful queries: {successful_queries}
-Failed queries: {len(queries) - successful_queries}
-Total server execution time: {total_execution_time:.2f}s
-Total warehouse restart time: {total_restart_time:.2f}s
-Total wall clock time: {total_wall_time:.2f}s
-Average query time (server): {(total_execution_time / successful_queries if successful_queries else 0):.2f}s
 
-{query_times_table}
-"""
-    
-    logger.info(summary)
-    with open(result_file_path, "a") as result_file:
-        result_file.write(summary)
-    
-    # Flamegraph index is now updated incrementally after each query
-    # No need for final generation step
-    
+def compute_query_statistics(samples):
+    """Summarize the measured samples of one query."""
+    ci_low, ci_high = bootstrap_confidence_interval(samples)
     return {
-        "total_execution_time": total_execution_time,
-        "total_wall_time": total_wall_time,
-        "total_restart_time": total_restart_time,
-        "successful_queries": successful_queries,
-        "total_queries": len(queries),
-        "results": results
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.mean(samples),
+        "p95": percentile(samples, 0.95),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ci_low": ci_low,
+        "ci_high": ci_high,
     }
 
 
-def parse_arguments():
-    parser = argparse.ArgumentParser(
-        description="Run SQL queries using bendsql or snowsql."
-    )
-    parser.add_argument("--database", help="Database name", required=True)
-    parser.add_argument(
-        "--warehouse",
-        default="COMPUTE_WH",
-        help="Warehouse name for snowsql",
-        required=False,
+def geometric_mean(values):
+    """Geometric mean of the positive values, 0 when there are none."""
+    positive = [v for v in values if v > 0]
+    return statistics.geometric_mean(positive) if positive else 0.0
+
+
+def create_query_times_table(results, title):
+    """Create the per-query ASCII table, with sample statistics when a query was repeated."""
+    measured = sorted(
+        (r for r in results if "error" not in r and r.get("server_time") is not None),
+        key=lambda r: r["query_index"],
+    )
+
+    if not any(len(r.get("samples", [])) > 1 for r in measured):
+        table_data = [[r["query_index"], f"{r['server_time']:.2f}s"] for r in measured]
+        return create_ascii_table(table_data, ["Query", "Time(s)"], title)
+
+    table_data = []
+    for r in measured:
+        stats = r["stats"]
+        table_data.append([
+            r["query_index"],
+            len(r["samples"]),
+            f"{stats['min']:.2f}",
+            f"{stats['median']:.2f}",
+            f"{stats['mean']:.2f}",
+            f"{stats['p95']:.2f}",
+            f"{stats['stddev']:.3f}",
+            f"[{stats['ci_low']:.2f}, {stats['ci_high']:.2f}]",
+        ])
+    headers = ["Query", "Runs", "Min(s)", "Median(s)", "Mean(s)", "P95(s)", "Stddev(s)", "95% CI Median(s)"]
+    return create_ascii_table(table_data, headers, title)
+
+
+def load_queries(sql_file):
+    """Split a SQL file into its non-empty statements."""
+    with open(sql_file, "r") as file:
+        return [query.strip() for query in file.read().split(";") if query.strip()]
+
+
+def collect_flamegraphs(queries, results, database, warehouse, flamegraph_dir, benchmark_case, parallelism):
+    """Profile the successful queries with EXPLAIN PERF in a separate pass.
+
+    Runs after the timing pass so profiling neither doubles its wall time
+    nor warms caches for the next timed query. Flamegraphs are collected
+    through a bounded worker pool and added to the index in query order.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    profiled = [r for r in results if "error" not in r and r["server_time"] is not None]
+    logger.info(f"\n{'='*50}\nFlamegraph Collection - {len(profiled)} queries, parallelism {parallelism} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+    start_time = time.time()
+
+    index_path = initialize_flamegraph_index(flamegraph_dir, database, warehouse, benchmark_case)
+    flamegraph_filename = os.path.basename(index_path)
+
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        futures = [
+            pool.submit(execute_bendsql_flamegraph, queries[r["query_index"] - 1], database)
+            for r in profiled
+        ]
+        generated = 0
+        for r, future in zip(profiled, futures):
+            query_index = r["query_index"]
+            flamegraph_content, _ = future.result()
+            if flamegraph_content:
+                logger.info(f"🔥 Flamegraph generated for Query {query_index:02d}")
+                # Show the server execution time of the timing pass next to the flamegraph
+                update_flamegraph_index_incremental(flamegraph_dir, flamegraph_filename, query_index, queries[query_index - 1], flamegraph_content, r["server_time"])
+                generated += 1
+            else:
+                logger.warning(f"⚠️ No flamegraph content generated for Query {query_index:02d}")
+
+    logger.info(f"🔥 Flamegraph collection completed: {generated}/{len(profiled)} queries in {time.time() - start_time:.2f}s")
+    return {"generated": generated, "index_path": index_path}
+
+
+def get_query_plan(query, sql_tool, database, warehouse):
+    """Return the EXPLAIN output of a query, which plans it without running it."""
+    if sql_tool == "bendsql":
+        statement = f"EXPLAIN {query}"
+        if bend_backend == "cli":
+            return execute_bendsql(statement, database, get_data=True)
+        return execute_sql(statement, sql_tool, database)
+    return execute_sql(f"EXPLAIN USING TEXT {query}", sql_tool, database, warehouse)
+
+
+def normalize_plan(plan):
+    """Reduce a plan to its shape: operators, tables, columns and predicates.
+
+    Numbers (estimated rows, partitions, costs, operator ids, literals),
+    quoted string literals and client table borders are dropped, so only a
+    structural change moves the fingerprint, not a qgen parameter.
+    """
+    lines = []
+    for line in plan.splitlines():
+        line = line.rstrip()
+        # snowsql prints results as "| ... |" table rows between "+---+" borders
+        if line.startswith("|"):
+            line = line[1:].rstrip("| ")
+        if not line.strip() or re.fullmatch(r"[+\-=| ]+", line.strip()) or re.search(r"Row\(s\) produced", line):
+            continue
+        indent = len(line) - len(line.lstrip())
+        body = re.sub(r"'(?:[^']|'')*'", "'?'", line.strip())
+        # Only standalone numbers, digits inside identifiers (n1, l2, ss1) tell aliases apart
+        body = re.sub(r"\b\d+(?:\.\d+)?\b", "?", body)
+        lines.append(line[:indent] + re.sub(r"\s+", " ", body))
+    return "\n".join(lines)
+
+
+def get_plan_fingerprint(plan):
+    """Return a short hash of a normalized plan."""
+    return hashlib.sha256(normalize_plan(plan).encode()).hexdigest()[:16]
+
+
+def collect_query_plans(queries, results, sql_tool, database, warehouse):
+    """Capture the EXPLAIN plan of every query in a pass after the timing pass.
+
+    Returns {query_index: {"fingerprint", "plan"}}; queries that cannot be
+    explained are left out.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    logger.info(f"\n{'='*50}\nPlan Capture - {len(results)} queries - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+    start_time = time.time()
+
+    def explain(query_index):
+        try:
+            return get_query_plan(queries[query_index - 1], sql_tool, database, warehouse)
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to EXPLAIN Query {query_index}: {e}")
+            return None
+
+    query_indexes = [r["query_index"] for r in results]
+    plans = {}
+    with ThreadPoolExecutor(max_workers=EXPLAIN_PARALLELISM) as pool:
+        for query_index, plan in zip(query_indexes, pool.map(explain, query_indexes)):
+            if plan:
+                plans[query_index] = {"fingerprint": get_plan_fingerprint(plan), "plan": plan}
+
+    logger.info(f"🧭 Plans captured: {len(plans)}/{len(query_indexes)} queries in {time.time() - start_time:.2f}s")
+    return plans
+
+
+def create_shard_summary(results):
+    """Summarize how many queries and how much server time each warehouse shard took."""
+    shard_stats = {}
+    for r in results:
+        queries, server_time = shard_stats.get(r.get("warehouse"), (0, 0.0))
+        shard_stats[r.get("warehouse")] = (queries + 1, server_time + (r["server_time"] or 0.0))
+    lines = [
+        f"  - {warehouse}: {queries} queries, {server_time:.2f}s server time"
+        for warehouse, (queries, server_time) in shard_stats.items()
+    ]
+    return "Warehouse shards:\n" + "\n".join(lines) + "\n"
+
+
+RESULT_CSV_HEADER = [
+    "Query", "Time(s)", "Min(s)", "Median(s)", "Mean(s)", "P95(s)",
+    "Stddev(s)", "CI95 Low(s)", "CI95 High(s)", "Samples(s)",
+    "Suspend(s)", "Resume To Ready(s)", "First Query Wall(s)",
+    "Wall(s)", "Setup(s)", "To First Byte(s)", "Fetch(s)", "Rows Returned", "Bytes Returned",
+] + [name.replace("_", " ").title() for name in QUERY_LOG_METRICS] + ["Parameters"]
+
+
+def write_result_csv(csv_file_path, results):
+    """Rewrite the result CSV with every measured query, including their server metrics."""
+    with open(csv_file_path, "w", newline="") as csvfile:
+        csv.writer(csvfile).writerow(RESULT_CSV_HEADER)
+    for result in results:
+        if "error" not in result and result["server_time"] is not None:
+            write_result_csv_row(csv_file_path, result)
+
+
+def write_result_csv_row(csv_file_path, result):
+    """Append the CSV row of a measured query result."""
+    stats = result["stats"]
+    cold_start = result.get("cold_start")
+    metrics = result.get("metrics") or {}
+    timing = result.get("timing") or {}
+    with open(csv_file_path, "a", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow([
+            result["query_index"], result["server_time"], stats["min"], stats["median"], stats["mean"],
+            stats["p95"], stats["stddev"], stats["ci_low"], stats["ci_high"],
+            ";".join(f"{sample:.3f}" for sample in result["samples"]),
+            cold_start["suspend_time"] if cold_start else "",
+            cold_start["resume_time"] if cold_start else "",
+            cold_start["first_query_time"] if cold_start else "",
+        ] + [
+            timing.get(name, "") for name in ("wall", "setup", "to_first_byte", "fetch", "rows", "bytes")
+        ] + [metrics.get(name, "") for name in QUERY_LOG_METRICS] + [
+            json.dumps(result["query_parameters"]) if result.get("query_parameters") else "",
+        ])
+
+
+def format_bytes(value):
+    """Format a byte count with a binary unit."""
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if abs(value) < 1024 or unit == "TiB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def fetch_query_log_metrics(tags, database, lookback_seconds):
+    """Fetch the server metrics of tagged queries from system.query_log in one batched lookup.
+
+    Returns {tag: {metric: value}}. Finished queries reach the query log
+    shortly after they return, so the lookup is retried while tags are missing.
+    """
+    query = f"""
+    SELECT regexp_substr(query_text, 'benchsb:[0-9a-f]{{32}}'),
+           scan_rows, scan_bytes, scan_partitions, result_rows, result_bytes, memory_usage,
+           join_spilled_bytes + agg_spilled_bytes + group_by_spilled_bytes, cpu_usage
+    FROM system.query_log
+    WHERE log_type_name = 'Finish'
+      AND event_time >= now() - INTERVAL {int(lookback_seconds) + 300} SECOND
+      AND query_text LIKE '%benchsb:%'
+    """
+    wanted = set(tags)
+    metrics = {}
+    for _ in range(3):
+        if bend_backend == "cli":
+            output = execute_bendsql(query, database, get_data=True)
+        else:
+            output = execute_sql(query, "bendsql", database)
+        for line in output.splitlines():
+            fields = line.split("\t")
+            if len(fields) != len(QUERY_LOG_METRICS) + 1 or not fields[0].startswith("benchsb:"):
+                continue
+            tag = fields[0][len("benchsb:"):]
+            if tag in wanted:
+                metrics[tag] = {
+                    name: int(float(value)) if value not in ("", "NULL", "None") else None
+                    for name, value in zip(QUERY_LOG_METRICS, fields[1:])
+                }
+        if wanted <= set(metrics):
+            break
+        time.sleep(2)
+    return metrics
+
+
+def attach_query_log_metrics(results, database, lookback_seconds):
+    """Attach system.query_log metrics to measured results, per sample and as per-query medians."""
+    pending = [r for r in results if r.get("query_tags") and "metrics" not in r]
+    tags = [tag for r in pending for tag in r["query_tags"]]
+    if not tags:
+        return
+
+    try:
+        metrics = fetch_query_log_metrics(tags, database, lookback_seconds)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read system.query_log, no server metrics this run: {e}")
+        return
+    logger.info(f"📊 Found server metrics for {len(metrics)}/{len(tags)} query runs in system.query_log")
+
+    for r in pending:
+        r["sample_metrics"] = [metrics.get(tag) for tag in r["query_tags"]]
+        found = [m for m in r["sample_metrics"] if m]
+        r["metrics"] = None
+        if found:
+            r["metrics"] = {}
+            for name in QUERY_LOG_METRICS:
+                values = [m[name] for m in found if m[name] is not None]
+                r["metrics"][name] = statistics.median(values) if values else None
+
+            # Clients that do not see the result rows get their size from the server
+            timing = r.get("timing")
+            if timing and timing["rows"] is None:
+                timing["rows"] = r["metrics"]["result_rows"]
+            if timing and timing["bytes"] is None:
+                timing["bytes"] = r["metrics"]["result_bytes"]
+
+
+def create_query_metrics_table(results, title):
+    """Create the per-query table of system.query_log metrics."""
+    def count(metrics, name):
+        return f"{metrics[name]:,.0f}" if metrics[name] is not None else "-"
+
+    def size(metrics, name):
+        return format_bytes(metrics[name]) if metrics[name] is not None else "-"
+
+    table_data = []
+    for r in results:
+        metrics = r.get("metrics")
+        if not metrics:
+            continue
+        table_data.append([
+            r["query_index"], count(metrics, "scan_rows"), size(metrics, "scan_bytes"),
+            count(metrics, "scan_partitions"), count(metrics, "result_rows"), size(metrics, "result_bytes"),
+            size(metrics, "peak_memory"), size(metrics, "spill_bytes"), count(metrics, "cpu_usage"),
+        ])
+    headers = ["Query", "Scan Rows", "Scan Bytes", "Partitions", "Result Rows", "Result Bytes", "Peak Memory", "Spilled", "CPUs"]
+    return create_ascii_table(table_data, headers, title)
+
+
+def get_client_setup_time(sql_tool, database, warehouse):
+    """Estimate the per-statement client setup time (process spawn, connect, login).
+
+    Persistent driver connections and snowsql sessions pay it once, not per
+    query. For the CLI backends it is the median gap between client time to
+    first byte and server time of a trivial query, measured once per target.
+    """
+    if (sql_tool == "bendsql" and bend_backend == "driver") or (sql_tool == "snowsql" and snow_backend == "session"):
+        return 0.0
+
+    key = (sql_tool, database, warehouse, getattr(bendsql_dsn_local, "dsn", None))
+    with client_setup_times_lock:
+        if key in client_setup_times:
+            return client_setup_times[key]
+        key_lock = client_setup_time_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        if key not in client_setup_times:
+            gaps = []
+            try:
+                for _ in range(3):
+                    timing = {}
+                    server_time = execute_timed_sql("SELECT 1", sql_tool, database, warehouse, timeout=query_timeout, timing=timing)
+                    # Output only starts after execution, even where it is printed all at once
+                    gaps.append(max(timing["first_byte"] - (server_time or 0.0), 0.0))
+                setup_time = statistics.median(gaps)
+                logger.info(f"⏱️ Estimated {sql_tool} client setup time per statement: {setup_time:.3f}s")
+            except Exception as e:
+                # The estimate only splits the breakdown, it must never stop the run
+                setup_time = 0.0
+                logger.warning(f"⚠️ Could not estimate the {sql_tool} client setup time, assuming 0s: {e}")
+            with client_setup_times_lock:
+                client_setup_times[key] = setup_time
+        return client_setup_times[key]
+
+
+def summarize_client_timings(timings, samples, client_setup_time):
+    """Median client-side breakdown of the measured runs of a query.
+
+    wall = setup + to_first_byte + fetch; server execution happens inside
+    to_first_byte, the rest of the wall time is client and network overhead.
+    Clients that print everything at once (bendsql --time=server) have no
+    fetch timing, and to_first_byte and fetch are None.
+    """
+    if not timings:
+        return None
+
+    def median_of(values):
+        values = [v for v in values if v is not None]
+        return statistics.median(values) if values else None
+
+    return {
+        "wall": median_of(t["wall"] for t in timings),
+        "setup": client_setup_time,
+        "to_first_byte": median_of(max(t["first_byte"] - client_setup_time, 0.0) for t in timings if t["fetch"] is not None),
+        "server": median_of(samples),
+        "fetch": median_of(t["fetch"] for t in timings),
+        "rows": median_of(t.get("rows") for t in timings),
+        "bytes": median_of(t.get("bytes") for t in timings),
+    }
+
+
+def create_client_breakdown_table(results, title):
+    """Create the per-query table of client wall time against server time."""
+    def seconds(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    table_data = []
+    for r in results:
+        timing = r.get("timing")
+        if not timing:
+            continue
+        overhead = timing["wall"] - timing["server"] if timing["server"] is not None else None
+        table_data.append([
+            r["query_index"], seconds(timing["wall"]), seconds(timing["setup"]), seconds(timing["to_first_byte"]),
+            seconds(timing["server"]), seconds(timing["fetch"]), seconds(overhead),
+            f"{timing['rows']:,.0f}" if timing["rows"] is not None else "-",
+            format_bytes(timing["bytes"]) if timing["bytes"] is not None else "-",
+        ])
+    headers = ["Query", "Wall(s)", "Setup(s)", "To First Byte(s)", "Server(s)", "Fetch(s)", "Client Overhead(s)", "Rows", "Bytes"]
+    return create_ascii_table(table_data, headers, title)
+
+
+def measure_query(index, query, query_count, sql_tool, database, warehouse, suspend, warmup, iterations, timeout, result_file, output_lock, client_setup_time=0.0, qgen=None):
+    """Run one query warmup + iterations times and return its result.
+
+    With qgen the query is a template and every run draws fresh parameters.
+    """
+    query_start_time = time.time()
+    restart_time = 0
+    suspend_time = 0
+    resume_time = 0
+    
+    try:
+        # Print real-time progress
+        logger.info(f"\nQuery {index+1}/{query_count} - Started at {datetime.now().strftime('%H:%M:%S')}")
+        logger.info(f"SQL: {query}")
+        
+        samples = []
+        # Tags of the measured runs, aligned with samples, to find them in system.query_log
+        query_tags = []
+        query_parameters = []
+        timings = []
+        # Client wall time of every measured run, kept apart from server time
+        client_times = []
+        cold_starts = []
+        for run in range(warmup + iterations):
+            if suspend:
+                restart = restart_warehouse(sql_tool, warehouse, database)
+                restart_time += restart["restart_time"]
+                suspend_time += restart["suspend_time"]
+                resume_time += restart["resume_time"]
+
+            run_start_time = time.time()
+            tag = uuid.uuid4().hex if sql_tool == "bendsql" else None
+            timing = {}
+            run_query, parameters = render_query(query, index + 1, qgen, iteration=run)
+            if parameters:
+                logger.info(f"  - Parameters: {format_query_parameters(parameters)}")
+            time_elapsed = execute_timed_sql(run_query, sql_tool, database, warehouse, timeout, tag, timing)
+            timing["wall"] = time.time() - run_start_time
+            if suspend:
+                # The query right after resume pays any remaining warm-up
+                restart["first_query_time"] = time.time() - run_start_time
+                cold_starts.append(restart)
+
+            # Warmup runs are executed but never recorded
+            if run < warmup:
+                logger.info(f"  - Warmup {run+1}/{warmup}: {time_elapsed}s")
+                continue
+            client_times.append(timing["wall"])
+            if time_elapsed is not None:
+                samples.append(time_elapsed)
+                query_tags.append(tag)
+                query_parameters.append(parameters)
+                timings.append(timing)
+                if iterations > 1:
+                    logger.info(f"  - Iteration {run-warmup+1}/{iterations}: {time_elapsed:.3f}s")
+
+        stats = compute_query_statistics(samples) if samples else None
+        time_elapsed = stats["median"] if stats else None
+        cold_start = {
+            key: statistics.median(c[key] for c in cold_starts)
+            for key in ("suspend_time", "resume_time", "first_query_time")
+        } if cold_starts else None
+        client_timing = summarize_client_timings(timings, samples, client_setup_time)
+
+        query_total_time = time.time() - query_start_time
+        
+        # Print real-time timing information
+        logger.info(f"Query {index+1} completed:")
+        logger.info(f"  - Server execution time: {time_elapsed}s")
+        if not samples and client_times:
+            logger.warning(f"  - No server time reported, client wall time: {statistics.median(client_times):.3f}s (not used as server time)")
+        if len(samples) > 1:
+            logger.info(f"  - Samples: {', '.join(f'{sample:.3f}s' for sample in samples)}")
+        logger.info(f"  - Total time (including restart): {query_total_time:.2f}s")
+        if restart_time > 0:
+            logger.info(f"  - Warehouse restart time: {restart_time:.2f}s")
+        if cold_start:
+            logger.info(f"  - Suspend: {cold_start['suspend_time']:.2f}s, resume to ready: {cold_start['resume_time']:.2f}s, first query wall: {cold_start['first_query_time']:.2f}s")
+        if client_timing:
+            split = f"to first byte {client_timing['to_first_byte']:.3f}s, fetch {client_timing['fetch']:.3f}s" if client_timing["fetch"] is not None else "first byte and fetch not measurable"
+            logger.info(f"  - Client wall: {client_timing['wall']:.3f}s (setup {client_timing['setup']:.3f}s, {split})")
+        
+        with output_lock:
+            result_file.write(f"SQL: {query}\n")
+            result_file.write(f"Time Elapsed (server): {time_elapsed}s\n")
+            if len(samples) > 1:
+                result_file.write(f"Samples (server): {', '.join(f'{sample:.3f}s' for sample in samples)}\n")
+            for sample, parameters in zip(samples, query_parameters):
+                if parameters:
+                    result_file.write(f"Parameters ({sample:.3f}s): {format_query_parameters(parameters)}\n")
+            result_file.write(f"Total time (including restart): {query_total_time:.2f}s\n\n")
+        
+        return {
+            "query_index": index + 1,
+            "warehouse": warehouse,
+            "server_time": time_elapsed,
+            "samples": samples,
+            "query_tags": query_tags,
+            "query_parameters": query_parameters if qgen else None,
+            "timing": client_timing,
+            "client_time": statistics.median(client_times) if client_times else None,
+            "stats": stats,
+            "total_time": query_total_time,
+            "restart_time": restart_time,
+            "suspend_time": suspend_time,
+            "resume_time": resume_time,
+            "cold_start": cold_start
+        }
+        
+    except Exception as e:
+        query_total_time = time.time() - query_start_time
+        status = "TIMEOUT" if isinstance(e, QueryTimeoutError) else "ERROR"
+        if status == "TIMEOUT":
+            logger.error(f"⏰ Query {index+1} timed out after {timeout:.0f}s, continuing with the next query")
+        else:
+            logger.error(f"Query {index+1} failed: {e}")
+        logger.error(f"  - Total time until failure: {query_total_time:.2f}s")
+        
+        with output_lock:
+            result_file.write(f"SQL: {query}\nError: {e}\n")
+            result_file.write(f"Total time until failure: {query_total_time:.2f}s\n\n")
+        
+        return {
+            "query_index": index + 1,
+            "warehouse": warehouse,
+            "status": status,
+            "error": str(e),
+            "total_time": query_total_time,
+            "restart_time": restart_time,
+            "suspend_time": suspend_time,
+            "resume_time": resume_time,
+            "server_time": 0.0,
+            "samples": [],
+            "stats": None
+        }
+
+
+def load_expected_durations(path, case, database, engine, warehouse_size=None):
+    """Return {query number: expected seconds} from the newest history run, at the same warehouse size, containing each query."""
+    if not path or not os.path.exists(path):
+        return {}
+
+    conn = open_history_store(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT s.query_index, s.run_id, s.server_time
+            FROM query_samples s JOIN runs r ON r.run_id = s.run_id
+            WHERE r.case_name = ? AND r.database_name = ? AND r.engine = ? AND r.warehouse_size IS ?
+              AND s.phase = 'queries' AND s.status = 'OK'
+            ORDER BY r.started_at DESC
+            """,
+            (case, database, engine, warehouse_size),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    newest_run = {}
+    samples = {}
+    for query_index, run_id, server_time in rows:
+        if newest_run.setdefault(query_index, run_id) == run_id:
+            samples.setdefault(query_index, []).append(server_time)
+    return {query_index: statistics.median(values) for query_index, values in samples.items()}
+
+
+def get_shard_targets(sql_tool, warehouses):
+    """Parse --warehouses into (warehouse name, bendsql DSN or None) shard targets."""
+    entries = [entry.strip() for entry in warehouses.split(",") if entry.strip()]
+    if sql_tool == "bendsql":
+        return [(get_bendsql_warehouse_from_env(dsn), dsn) for dsn in entries]
+    return [(name, None) for name in entries]
+
+
+def execute_sharded(pending, shards, expected_durations, measure, fail):
+    """Run queries across warehouse shards, longest expected query first.
+
+    Every shard pulls the next query from one shared queue when it is free
+    (LPT list scheduling), so a mis-estimated query only delays its own
+    shard. Queries without history are scheduled first. A query whose
+    measure raises is passed to fail and the shard keeps draining the queue.
+    """
+    import queue
+
+    work = queue.Queue()
+    for item in sorted(pending, key=lambda item: -expected_durations.get(item[0] + 1, math.inf)):
+        work.put(item)
+
+    def run_shard(warehouse, dsn):
+        bendsql_dsn_local.dsn = dsn
+        while True:
+            try:
+                index, query = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                measure(index, query, warehouse)
+            except Exception as e:
+                logger.error(f"Query {index+1} failed on shard {warehouse}: {e}")
+                fail(index, warehouse, e)
+
+    workers = [
+        threading.Thread(target=run_shard, args=shard, name=shard[0])
+        for shard in shards
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+class MetricsExporter:
+    """Live progress of execute_sql_file runs and throughput streams in the Prometheus/OpenMetrics text format.
+
+    Served from a localhost HTTP endpoint, rewritten atomically into a
+    textfile-collector file after every change, or both. Series are labelled
+    by engine, database and phase so concurrent --runboth engines stay apart.
+    """
+
+    def __init__(self, port=None, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        # Publishes render and write under one lock so the newest state lands last
+        self.write_lock = threading.Lock()
+        self.phases = {}
+        self.server = None
+        if port is not None:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+            exporter = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = exporter.render(openmetrics=True).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+            threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+            logger.info(f"📡 Serving live metrics at http://127.0.0.1:{self.server.server_port}/metrics")
+        if path:
+            logger.info(f"📡 Writing live metrics to {os.path.abspath(path)}")
+
+    def start_phase(self, sql_tool, database, phase, total_queries):
+        """Reset the progress of an engine's phase, e.g. for the next database of a sweep."""
+        with self.lock:
+            self.phases[(sql_tool, phase)] = {
+                "database": database,
+                "total": total_queries,
+                "in_flight": [],
+                "completed": 0,
+                "failed": 0,
+                "timed_out": 0,
+                "last_latency": None,
+                "latency_sum": 0.0,
+                "latencies": [],
+                "restart_time": 0.0,
+            }
+        self.publish()
+
+    def query_started(self, sql_tool, phase, query_index):
+        with self.lock:
+            self.phases[(sql_tool, phase)]["in_flight"].append(query_index)
+        self.publish()
+
+    def query_finished(self, sql_tool, phase, result):
+        """Count a finished query result of measure_query."""
+        with self.lock:
+            state = self.phases[(sql_tool, phase)]
+            if result["query_index"] in state["in_flight"]:
+                state["in_flight"].remove(result["query_index"])
+            state["restart_time"] += result.get("restart_time", 0)
+            if "error" in result or result["server_time"] is None:
+                state["failed"] += 1
+                if result.get("status") == "TIMEOUT":
+                    state["timed_out"] += 1
+            else:
+                state["completed"] += 1
+                state["last_latency"] = result["server_time"]
+                state["latency_sum"] += result["server_time"]
+                state["latencies"] = (state["latencies"] + [result["server_time"]])[-METRICS_ROLLING_WINDOW:]
+        self.publish()
+
+    def render(self, openmetrics=False):
+        """Render all series; the textfile collector expects the Prometheus format."""
+        families = []
+
+        def family(name, kind, help_text, samples):
+            # OpenMetrics names counter families without the _total suffix of their samples
+            family_name = name[:-len("_total")] if openmetrics and kind == "counter" else name
+            lines = [f"# HELP {family_name} {help_text}", f"# TYPE {family_name} {kind}"]
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}")
+            families.append("\n".join(lines))
+
+        with self.lock:
+            states = [
+                ({"engine": sql_tool, "database": state["database"], "phase": phase}, dict(state, in_flight=list(state["in_flight"])))
+                for (sql_tool, phase), state in sorted(self.phases.items())
+            ]
+
+        family("benchsb_current_query", "gauge", "Number of the most recently started query still running, 0 when idle.",
+               [("", labels, state["in_flight"][-1] if state["in_flight"] else 0) for labels, state in states])
+        family("benchsb_queries_in_flight", "gauge", "Queries currently running.",
+               [("", labels, len(state["in_flight"])) for labels, state in states])
+        family("benchsb_queries", "gauge", "Queries in the phase.",
+               [("", labels, state["total"]) for labels, state in states])
+        family("benchsb_queries_completed_total", "counter", "Queries measured successfully.",
+               [("", labels, state["completed"]) for labels, state in states])
+        family("benchsb_queries_failed_total", "counter", "Queries that failed or timed out.",
+               [("", labels, state["failed"]) for labels, state in states])
+        family("benchsb_queries_timed_out_total", "counter", "Queries cancelled by the query timeout.",
+               [("", labels, state["timed_out"]) for labels, state in states])
+        family("benchsb_last_query_seconds", "gauge", "Server time of the last measured query.",
+               [("", labels, state["last_latency"]) for labels, state in states if state["last_latency"] is not None])
+        # The rolling window shrinks as well as grows, so its quantiles are
+        # gauges; only the cumulative sum and count follow summary semantics
+        family("benchsb_rolling_query_seconds", "gauge",
+               f"Server time quantiles of the last {METRICS_ROLLING_WINDOW} measured queries.",
+               [
+                   ("", dict(labels, quantile=str(quantile)), percentile(state["latencies"], quantile))
+                   for labels, state in states if state["latencies"]
+                   for quantile in (0.5, 0.95)
+               ])
+        family("benchsb_query_seconds", "summary", "Cumulative server time and count of the measured queries.",
+               [
+                   sample for labels, state in states
+                   for sample in (("_sum", labels, state["latency_sum"]), ("_count", labels, state["completed"]))
+               ])
+        family("benchsb_restart_seconds_total", "counter", "Cumulative warehouse restart time of cold runs.",
+               [("", labels, state["restart_time"]) for labels, state in states])
+
+        text = "\n".join(families) + "\n"
+        return text + "# EOF\n" if openmetrics else text
+
+    def publish(self):
+        """Rewrite the textfile, collectors only ever see a complete file."""
+        if not self.path:
+            return
+        with self.write_lock:
+            text = self.render()
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # The collector only reads *.prom files, so the temporary file is ignored
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+
+def execute_sql_file(sql_file, sql_tool, database, warehouse, suspend, is_setup=False, flamegraph_enabled=False, flamegraph_dir=None, benchmark_case=None, warmup=0, iterations=1, result_tag=None, flamegraph_parallelism=4, run_state=None, shards=None, expected_durations=None, capture_plans=False, qgen=None):
+    """Execute SQL queries from a file using the specified tool and write results to a file.
+
+    With a run_state every finished query is checkpointed to the run-state
+    file, and queries already measured in it are reused instead of rerun.
+    With several shards the queries are spread across those warehouses.
+    With capture_plans every query's EXPLAIN plan is taken after timing.
+    With qgen the file holds query templates rendered with fresh parameters
+    on every run; profiling and plans use the stream 0 first-run rendering.
+    """
+    queries = load_queries(sql_file)
+
+    # Failed queries are retried on resume, timed out ones would only time out again
+    completed = {}
+    if run_state is not None and not is_setup:
+        run_state["queries"] = [
+            r for r in run_state["queries"] if "error" not in r or r.get("status") == "TIMEOUT"
+        ]
+        completed = {r["query_index"]: r for r in run_state["queries"]}
+
+    results = []
+    output_lock = threading.Lock()
+    # Create log directory if it doesn't exist
+    log_dir = "log"
+    os.makedirs(log_dir, exist_ok=True)
+    result_file_path = get_log_path("query_results.txt", result_tag)
+    mode = "a" if os.path.exists(result_file_path) else "w"
+    
+    # Create CSV file for results in log directory
+    csv_file_path = get_log_path("result.csv", result_tag)
+    with open(csv_file_path, "w", newline="") as csvfile:
+        csv.writer(csvfile).writerow(RESULT_CSV_HEADER)
+    
+    total_start_time = time.time()
+    
+    phase = "Setup" if is_setup else "Queries"
+    if metrics_exporter:
+        metrics_exporter.start_phase(sql_tool, database, phase.lower(), len(queries))
+    logger.info(f"\n{'='*50}\n{phase} Execution - {sql_tool} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+
+    with open(result_file_path, mode) as result_file:
+        # Add header for this execution
+        result_file.write(f"\n{'='*50}\n{phase} Execution - {sql_tool} - {datetime.now()}\n{'='*50}\n\n")
+
+        def measure(index, query, query_warehouse):
+            # Setup statements are never cancelled, a half-loaded table is worse than a slow one
+            timeout = None if is_setup else get_query_timeout(index + 1)
+            if metrics_exporter:
+                metrics_exporter.query_started(sql_tool, phase.lower(), index + 1)
+            result = measure_query(
+                index, query, len(queries), sql_tool, database, query_warehouse,
+                suspend, warmup, iterations, timeout, result_file, output_lock,
+                0.0 if is_setup else get_client_setup_time(sql_tool, database, query_warehouse),
+                qgen,
+            )
+            record(result)
+
+        def record(result):
+            with output_lock:
+                results.append(result)
+                if "error" not in result and result["server_time"] is not None:
+                    write_result_csv_row(csv_file_path, result)
+                if run_state is not None and not is_setup:
+                    run_state["queries"].append(result)
+                    save_run_state(run_state)
+            if metrics_exporter:
+                metrics_exporter.query_finished(sql_tool, phase.lower(), result)
+
+        def fail(index, query_warehouse, error):
+            # A query that escaped measure_query's own error handling
+            record({
+                "query_index": index + 1,
+                "warehouse": query_warehouse,
+                "status": "ERROR",
+                "error": str(error),
+                "total_time": 0.0,
+                "restart_time": 0,
+                "suspend_time": 0,
+                "resume_time": 0,
+                "server_time": 0.0,
+                "samples": [],
+                "stats": None,
+            })
+
+        pending = []
+        for index, query in enumerate(queries):
+            if index + 1 in completed:
+                result = completed[index + 1]
+                outcome = result["error"] if "error" in result else f"{result['server_time']}s"
+                logger.info(f"⏭️ Query {index+1}/{len(queries)} already measured in run {run_state['run_id']}: {outcome}")
+                if "error" not in result and result["server_time"] is not None:
+                    write_result_csv_row(csv_file_path, result)
+                results.append(result)
+                if metrics_exporter:
+                    metrics_exporter.query_finished(sql_tool, phase.lower(), result)
+            else:
+                pending.append((index, query))
+
+        if shards and not is_setup:
+            # A single shard still binds its DSN and warehouse instead of the defaults
+            if len(shards) > 1:
+                logger.info(f"🔀 Sharding {len(pending)} queries across {len(shards)} warehouses: {', '.join(name for name, _ in shards)}")
+            else:
+                logger.info(f"🔀 Running {len(pending)} queries on warehouse {shards[0][0]}")
+            execute_sharded(pending, shards, expected_durations or {}, measure, fail)
+        else:
+            for index, query in pending:
+                measure(index, query, warehouse)
+
+    results.sort(key=lambda r: r["query_index"])
+
+    if sql_tool == "bendsql" and not is_setup:
+        attach_query_log_metrics(results, database, time.time() - total_start_time)
+        write_result_csv(csv_file_path, results)
+    total_wall_time = time.time() - total_start_time
+    measured = [r for r in results if "error" not in r and r["server_time"] is not None]
+    successful_queries = len(measured)
+    total_execution_time = sum(r["server_time"] for r in measured)
+    total_restart_time = sum(r["restart_time"] for r in results)
+    total_suspend_time = sum(r.get("suspend_time", 0) for r in results)
+    total_resume_time = sum(r.get("resume_time", 0) for r in results)
+    timed_out_queries = [r["query_index"] for r in results if r.get("status") == "TIMEOUT"]
+    geomean_time = geometric_mean(r["server_time"] for r in measured)
+    
+    # Create ASCII table for query times
+    query_times_table = create_query_times_table(results, f"{phase} Query Execution Times:")
+    if suspend:
+        query_times_table += "\n\n" + create_cold_start_table(results, f"{phase} Cold Start Latencies:")
+    if any(r.get("timing") for r in results) and not is_setup:
+        query_times_table += "\n\n" + create_client_breakdown_table(results, f"{phase} Client Time Breakdown:")
+    if any(r.get("metrics") for r in results):
+        query_times_table += "\n\n" + create_query_metrics_table(results, f"{phase} Server Metrics (system.query_log):")
+    
+    # Print and write summary statistics
+    summary = f"""
+{phase} Execution Summary ({sql_tool}):
+----------------------------------------
+Total queries: {len(queries)}
+Successful queries: {successful_queries}
+Failed queries: {len(queries) - successful_queries}
+Timed out queries: {len(timed_out_queries)}{f" ({', '.join(map(str, timed_out_queries))})" if timed_out_queries else ""}
+Total server execution time: {total_execution_time:.2f}s
+Total warehouse restart time: {total_restart_time:.2f}s
+Total suspend time: {total_suspend_time:.2f}s
+Total resume-to-ready time: {total_resume_time:.2f}s
+Total wall clock time: {total_wall_time:.2f}s
+Average query time (server): {(total_execution_time / successful_queries if successful_queries else 0):.2f}s
+Geometric mean query time (server): {geomean_time:.2f}s
+{create_shard_summary(results) if shards and len(shards) > 1 and not is_setup else ""}
+{query_times_table}
+"""
+    
+    logger.info(summary)
+    with open(result_file_path, "a") as result_file:
+        result_file.write(summary)
+    
+    # Profile in a separate pass once all timings are taken
+    if qgen:
+        queries = [render_query(query, index + 1, qgen)[0] for index, query in enumerate(queries)]
+    flamegraph_stats = None
+    if flamegraph_enabled and sql_tool == "bendsql" and flamegraph_dir and not is_setup:
+        flamegraph_stats = collect_flamegraphs(queries, results, database, warehouse, flamegraph_dir, benchmark_case, flamegraph_parallelism)
+    plans = collect_query_plans(queries, results, sql_tool, database, warehouse) if capture_plans and not is_setup else {}
+    
+    return {
+        "flamegraph_stats": flamegraph_stats,
+        "total_execution_time": total_execution_time,
+        "total_wall_time": total_wall_time,
+        "total_restart_time": total_restart_time,
+        "geomean_time": geomean_time,
+        "successful_queries": successful_queries,
+        "timed_out_queries": timed_out_queries,
+        "total_queries": len(queries),
+        "results": results,
+        "plans": plans,
+    }
+
+
+def get_statement_table(statement):
+    """Return the table a setup statement creates or loads, or None."""
+    sql = "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--"))
+    match = re.match(
+        r"\s*(?:create\s+(?:or\s+replace\s+)?(?:transient\s+)?table(?:\s+if\s+not\s+exists)?"
+        r"|copy\s+into|insert\s+(?:into|overwrite)|alter\s+table|truncate\s+table"
+        r"|drop\s+table(?:\s+if\s+exists)?)\s+([\w.\"]+)",
+        sql,
+        re.IGNORECASE,
+    )
+    return match.group(1).strip('"').lower() if match else None
+
+
+def is_load_statement(statement):
+    """Whether a setup statement loads data rather than defining a table."""
+    sql = "\n".join(line for line in statement.splitlines() if not line.strip().startswith("--"))
+    return re.match(r"\s*(copy\s+into|insert)\b", sql, re.IGNORECASE) is not None
+
+
+def execute_table_setup(table, statements, sql_tool, database, warehouse):
+    """Run one table's setup statements in file order and measure its load."""
+    table_start_time = time.time()
+    stats = {
+        "table": table,
+        "statements": len(statements),
+        "successful_queries": 0,
+        "ddl_time": 0.0,
+        "load_time": 0.0,
+        "server_time": 0.0,
+        "rows": None,
+        "errors": [],
+    }
+
+    for statement in statements:
+        statement_start_time = time.time()
+        try:
+            server_time = execute_timed_sql(statement, sql_tool, database, warehouse)
+        except Exception as e:
+            logger.error(f"Setup for table {table} failed: {e}")
+            stats["errors"].append(str(e))
+            # Loading into a table whose DDL failed is pointless
+            break
+
+        elapsed_time = server_time if server_time is not None else time.time() - statement_start_time
+        stats["successful_queries"] += 1
+        stats["server_time"] += server_time or 0.0
+        if is_load_statement(statement):
+            stats["load_time"] += elapsed_time
+        else:
+            stats["ddl_time"] += elapsed_time
+
+    if stats["load_time"] > 0 and not stats["errors"]:
+        try:
+            rows = query_scalar(f"SELECT COUNT(*) FROM {table};", sql_tool, database, warehouse)
+            stats["rows"] = int(float(rows)) if rows else None
+        except Exception as e:
+            logger.warning(f"Failed to count rows of {table}: {e}")
+
+    stats["wall_time"] = time.time() - table_start_time
+    rows_info = f", {stats['rows']} rows" if stats["rows"] is not None else ""
+    logger.info(f"📦 Table {table} set up in {stats['wall_time']:.2f}s (load {stats['load_time']:.2f}s{rows_info})")
+    return stats
+
+
+def execute_setup_parallel(sql_file, sql_tool, database, warehouse, parallelism):
+    """Execute setup statements grouped by table through a bounded worker pool.
+
+    Statements of one table run serially in file order, so its DDL always
+    finishes before its load. Statements that touch no table run first.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    statements = load_queries(sql_file)
+    shared_statements = []
+    table_statements = {}
+    for statement in statements:
+        table = get_statement_table(statement)
+        if table is None:
+            shared_statements.append(statement)
+        else:
+            table_statements.setdefault(table, []).append(statement)
+
+    logger.info(f"\n{'='*50}\nSetup Execution - {sql_tool} - {len(table_statements)} tables, parallelism {parallelism} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+    total_start_time = time.time()
+
+    shared_stats = execute_table_setup("(shared)", shared_statements, sql_tool, database, warehouse) if shared_statements else None
+
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        futures = [
+            pool.submit(execute_table_setup, table, table_queries, sql_tool, database, warehouse)
+            for table, table_queries in table_statements.items()
+        ]
+        table_stats = [future.result() for future in futures]
+
+    total_wall_time = time.time() - total_start_time
+    all_stats = ([shared_stats] if shared_stats else []) + table_stats
+
+    table_data = []
+    for stats in table_stats:
+        rows_per_sec = stats["rows"] / stats["load_time"] if stats["rows"] and stats["load_time"] > 0 else 0
+        table_data.append([
+            stats["table"],
+            "ERROR" if stats["errors"] else "OK",
+            f"{stats['ddl_time']:.2f}",
+            f"{stats['load_time']:.2f}",
+            stats["rows"] if stats["rows"] is not None else "-",
+            f"{rows_per_sec:,.0f}" if rows_per_sec else "-",
+        ])
+    table_report = create_ascii_table(
+        table_data, ["Table", "Status", "DDL(s)", "Load(s)", "Rows", "Rows/s"],
+        f"Setup Load Times (parallelism {parallelism}, wall {total_wall_time:.2f}s):",
+    )
+    logger.info(f"\n{table_report}")
+
+    return {
+        "total_execution_time": sum(stats["server_time"] for stats in all_stats),
+        "total_wall_time": total_wall_time,
+        "total_restart_time": 0.0,
+        "successful_queries": sum(stats["successful_queries"] for stats in all_stats),
+        "total_queries": len(statements),
+        "tables": table_stats,
+        "table_report": table_report,
+    }
+
+
+def get_scale_factor(database):
+    """Guess the scale factor from a database name such as tpch_100."""
+    match = re.search(r"(\d+)$", database)
+    return int(match.group(1)) if match else 1
+
+
+def is_spec_stream_order(case, query_count):
+    """Whether streams of this suite run in the order the TPC spec defines."""
+    return case == 'tpch' and query_count == 22
+
+
+def get_stream_permutation(case, stream_id, query_count):
+    """Return the 1-based query order of a TPC query stream.
+
+    TPC-H streams follow Appendix A and are refused past the shipped table.
+    Other suites get a permutation seeded by the stream id, which is not the
+    spec order (see is_spec_stream_order).
+    """
+    if is_spec_stream_order(case, query_count):
+        if stream_id >= len(TPCH_STREAM_PERMUTATIONS):
+            raise ValueError(f"TPC-H stream {stream_id} has no Appendix A permutation, at most {len(TPCH_STREAM_PERMUTATIONS) - 1} streams are supported")
+        return list(TPCH_STREAM_PERMUTATIONS[stream_id])
+
+    # dsqgen derives TPC-DS stream orders from its own generator, so use a
+    # permutation seeded by the stream id to keep runs reproducible
+    order = list(range(1, query_count + 1))
+    random.Random(f"{case}-{stream_id}").shuffle(order)
+    return order
+
+
+def random_month(rng, first, last):
+    """Return the first day of a random month between two (year, month) pairs."""
+    months = (last[0] - first[0]) * 12 + last[1] - first[1]
+    year, month = divmod(first[0] * 12 + first[1] - 1 + rng.randint(0, months), 12)
+    return f"{year:04d}-{month + 1:02d}-01"
+
+
+def random_brand(rng):
+    return f"Brand#{rng.randint(1, 5)}{rng.randint(1, 5)}"
+
+
+def generate_tpch_parameters(query_number, rng, scale_factor):
+    """Draw the substitution parameters of a TPC-H query (clause 2.4, as qgen does).
+
+    Returns the values in placeholder order, so value N replaces :N in the
+    query template.
+    """
+    nations = [name for name, _ in TPCH_NATIONS]
+    if query_number == 1:
+        return [rng.randint(60, 120)]
+    if query_number == 2:
+        return [rng.randint(1, 50), rng.choice(TPCH_TYPES[2]), rng.choice(TPCH_REGIONS)]
+    if query_number == 3:
+        return [rng.choice(TPCH_SEGMENTS), f"1995-03-{rng.randint(1, 31):02d}"]
+    if query_number in (4, 15):
+        return [random_month(rng, (1993, 1), (1997, 10))]
+    if query_number == 5:
+        return [rng.choice(TPCH_REGIONS), f"{rng.randint(1993, 1997)}-01-01"]
+    if query_number == 6:
+        return [f"{rng.randint(1993, 1997)}-01-01", f"{rng.randint(2, 9) / 100:.2f}", rng.randint(24, 25)]
+    if query_number == 7:
+        return rng.sample(nations, 2)
+    if query_number == 8:
+        nation, region = rng.choice(TPCH_NATIONS)
+        return [nation, TPCH_REGIONS[region], " ".join(rng.choice(syllables) for syllables in TPCH_TYPES)]
+    if query_number == 9:
+        return [rng.choice(TPCH_COLORS)]
+    if query_number == 10:
+        return [random_month(rng, (1993, 2), (1995, 1))]
+    if query_number == 11:
+        return [rng.choice(nations), f"{0.0001 / scale_factor:.10f}"]
+    if query_number == 12:
+        return rng.sample(TPCH_SHIPMODES, 2) + [f"{rng.randint(1993, 1997)}-01-01"]
+    if query_number == 13:
+        return [rng.choice(["special", "pending", "unusual", "express"]), rng.choice(["packages", "requests", "accounts", "deposits"])]
+    if query_number == 14:
+        return [random_month(rng, (1993, 1), (1997, 12))]
+    if query_number == 16:
+        return [random_brand(rng), f"{rng.choice(TPCH_TYPES[0])} {rng.choice(TPCH_TYPES[1])}"] + rng.sample(range(1, 51), 8)
+    if query_number == 17:
+        return [random_brand(rng), " ".join(rng.choice(words) for words in TPCH_CONTAINERS)]
+    if query_number == 18:
+        return [rng.randint(312, 315)]
+    if query_number == 19:
+        return [random_brand(rng) for _ in range(3)] + [rng.randint(1, 10), rng.randint(10, 20), rng.randint(20, 30)]
+    if query_number == 20:
+        return [rng.choice(TPCH_COLORS), f"{rng.randint(1993, 1997)}-01-01", rng.choice(nations)]
+    if query_number == 21:
+        return [rng.choice(nations)]
+    if query_number == 22:
+        return [str(code) for code in rng.sample(range(10, 35), 7)]
+    return []
+
+
+def render_query(template, query_number, qgen, stream_id=0, iteration=0):
+    """Substitute fresh TPC-H parameters into a query template.
+
+    Parameters only depend on the qgen seed, the stream, the query and the
+    iteration, so a rerun with the same seed issues the same statements.
+    Returns (query, parameters); without qgen the template is returned as is.
+    """
+    if not qgen:
+        return template, None
+    rng = random.Random(f"qgen-{qgen['seed']}-{stream_id}-{query_number}-{iteration}")
+    values = generate_tpch_parameters(query_number, rng, qgen["scale_factor"])
+
+    def substitute(match):
+        position = int(match.group(1))
+        if position > len(values):
+            raise ValueError(f"Query {query_number} template uses :{position} but only {len(values)} parameters are defined")
+        return str(values[position - 1])
+
+    query = re.sub(r"(?<![:\w]):(\d+)", substitute, template)
+    return query, {f":{position}": value for position, value in enumerate(values, 1)}
+
+
+def format_query_parameters(parameters):
+    return ", ".join(f"{name}={value}" for name, value in parameters.items())
+
+
+def execute_query_stream(stream_id, queries, case, sql_tool, database, warehouse, qgen=None):
+    """Run one query stream serially in its permuted order, with its own qgen parameters."""
+    order = get_stream_permutation(case, stream_id, len(queries))
+    logger.info(f"🌊 Stream {stream_id} started - order: {' '.join(map(str, order))}")
+
+    stream_start_time = time.time()
+    results = []
+    for position, query_number in enumerate(order):
+        query_start_time = time.time()
+        parameters = None
+        if metrics_exporter:
+            metrics_exporter.query_started(sql_tool, "throughput", query_number)
+        try:
+            query, parameters = render_query(queries[query_number - 1], query_number, qgen, stream_id)
+            server_time = execute_timed_sql(
+                query, sql_tool, database, warehouse, get_query_timeout(query_number)
+            )
+            query_total_time = time.time() - query_start_time
+            logger.info(f"🌊 Stream {stream_id} [{position+1}/{len(order)}] Query {query_number}: {server_time}s{f' ({format_query_parameters(parameters)})' if parameters else ''}")
+            results.append({
+                "stream": stream_id,
+                "position": position + 1,
+                "query_index": query_number,
+                "server_time": server_time,
+                "total_time": query_total_time,
+                "parameters": parameters,
+            })
+        except Exception as e:
+            query_total_time = time.time() - query_start_time
+            logger.error(f"Stream {stream_id} Query {query_number} failed: {e}")
+            results.append({
+                "stream": stream_id,
+                "position": position + 1,
+                "query_index": query_number,
+                "status": "TIMEOUT" if isinstance(e, QueryTimeoutError) else "ERROR",
+                "error": str(e),
+                "server_time": 0.0,
+                "total_time": query_total_time,
+                "parameters": parameters,
+            })
+        if metrics_exporter:
+            metrics_exporter.query_finished(sql_tool, "throughput", results[-1])
+
+    elapsed_time = time.time() - stream_start_time
+    logger.info(f"🌊 Stream {stream_id} finished. Elapsed time: {elapsed_time:.2f}s")
+    return {"stream": stream_id, "elapsed_time": elapsed_time, "results": results}
+
+
+def run_throughput_test(sql_file, streams, case, sql_tool, database, warehouse, result_tag=None, qgen=None):
+    """Run the TPC throughput test: streams 1..N concurrently, each in its own order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    queries = load_queries(sql_file)
+    if metrics_exporter:
+        metrics_exporter.start_phase(sql_tool, database, "throughput", streams * len(queries))
+    logger.info(f"\n{'='*50}\nThroughput Test - {streams} streams - {sql_tool} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=streams) as pool:
+        futures = [
+            pool.submit(execute_query_stream, stream_id, queries, case, sql_tool, database, warehouse, qgen)
+            for stream_id in range(1, streams + 1)
+        ]
+        stream_stats = [future.result() for future in futures]
+    throughput_time = time.time() - start_time
+
+    all_results = [r for stream in stream_stats for r in stream["results"]]
+    successful_queries = sum(1 for r in all_results if "error" not in r and r["server_time"] is not None)
+
+    csv_file_path = get_log_path("throughput_result.csv", result_tag)
+    with open(csv_file_path, "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Stream", "Position", "Query", "Time(s)", "Status", "Parameters"])
+        for r in all_results:
+            csv_writer.writerow([
+                r["stream"], r["position"], r["query_index"], r["server_time"],
+                r.get("status", "ERROR") if "error" in r else "OK",
+                json.dumps(r["parameters"]) if r.get("parameters") else "",
+            ])
+
+    return {
+        "streams": streams,
+        "query_count": len(queries),
+        "throughput_time": throughput_time,
+        "stream_stats": stream_stats,
+        "successful_queries": successful_queries,
+        "total_queries": len(all_results),
+    }
+
+
+def compute_tpc_metrics(case, scale_factor, power_stats, throughput_stats, load_time=None):
+    """Compute the TPC power, throughput and composite metrics.
+
+    Only the query streams are run: TPC-H refresh functions and TPC-DS data
+    maintenance are not part of benchsb, so the results are indicative and
+    not comparable with audited TPC results. Every component carries a note
+    saying why it departs from the spec, empty when it does not.
+    """
+    streams = throughput_stats["streams"]
+    query_count = throughput_stats["query_count"]
+    throughput_time = throughput_stats["throughput_time"]
+    stream_order = "" if is_spec_stream_order(case, query_count) else ", seeded stream order"
+
+    if case == 'tpch':
+        power_times = [
+            r["server_time"] for r in power_stats["results"]
+            if "error" not in r and r["server_time"]
+        ]
+        power = 3600 * scale_factor / geometric_mean(power_times) if power_times else 0.0
+        throughput = streams * query_count * 3600 / throughput_time * scale_factor
+        return {
+            "metric_name": f"QphH@{scale_factor}GB",
+            "composite": math.sqrt(power * throughput),
+            "composite_note": f"{NON_COMPLIANT_METRIC}: no refresh functions{stream_order}",
+            "components": [
+                ["Power@Size", f"{power:.1f}", f"{NON_COMPLIANT_METRIC}: no RF1/RF2, file query order"],
+                ["Throughput@Size", f"{throughput:.1f}", f"{NON_COMPLIANT_METRIC}: no refresh stream{stream_order}"],
+                ["Ts (s)", f"{throughput_time:.2f}", f"{NON_COMPLIANT_METRIC}: no refresh stream{stream_order}"],
+            ],
+        }
+
+    # TPC-DS: SF * Q / geomean(T_PT, T_TT[, T_LD]) with all times in hours
+    power_time = power_stats["total_wall_time"] - power_stats["total_restart_time"]
+    time_components = [
+        ["T_PT (h)", power_time * streams / 3600, f"{NON_COMPLIANT_METRIC}: file query order"],
+        ["T_TT (h)", throughput_time / 3600, f"{NON_COMPLIANT_METRIC}: no data maintenance{stream_order}"],
+    ]
+    if load_time:
+        time_components.append(["T_LD (h)", 0.01 * streams * load_time / 3600, ""])
+    composite = scale_factor * streams * query_count / geometric_mean(v for _, v, _ in time_components)
+    return {
+        "metric_name": f"QphDS@{scale_factor}",
+        "composite": composite,
+        "composite_note": f"{NON_COMPLIANT_METRIC}: no T_DM{stream_order}",
+        "components": [[name, f"{value:.4f}", note] for name, value, note in time_components],
+    }
+
+
+def create_throughput_report(throughput_stats, metrics):
+    """Create the per-stream and composite metric tables of the throughput test."""
+    stream_data = []
+    for stream in throughput_stats["stream_stats"]:
+        successful = sum(1 for r in stream["results"] if "error" not in r)
+        stream_data.append([stream["stream"], f"{successful}/{len(stream['results'])}", f"{stream['elapsed_time']:.2f}"])
+    stream_table = create_ascii_table(
+        stream_data, ["Stream", "Successful", "Elapsed(s)"],
+        f"Throughput Test ({throughput_stats['streams']} streams, total {throughput_stats['throughput_time']:.2f}s):",
+    )
+
+    metric_data = metrics["components"] + [[metrics["metric_name"], f"{metrics['composite']:.1f}", metrics["composite_note"]]]
+    metric_table = create_ascii_table(metric_data, ["Metric", "Value", "Compliance"], "TPC Metrics (queries only, no refresh/maintenance):")
+    return f"{stream_table}\n\n{metric_table}"
+
+
+def fetch_result_cli(query, sql_tool, database, warehouse, output_format, timeout=None):
+    """Fetch a full result set through the SQL client CLI in a text format.
+
+    Output is streamed and counted, never kept. Returns rows, bytes, wall,
+    first_byte and peak_memory, the peak RSS of the client process. After
+    timeout seconds the client is killed and the tagged query is cancelled
+    on the server (QueryTimeoutError).
+    """
+    import tempfile
+
+    if timeout:
+        tag = uuid.uuid4().hex
+        query = f"/* benchsb:{tag} */ {query}"
+    if sql_tool == "bendsql":
+        command = ["bendsql", "--query=" + query, "--database=" + database, "--output=" + output_format]
+        dsn = getattr(bendsql_dsn_local, "dsn", None)
+        if dsn:
+            command.append("--dsn=" + dsn)
+    else:
+        command = [
+            "snowsql", "--warehouse", warehouse, "--schemaname", "PUBLIC", "--dbname", database,
+            "-o", f"output_format={output_format}", "-o", "header=false", "-o", "timing=false",
+            "-o", "friendly=false", "-o", "progress_bar=false", "-q", query,
+        ]
+
+    killed = threading.Event()
+    # The killer thread must cancel on the warehouse this thread runs on
+    dsn = getattr(bendsql_dsn_local, "dsn", None)
+
+    def kill():
+        killed.set()
+        process.kill()
+        # Killing the client leaves the query running on the server
+        bendsql_dsn_local.dsn = dsn
+        logger.warning(f"⏰ Fetch exceeded its {timeout:.0f}s timeout, cancelling it on the server")
+        try:
+            cancel_query(tag, sql_tool, database, warehouse)
+        except Exception as e:
+            logger.error(f"Failed to cancel query tagged {tag}: {e}")
+
+    # stderr goes to a file so a chatty client cannot block on a full pipe
+    with tempfile.TemporaryFile(mode="w+") as stderr_file:
+        start_time = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        killer = threading.Timer(timeout, kill) if timeout else None
+        if killer:
+            killer.daemon = True
+            killer.start()
+        first_byte_time = None
+        rows = 0
+        size = 0
+        try:
+            while True:
+                chunk = process.stdout.read(FETCH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if first_byte_time is None:
+                    first_byte_time = time.perf_counter()
+                rows += chunk.count(b"\n")
+                size += len(chunk)
+            # wait4 reports the rusage of this very child, ru_maxrss is in KiB on Linux
+            _, status, rusage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        finally:
+            if killer:
+                killer.cancel()
+            # Never leave a client streaming into a pipe nobody reads
+            if process.returncode is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        end_time = time.perf_counter()
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+
+    if killed.is_set():
+        # Do not start the next fetch before the server has let go of this one
+        killer.join()
+        raise QueryTimeoutError(f"TIMEOUT after {timeout:.0f}s")
+    if process.returncode != 0:
+        raise RuntimeError(f"{sql_tool} fetch failed with return code {process.returncode}: {stderr}")
+
+    return {
+        "rows": rows,
+        "bytes": size,
+        "wall": end_time - start_time,
+        "first_byte": (first_byte_time or end_time) - start_time,
+        "peak_memory": rusage.ru_maxrss * 1024,
+    }
+
+
+def get_current_rss():
+    """Return this process' current resident set size in bytes, or None where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def fetch_result_driver(query, database):
+    """Fetch a full result set through the databend-driver session.
+
+    Rows are decoded into Python values, bytes is their text size. The
+    session lives in this process, so the client memory is the peak growth
+    of the current RSS over its value at submit, sampled in a thread while
+    the rows are fetched (None where the RSS cannot be read).
+    """
+    conn = get_driver_connection(database)
+    rss_before = get_current_rss()
+    peak_rss = [rss_before]
+    stop_sampling = threading.Event()
+
+    def sample_rss():
+        while not stop_sampling.wait(FETCH_RSS_SAMPLE_INTERVAL):
+            peak_rss[0] = max(peak_rss[0], get_current_rss())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True) if rss_before is not None else None
+    if sampler:
+        sampler.start()
+    start_time = time.perf_counter()
+    first_byte_time = None
+    rows = 0
+    size = 0
+    try:
+        for row in conn.query_iter(query):
+            if first_byte_time is None:
+                first_byte_time = time.perf_counter()
+            rows += 1
+            size += sum(len(str(value)) for value in row.values())
+    except Exception as e:
+        raise RuntimeError(f"databend-driver fetch failed: {e}")
+    finally:
+        if sampler:
+            stop_sampling.set()
+            sampler.join()
+    end_time = time.perf_counter()
+
+    return {
+        "rows": rows,
+        "bytes": size,
+        "wall": end_time - start_time,
+        "first_byte": (first_byte_time or end_time) - start_time,
+        "peak_memory": max(peak_rss[0], get_current_rss()) - rss_before if sampler else None,
+    }
+
+
+def get_fetch_formats(sql_tool, formats):
+    """Return the result formats a fetch test can use with an engine's backend."""
+    if sql_tool == "bendsql" and bend_backend == "driver":
+        return ["driver"]
+    supported = FETCH_FORMATS[sql_tool]
+    selected = [f for f in formats if f in supported]
+    for f in formats:
+        if f not in supported:
+            logger.warning(f"⚠️ {sql_tool} cannot fetch results as {f}, skipping it")
+    return selected or [supported[0]]
+
+
+def run_fetch_test(sql_file, sql_tool, database, warehouse, formats, warmup=0, iterations=1, result_tag=None):
+    """Fetch every query's full result set in every format and measure client throughput.
+
+    Returns queries stats in the shape execute_sql_file returns, timed by the
+    fetch wall time of the first format, with the per-format report attached.
+    """
+    queries = load_queries(sql_file)
+    formats = get_fetch_formats(sql_tool, formats)
+    logger.info(f"\n{'='*50}\nFetch Test - {sql_tool} - formats: {', '.join(formats)} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+
+    start_time = time.time()
+    results = []
+    fetches = []
+    for index, query in enumerate(queries):
+        for output_format in formats:
+            logger.info(f"\nFetch {index+1}/{len(queries)} [{output_format}] - Started at {datetime.now().strftime('%H:%M:%S')}")
+            logger.info(f"SQL: {query}")
+            samples = []
+            try:
+                for run in range(warmup + iterations):
+                    if output_format == "driver":
+                        fetch = fetch_result_driver(query, database)
+                    else:
+                        fetch = fetch_result_cli(query, sql_tool, database, warehouse, output_format, get_query_timeout(index + 1))
+                    if run >= warmup:
+                        samples.append(fetch)
+            except Exception as e:
+                logger.error(f"Fetch {index+1} [{output_format}] failed: {e}")
+                fetches.append({"query_index": index + 1, "format": output_format, "error": str(e)})
+                if output_format == formats[0]:
+                    status = "TIMEOUT" if isinstance(e, QueryTimeoutError) else "ERROR"
+                    results.append({"query_index": index + 1, "status": status, "error": str(e), "server_time": 0.0, "samples": [], "stats": None, "restart_time": 0})
+                continue
+
+            fetch = {
+                key: statistics.median(sample[key] for sample in samples)
+                for key in ("rows", "bytes", "wall", "first_byte")
+            }
+            peak_memories = [sample["peak_memory"] for sample in samples if sample["peak_memory"] is not None]
+            fetch["peak_memory"] = statistics.median(peak_memories) if peak_memories else None
+            fetch.update({"query_index": index + 1, "format": output_format})
+            fetches.append(fetch)
+            logger.info(
+                f"Fetch {index+1} [{output_format}]: {fetch['rows']:,.0f} rows, {format_bytes(fetch['bytes'])} in {fetch['wall']:.2f}s "
+                f"({fetch['rows'] / fetch['wall']:,.0f} rows/s, {fetch['bytes'] / fetch['wall'] / 1e6:.1f} MB/s), client peak {format_bytes(fetch['peak_memory']) if fetch['peak_memory'] is not None else '-'}"
+            )
+            if output_format == formats[0]:
+                walls = [sample["wall"] for sample in samples]
+                stats = compute_query_statistics(walls)
+                results.append({"query_index": index + 1, "server_time": stats["median"], "samples": walls, "stats": stats, "restart_time": 0})
+
+    with open(get_log_path("fetch_result.csv", result_tag), "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Query", "Format", "Rows", "Bytes", "Wall(s)", "First Byte(s)", "Rows/s", "MB/s", "Client Peak Memory", "Error"])
+        for f in fetches:
+            if "error" in f:
+                csv_writer.writerow([f["query_index"], f["format"], "", "", "", "", "", "", "", f["error"]])
+            else:
+                csv_writer.writerow([
+                    f["query_index"], f["format"], f["rows"], f["bytes"], f["wall"], f["first_byte"],
+                    f["rows"] / f["wall"], f["bytes"] / f["wall"] / 1e6, f["peak_memory"], "",
+                ])
+
+    table_data = [
+        [f["query_index"], f["format"], "ERROR", "-", "-", "-", "-", "-", "-"] if "error" in f else [
+            f["query_index"], f["format"], f"{f['rows']:,.0f}", format_bytes(f["bytes"]),
+            f"{f['wall']:.2f}", f"{f['first_byte']:.2f}", f"{f['rows'] / f['wall']:,.0f}",
+            f"{f['bytes'] / f['wall'] / 1e6:.1f}", format_bytes(f["peak_memory"]) if f["peak_memory"] is not None else "-",
+        ]
+        for f in fetches
+    ]
+    report = create_ascii_table(
+        table_data,
+        ["Query", "Format", "Rows", "Bytes", "Wall(s)", "First Byte(s)", "Rows/s", "MB/s", "Client Peak"],
+        f"Result Fetch Throughput ({sql_tool}):",
+    )
+    logger.info(f"\n{report}")
+
+    measured = [r for r in results if "error" not in r]
+    return {
+        "flamegraph_stats": None,
+        "total_execution_time": sum(r["server_time"] for r in measured),
+        "total_wall_time": time.time() - start_time,
+        "total_restart_time": 0.0,
+        "geomean_time": geometric_mean(r["server_time"] for r in measured),
+        "successful_queries": len(measured),
+        "timed_out_queries": [r["query_index"] for r in results if r.get("status") == "TIMEOUT"],
+        "total_queries": len(queries),
+        "results": results,
+        "case_report": report,
+    }
+
+
+def parse_positive_int(value):
+    """Parse a count that must be at least 1, such as --iterations."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def parse_non_negative_int(value):
+    """Parse a count that may be 0, such as --warmup."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return number
+
+
+def parse_scale_factor(value):
+    """Parse a scale factor, keeping whole ones integral (SF100, not SF100.0)."""
+    scale_factor = float(value)
+    if scale_factor <= 0:
+        raise argparse.ArgumentTypeError(f"scale factor must be positive, got {value}")
+    return int(scale_factor) if scale_factor.is_integer() else scale_factor
+
+
+def parse_warehouse_size(value):
+    """Parse a warehouse size such as X-Small or xlarge into a WAREHOUSE_SIZE_NODES key."""
+    size = normalize_warehouse_size(value.strip())
+    if size not in WAREHOUSE_SIZE_NODES:
+        raise argparse.ArgumentTypeError(f"unknown warehouse size {value}")
+    return size
+
+
+def parse_ingest_formats(value):
+    """Parse --ingest-formats "csv,csv:gzip,parquet" into (format, compression) pairs."""
+    variants = []
+    for spec in value.split(","):
+        if not spec.strip():
+            continue
+        file_format, _, compression = spec.strip().lower().partition(":")
+        if file_format not in INGEST_FORMATS:
+            raise argparse.ArgumentTypeError(f"unknown ingest format '{file_format}', expected one of {', '.join(INGEST_FORMATS)}")
+        compression = compression or INGEST_FORMATS[file_format]
+        if compression not in INGEST_COMPRESSIONS:
+            raise argparse.ArgumentTypeError(f"unknown compression '{compression}', expected one of {', '.join(INGEST_COMPRESSIONS)}")
+        variants.append((file_format, compression))
+    if not variants:
+        raise argparse.ArgumentTypeError("expected at least one FORMAT[:COMPRESSION]")
+    return list(dict.fromkeys(variants))
+
+
+def get_ingest_file_format(sql_tool, file_format, compression, unload):
+    """Return the FILE_FORMAT options (and COPY options) of a staged variant."""
+    if file_format == "csv":
+        return f"FILE_FORMAT = (TYPE = CSV, FIELD_DELIMITER = '|', COMPRESSION = {compression.upper()})"
+    if file_format == "parquet":
+        # Parquet readers find the codec in the file itself
+        options = f"TYPE = PARQUET, COMPRESSION = {compression.upper()}" if unload else "TYPE = PARQUET"
+    else:
+        options = f"TYPE = {'JSON' if sql_tool == 'snowsql' else 'NDJSON'}, COMPRESSION = {compression.upper()}"
+    if sql_tool == "snowsql":
+        # Snowflake keeps Parquet column names only with HEADER and maps
+        # semi-structured files onto table columns only by name
+        return f"FILE_FORMAT = ({options}) HEADER = TRUE" if unload else f"FILE_FORMAT = ({options}) MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE"
+    return f"FILE_FORMAT = ({options})"
+
+
+def get_stage_size(sql_tool, database, warehouse, location):
+    """Return the file count and total bytes under a stage location."""
+    if sql_tool == "bendsql":
+        listing = f"list_stage(location => '{location}')"
+        files = query_scalar(f"SELECT COUNT(*) FROM {listing};", sql_tool, database, warehouse)
+        size = query_scalar(f"SELECT COALESCE(SUM(size), 0) FROM {listing};", sql_tool, database, warehouse)
+    else:
+        listing = f"LIST {location}; SELECT {{}} FROM TABLE(RESULT_SCAN(LAST_QUERY_ID()));"
+        files = query_scalar(listing.format("COUNT(*)"), sql_tool, database, warehouse)
+        size = query_scalar(listing.format('COALESCE(SUM("size"), 0)'), sql_tool, database, warehouse)
+    return int(float(files or 0)), int(float(size or 0))
+
+
+def get_ingest_file_size(sql_tool, uncompressed_size, file_count):
+    """Return (MAX_FILE_SIZE, single) cutting a table into about file_count files within the engine's limit.
+
+    Logs when the limit forces more files than requested.
+    """
+    limit = INGEST_MAX_FILE_SIZE.get(sql_tool)
+    max_file_size = max(math.ceil(uncompressed_size / file_count), INGEST_MIN_FILE_SIZE)
+    if limit and max_file_size > limit:
+        logger.warning(f"⚠️ Cannot stage {format_bytes(uncompressed_size)} as {file_count} file(s) within the {format_bytes(limit)} MAX_FILE_SIZE limit of {sql_tool}, staging at least {math.ceil(uncompressed_size / limit)} files instead")
+        return limit, False
+    if file_count > 1 and max_file_size * (file_count - 1) >= uncompressed_size:
+        logger.warning(f"⚠️ {format_bytes(uncompressed_size)} is too small for {file_count} files of at least {format_bytes(INGEST_MIN_FILE_SIZE)}, staging fewer files")
+    return max_file_size, file_count == 1
+
+
+def stage_ingest_variant(sql_tool, database, warehouse, table, location, file_format, compression, max_file_size, single=False):
+    """Unload a table to a stage location in one format, replacing earlier files."""
+    source = f"(SELECT OBJECT_CONSTRUCT(*) FROM {table})" if sql_tool == "snowsql" and file_format == "ndjson" else table
+    # SINGLE = TRUE still needs MAX_FILE_SIZE, Snowflake would cap the file at 16 MB
+    size_option = f"MAX_FILE_SIZE = {max_file_size}{' SINGLE = TRUE' if single else ''}"
+    execute_sql(f"REMOVE {location};", sql_tool, database, warehouse)
+    start_time = time.time()
+    execute_timed_sql(
+        f"COPY INTO {location} FROM {source} {get_ingest_file_format(sql_tool, file_format, compression, unload=True)} {size_option};",
+        sql_tool, database, warehouse,
+    )
+    files, size = get_stage_size(sql_tool, database, warehouse, location)
+    logger.info(f"📤 Staged {table} as {file_format}/{compression}: {files} files, {format_bytes(size)} in {time.time() - start_time:.2f}s")
+    return files, size
+
+
+def run_ingest_test(sql_tool, database, warehouse, tables, variants, file_counts, stage, warmup=0, iterations=1, result_tag=None):
+    """Load TPC-H tables from stage with COPY INTO in every format and file count.
+
+    Each table is first unloaded once per variant from the loaded database,
+    then loaded warmup + iterations times into an empty copy of itself.
+    Uncompressed throughput is taken against the table's uncompressed CSV
+    size, so it compares formats on the same logical data volume.
+    """
+    logger.info(f"\n{'='*50}\nIngest Test - {sql_tool} - {len(tables)} tables, {len(variants)} formats, file counts {', '.join(map(str, file_counts))} - Started at {datetime.now().strftime('%H:%M:%S')}\n{'='*50}")
+    start_time = time.time()
+    execute_sql(f"CREATE STAGE IF NOT EXISTS {stage};", sql_tool, database, warehouse)
+
+    results = []
+    loads = []
+    for table in tables:
+        base = f"@{stage}/{database}/{table}"
+        try:
+            # The uncompressed reference is the table as plain pipe-delimited CSV
+            _, uncompressed_size = stage_ingest_variant(sql_tool, database, warehouse, table, f"{base}/reference/", "csv", "none", INGEST_REFERENCE_FILE_SIZE)
+        except Exception as e:
+            logger.error(f"Staging reference CSV of {table} failed, skipping the table: {e}")
+            continue
+
+        for file_format, compression in variants:
+            for file_count in file_counts:
+                label = f"{file_format}/{compression}"
+                query_index = len(loads) + 1
+                load = {"query_index": query_index, "table": table, "format": label, "target_files": file_count}
+                loads.append(load)
+                logger.info(f"\nIngest {query_index}: {table} as {label}, {file_count} files - Started at {datetime.now().strftime('%H:%M:%S')}")
+                location = f"{base}/{file_format}_{compression}_{file_count}/"
+                target = f"{table}_ingest"
+                samples = []
+                try:
+                    # Files are cut by size, so aim at the target count from the uncompressed size
+                    max_file_size, single = get_ingest_file_size(sql_tool, uncompressed_size, file_count)
+                    load["files"], load["bytes"] = stage_ingest_variant(sql_tool, database, warehouse, table, location, file_format, compression, max_file_size, single)
+                    copy_statement = f"COPY INTO {target} FROM {location} {get_ingest_file_format(sql_tool, file_format, compression, unload=False)} FORCE = TRUE;"
+                    for run in range(warmup + iterations):
+                        execute_sql(f"CREATE OR REPLACE TABLE {target} LIKE {table};", sql_tool, database, warehouse)
+                        load_start_time = time.time()
+                        server_time = execute_timed_sql(copy_statement, sql_tool, database, warehouse)
+                        elapsed_time = server_time if server_time is not None else time.time() - load_start_time
+                        if run < warmup:
+                            logger.info(f"  - Warmup {run+1}/{warmup}: {elapsed_time:.2f}s")
+                            continue
+                        samples.append(elapsed_time)
+                        logger.info(f"  - Load {run+1-warmup}/{iterations}: {elapsed_time:.2f}s")
+                    rows = query_scalar(f"SELECT COUNT(*) FROM {target};", sql_tool, database, warehouse)
+                    load["rows"] = int(float(rows)) if rows else None
+                except Exception as e:
+                    logger.error(f"Ingest {query_index} ({table} as {label}) failed: {e}")
+                    load["error"] = str(e)
+                    results.append({"query_index": query_index, "status": "ERROR", "error": str(e), "server_time": 0.0, "samples": [], "stats": None, "restart_time": 0})
+                    continue
+
+                stats = compute_query_statistics(samples)
+                load["load_time"] = stats["median"]
+                load["uncompressed_bytes"] = uncompressed_size
+                results.append({"query_index": query_index, "server_time": stats["median"], "samples": samples, "stats": stats, "restart_time": 0})
+                rows_info = f"{load['rows'] / load['load_time']:,.0f} rows/s, " if load["rows"] and load["load_time"] > 0 else ""
+                logger.info(f"📥 Ingest {query_index}: {table} as {label} loaded in {load['load_time']:.2f}s ({rows_info}{load['bytes'] / load['load_time'] / 1e6:.1f} compressed MB/s)")
+
+        try:
+            execute_sql(f"DROP TABLE IF EXISTS {table}_ingest;", sql_tool, database, warehouse)
+        except Exception as e:
+            logger.warning(f"Failed to drop {table}_ingest: {e}")
+
+    def rate(value, load):
+        return value / load["load_time"] if value and load.get("load_time") else None
+
+    with open(get_log_path("ingest_result.csv", result_tag), "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Ingest", "Table", "Format", "Target Files", "Files", "Rows", "Compressed Bytes", "Uncompressed Bytes", "Load(s)", "Rows/s", "Compressed MB/s", "Uncompressed MB/s", "Error"])
+        for load in loads:
+            if "error" in load:
+                csv_writer.writerow([load["query_index"], load["table"], load["format"], load["target_files"], "", "", "", "", "", "", "", "", load["error"]])
+                continue
+            compressed_rate = rate(load["bytes"], load)
+            uncompressed_rate = rate(load["uncompressed_bytes"], load)
+            csv_writer.writerow([
+                load["query_index"], load["table"], load["format"], load["target_files"], load["files"], load["rows"],
+                load["bytes"], load["uncompressed_bytes"], load["load_time"], rate(load["rows"], load),
+                compressed_rate / 1e6 if compressed_rate else None, uncompressed_rate / 1e6 if uncompressed_rate else None, "",
+            ])
+
+    table_data = []
+    for load in loads:
+        if "error" in load:
+            table_data.append([load["query_index"], load["table"], load["format"], load["target_files"], "ERROR", "-", "-", "-", "-", "-", "-"])
+            continue
+        rows_per_sec = rate(load["rows"], load)
+        compressed_rate = rate(load["bytes"], load)
+        uncompressed_rate = rate(load["uncompressed_bytes"], load)
+        table_data.append([
+            load["query_index"], load["table"], load["format"], load["target_files"], load["files"],
+            f"{load['rows']:,}" if load["rows"] is not None else "-",
+            format_bytes(load["bytes"]), f"{load['load_time']:.2f}",
+            f"{rows_per_sec:,.0f}" if rows_per_sec else "-",
+            f"{compressed_rate / 1e6:.1f}" if compressed_rate else "-",
+            f"{uncompressed_rate / 1e6:.1f}" if uncompressed_rate else "-",
+        ])
+    report = create_ascii_table(
+        table_data,
+        ["Ingest", "Table", "Format", "Target Files", "Files", "Rows", "Staged", "Load(s)", "Rows/s", "Compressed MB/s", "Uncompressed MB/s"],
+        f"COPY INTO Ingest Throughput ({sql_tool}):",
+    )
+    logger.info(f"\n{report}")
+
+    measured = [r for r in results if "error" not in r]
+    return {
+        "flamegraph_stats": None,
+        "total_execution_time": sum(r["server_time"] for r in measured),
+        "total_wall_time": time.time() - start_time,
+        "total_restart_time": 0.0,
+        "geomean_time": geometric_mean(r["server_time"] for r in measured),
+        "successful_queries": len(measured),
+        "timed_out_queries": [],
+        "total_queries": len(loads),
+        "results": results,
+        "case_report": report,
+    }
+
+
+# Per-process comment text pools of the TPC-H generator, keyed by seed
+tpch_text_pools = {}
+
+
+def get_tpch_text_pool(seed):
+    """Build the comment text pool from the TPC-H grammar, like dbgen does.
+
+    Comments are random substrings of the pool. It is cached per process and
+    derived from the seed only, so every worker builds the same pool.
+    """
+    if seed in tpch_text_pools:
+        return tpch_text_pools[seed]
+    rng = random.Random(f"tpch-text-{seed}")
+    words = {kind: [w.replace("_", " ") for w in text.split()] for kind, text in TPCH_GRAMMAR.items()}
+    noun_phrases = ["noun", "adjective noun", "adjective, adjective noun", "adverb adjective noun"]
+    verb_phrases = ["verb", "auxiliary verb", "verb adverb", "auxiliary verb adverb"]
+    sentences = ["NP VP", "NP VP PP", "NP VP NP", "NP PP VP NP", "NP PP VP PP"]
+
+    def phrase(pattern):
+        return " ".join(rng.choice(words[token.rstrip(",")]) + token[len(token.rstrip(",")):] for token in pattern.split())
+
+    parts = []
+    size = 0
+    while size < TPCH_TEXT_POOL_SIZE:
+        sentence = []
+        for element in rng.choice(sentences).split():
+            if element == "NP":
+                sentence.append(phrase(rng.choice(noun_phrases)))
+            elif element == "VP":
+                sentence.append(phrase(rng.choice(verb_phrases)))
+            else:
+                sentence.append(f"{rng.choice(words['preposition'])} the {phrase(rng.choice(noun_phrases))}")
+        text = " ".join(sentence) + rng.choice(words["terminator"])
+        parts.append(text)
+        size += len(text) + 1
+    tpch_text_pools[seed] = " ".join(parts)
+    return tpch_text_pools[seed]
+
+
+def generate_text(rng, pool, count, min_length, max_length):
+    """Draw count comments of min_length..max_length characters from the text pool."""
+    offsets = rng.integers(0, len(pool) - max_length, count).tolist()
+    lengths = rng.integers(min_length, max_length + 1, count).tolist()
+    return [pool[offset:offset + length] for offset, length in zip(offsets, lengths)]
+
+
+def generate_vstring(rng, count, min_length, max_length):
+    """Draw random alphanumeric strings, e.g. addresses (clause 4.2.2.7)."""
+    import numpy as np
+
+    alphabet = np.frombuffer(b"0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ ,", dtype=np.uint8)
+    chars = alphabet[rng.integers(0, len(alphabet), (count, max_length))]
+    lengths = rng.integers(min_length, max_length + 1, count).tolist()
+    return [value[:length].decode() for value, length in zip(chars.view(f"S{max_length}").ravel().tolist(), lengths)]
+
+
+def generate_phone(rng, nation_keys):
+    """Phone numbers whose country code is the nation key plus 10."""
+    count = len(nation_keys)
+    return join_string_columns(
+        "-", nation_keys + 10, rng.integers(100, 1000, count), rng.integers(100, 1000, count), rng.integers(1000, 10000, count),
+    )
+
+
+def join_string_columns(separator, *columns):
+    """Concatenate the string forms of equally long arrays element-wise."""
+    import numpy as np
+
+    joined = np.asarray(columns[0]).astype(str)
+    for column in columns[1:]:
+        joined = np.char.add(np.char.add(joined, separator), np.asarray(column).astype(str))
+    return joined
+
+
+def generate_key_names(prefix, keys):
+    """Names such as Supplier#000000001 (clause 4.2.3)."""
+    import numpy as np
+
+    return np.char.add(prefix, np.char.zfill(keys.astype(str), 9))
+
+
+def get_tpch_row_counts(scale_factor):
+    """Rows per TPC-H table at a scale factor; lineitem is derived from orders."""
+    counts = {table: max(int(base * scale_factor), 1) for table, base in TPCH_BASE_ROWS.items()}
+    counts.update({"region": len(TPCH_REGIONS), "nation": len(TPCH_NATIONS), "partsupp": counts["part"] * 4})
+    return counts
+
+
+def get_tpch_suppliers(part_keys, index, supplier_count):
+    """The index-th (0..3) supplier of parts, spread as clause 4.2.3 prescribes."""
+    return (part_keys + index * (supplier_count // 4 + (part_keys - 1) // supplier_count)) % supplier_count + 1
+
+
+def get_tpch_retail_price(part_keys):
+    """Retail price of parts in cents (clause 4.2.3)."""
+    return 90000 + ((part_keys // 10) % 20001) + 100 * (part_keys % 1000)
+
+
+def generate_tpch_chunk(table, chunk_index, start, count, scale_factor, seed):
+    """Generate one chunk of a TPC-H table as {table: {column: array}}.
+
+    start and count are 0-based row offsets, of parts for partsupp and of
+    orders for orders, which also yields those orders' line items. Every
+    chunk has its own random stream, so the data only depends on the seed and
+    the chunk size, never on the number of workers.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng([seed, list(TPCH_SCHEMA).index(table), chunk_index])
+    pool = get_tpch_text_pool(seed)
+    counts = get_tpch_row_counts(scale_factor)
+    keys = np.arange(start + 1, start + count + 1, dtype=np.int64)
+
+    if table == "region":
+        return {"region": {
+            "r_regionkey": np.arange(count), "r_name": np.array(TPCH_REGIONS),
+            "r_comment": generate_text(rng, pool, count, 31, 115),
+        }}
+    if table == "nation":
+        return {"nation": {
+            "n_nationkey": np.arange(count), "n_name": np.array([name for name, _ in TPCH_NATIONS]),
+            "n_regionkey": np.array([region for _, region in TPCH_NATIONS]),
+            "n_comment": generate_text(rng, pool, count, 31, 114),
+        }}
+    if table == "supplier":
+        nation_keys = rng.integers(0, len(TPCH_NATIONS), count)
+        comments = generate_text(rng, pool, count, 25, 100)
+        # Query 16 looks for suppliers with "Customer ... Complaints"; 5 per SF
+        # complain and 5 per SF are recommended (clause 4.2.3)
+        for index in np.flatnonzero(rng.random(count) < 10 / TPCH_BASE_ROWS["supplier"]).tolist():
+            comment = comments[index]
+            word = "Complaints" if rng.random() < 0.5 else "Recommends"
+            comments[index] = f"{comment[:len(comment) // 2]}Customer {word}{comment[len(comment) // 2:]}"
+        return {"supplier": {
+            "s_suppkey": keys, "s_name": generate_key_names("Supplier#", keys),
+            "s_address": generate_vstring(rng, count, 10, 40), "s_nationkey": nation_keys,
+            "s_phone": generate_phone(rng, nation_keys), "s_acctbal": rng.integers(-99999, 1000000, count),
+            "s_comment": comments,
+        }}
+    if table == "customer":
+        nation_keys = rng.integers(0, len(TPCH_NATIONS), count)
+        return {"customer": {
+            "c_custkey": keys, "c_name": generate_key_names("Customer#", keys),
+            "c_address": generate_vstring(rng, count, 10, 40), "c_nationkey": nation_keys,
+            "c_phone": generate_phone(rng, nation_keys), "c_acctbal": rng.integers(-99999, 1000000, count),
+            "c_mktsegment": np.array(TPCH_SEGMENTS)[rng.integers(0, len(TPCH_SEGMENTS), count)],
+            "c_comment": generate_text(rng, pool, count, 29, 116),
+        }}
+    if table == "part":
+        # Five distinct colors per name, redrawing the rows that repeat one
+        colors = rng.integers(0, len(TPCH_COLORS), (count, 5))
+        while True:
+            ordered = np.sort(colors, axis=1)
+            repeated = np.flatnonzero((ordered[:, 1:] == ordered[:, :-1]).any(axis=1))
+            if not len(repeated):
+                break
+            colors[repeated] = rng.integers(0, len(TPCH_COLORS), (len(repeated), 5))
+        names = np.array(TPCH_COLORS)[colors]
+        manufacturers = rng.integers(1, 6, count)
+        types = [np.array(syllables)[rng.integers(0, len(syllables), count)] for syllables in TPCH_TYPES]
+        containers = [np.array(syllables)[rng.integers(0, len(syllables), count)] for syllables in TPCH_CONTAINERS]
+        return {"part": {
+            "p_partkey": keys, "p_name": join_string_columns(" ", *names.T),
+            "p_mfgr": np.char.add("Manufacturer#", manufacturers.astype(str)),
+            "p_brand": join_string_columns("", np.full(count, "Brand#"), manufacturers, rng.integers(1, 6, count)),
+            "p_type": join_string_columns(" ", *types), "p_size": rng.integers(1, 51, count),
+            "p_container": join_string_columns(" ", *containers), "p_retailprice": get_tpch_retail_price(keys),
+            "p_comment": generate_text(rng, pool, count, 5, 22),
+        }}
+    if table == "partsupp":
+        return {"partsupp": {
+            "ps_partkey": np.repeat(keys, 4),
+            "ps_suppkey": get_tpch_suppliers(np.repeat(keys, 4), np.tile(np.arange(4), count), counts["supplier"]),
+            "ps_availqty": rng.integers(1, 10000, count * 4), "ps_supplycost": rng.integers(100, 100001, count * 4),
+            "ps_comment": generate_text(rng, pool, count * 4, 49, 198),
+        }}
+
+    # Orders and their line items; only the first 8 of every 32 order keys are used
+    order_index = np.arange(start, start + count, dtype=np.int64)
+    order_keys = (order_index // 8) * 32 + order_index % 8 + 1
+    # Customers whose key is a multiple of 3 never order: map 0..n-1 onto the other keys
+    customer_draws = rng.integers(0, counts["customer"] - counts["customer"] // 3, count)
+    start_date = np.datetime64(TPCH_START_DATE)
+    current_date = np.datetime64(TPCH_CURRENT_DATE)
+    order_dates = start_date + rng.integers(0, (np.datetime64(TPCH_END_DATE) - 151 - start_date).astype(int) + 1, count)
+
+    line_counts = rng.integers(1, 8, count)
+    line_orders = np.repeat(np.arange(count), line_counts)
+    lines = len(line_orders)
+    part_keys = rng.integers(1, counts["part"] + 1, lines)
+    quantities = rng.integers(1, 51, lines)
+    discounts = rng.integers(0, 11, lines)
+    taxes = rng.integers(0, 9, lines)
+    extended_prices = quantities * get_tpch_retail_price(part_keys)
+    ship_dates = order_dates[line_orders] + rng.integers(1, 122, lines)
+    receipt_dates = ship_dates + rng.integers(1, 31, lines)
+    line_status = np.where(ship_dates > current_date, "O", "F")
+
+    shipped = np.bincount(line_orders, weights=line_status == "F", minlength=count)
+    line_totals = (extended_prices * (100 + taxes) * (100 - discounts) + 5000) // 10000
+    return {
+        "orders": {
+            "o_orderkey": order_keys, "o_custkey": customer_draws + customer_draws // 2 + 1,
+            "o_orderstatus": np.where(shipped == line_counts, "F", np.where(shipped == 0, "O", "P")),
+            "o_totalprice": np.bincount(line_orders, weights=line_totals, minlength=count).round().astype(np.int64),
+            "o_orderdate": order_dates,
+            "o_orderpriority": np.array(TPCH_PRIORITIES)[rng.integers(0, len(TPCH_PRIORITIES), count)],
+            "o_clerk": generate_key_names("Clerk#", rng.integers(1, max(int(scale_factor * 1000), 1) + 1, count)),
+            "o_shippriority": np.zeros(count, dtype=np.int64), "o_comment": generate_text(rng, pool, count, 19, 78),
+        },
+        "lineitem": {
+            "l_orderkey": order_keys[line_orders], "l_partkey": part_keys,
+            "l_suppkey": get_tpch_suppliers(part_keys, rng.integers(0, 4, lines), counts["supplier"]),
+            "l_linenumber": np.arange(lines) - np.repeat(np.cumsum(line_counts) - line_counts, line_counts) + 1,
+            "l_quantity": quantities * 100, "l_extendedprice": extended_prices,
+            "l_discount": discounts, "l_tax": taxes,
+            "l_returnflag": np.where(receipt_dates <= current_date, np.where(rng.random(lines) < 0.5, "R", "A"), "N"),
+            "l_linestatus": line_status, "l_shipdate": ship_dates,
+            "l_commitdate": order_dates[line_orders] + rng.integers(30, 91, lines), "l_receiptdate": receipt_dates,
+            "l_shipinstruct": np.array(TPCH_INSTRUCTIONS)[rng.integers(0, len(TPCH_INSTRUCTIONS), lines)],
+            "l_shipmode": np.array(TPCH_SHIPMODES)[rng.integers(0, len(TPCH_SHIPMODES), lines)],
+            "l_comment": generate_text(rng, pool, lines, 10, 43),
+        },
+    }
+
+
+def write_generated_part(table, columns, path, file_format):
+    """Write one generated chunk as a pipe-delimited CSV or a Parquet file.
+
+    Decimal columns hold cents and are written with two decimal places.
+    """
+    import numpy as np
+
+    schema = TPCH_SCHEMA[table]
+    if file_format == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("pyarrow is not installed, run 'pip install pyarrow' or use --gen-format csv")
+
+        arrays = []
+        for name, kind in schema:
+            values = columns[name]
+            if kind == "decimal":
+                # decimal128 stores the unscaled value as a little-endian 128-bit integer
+                cents = np.asarray(values, dtype=np.int64)
+                words = np.column_stack([cents, cents >> 63])
+                arrays.append(pa.Array.from_buffers(pa.decimal128(15, 2), len(cents), [None, pa.py_buffer(words.tobytes())]))
+            elif kind == "date":
+                arrays.append(pa.array(np.asarray(values, dtype="datetime64[D]")))
+            elif kind in ("int", "bigint"):
+                arrays.append(pa.array(np.asarray(values), pa.int32() if kind == "int" else pa.int64()))
+            else:
+                arrays.append(pa.array(np.asarray(values, dtype=object)))
+        pq.write_table(pa.Table.from_arrays(arrays, names=[name for name, _ in schema]), path, compression="snappy")
+    else:
+        text_columns = []
+        for name, kind in schema:
+            values = columns[name]
+            if kind == "decimal":
+                values = np.char.mod("%.2f", np.asarray(values) / 100)
+            text_columns.append(np.asarray(values).astype(str).tolist())
+        with open(path, "w", newline="") as f:
+            csv.writer(f, delimiter="|", lineterminator="\n").writerows(zip(*text_columns))
+    return os.path.getsize(path)
+
+
+def generate_tpch_part(task):
+    """Process pool worker: generate one chunk and write its part file(s)."""
+    table, chunk_index, start, count, scale_factor, seed, output_dir, file_format = task
+    parts = []
+    for part_table, columns in generate_tpch_chunk(table, chunk_index, start, count, scale_factor, seed).items():
+        table_dir = os.path.join(output_dir, part_table)
+        os.makedirs(table_dir, exist_ok=True)
+        path = os.path.join(table_dir, f"{part_table}_{chunk_index:05d}.{file_format}")
+        size = write_generated_part(part_table, columns, path, file_format)
+        parts.append((part_table, path, len(next(iter(columns.values()))), size))
+    return parts
+
+
+def upload_generated_part(path, location, sql_tool, database, warehouse):
+    """PUT a generated part file to a stage location."""
+    if sql_tool == "bendsql":
+        # databend-driver has no PUT, bendsql uploads the local file itself
+        execute_bendsql(f"PUT fs://{os.path.abspath(path)} {location}", database)
+    else:
+        execute_sql(f"PUT file://{os.path.abspath(path)} {location} AUTO_COMPRESS = FALSE OVERWRITE = TRUE", sql_tool, database, warehouse)
+
+
+def run_data_generation(args, sql_tool=None):
+    """Generate TPC-H at --scale-factor into a directory or stage (--generate).
+
+    Chunks are generated by a process pool; at most two chunks per worker are
+    in flight, and with a stage target every part is uploaded and deleted as
+    soon as it is written, so memory and local disk stay bounded.
+    """
+    import tempfile
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    if args.case != "tpch":
+        raise ValueError("--generate only produces TPC-H data so far, use --case tpch")
+    scale_factor = args.scale_factor or (get_scale_factor(args.database) if args.database else None)
+    if not scale_factor:
+        raise ValueError("--generate needs --scale-factor (or a --database named like tpch_100)")
+    target = args.generate
+    to_stage = target.startswith("@")
+    if to_stage and not sql_tool:
+        raise ValueError("Uploading to a stage needs --runbend or --runsnow")
+    if to_stage and not args.database:
+        raise ValueError("Uploading to a stage needs --database")
+
+    counts = get_tpch_row_counts(scale_factor)
+    chunk_rows = args.gen_chunk_rows
+    # Orders chunks are a quarter the size, their line items make up the rest
+    chunk_sizes = {"region": counts["region"], "nation": counts["nation"], "supplier": chunk_rows, "customer": chunk_rows,
+                   "part": chunk_rows, "partsupp": max(chunk_rows // 4, 1), "orders": max(chunk_rows // 4, 1)}
+    source_rows = dict(counts, partsupp=counts["part"])
+    output_dir = tempfile.mkdtemp(prefix="benchsb_gen_") if to_stage else target
+    tasks = [
+        (table, chunk_index, start, min(chunk_sizes[table], source_rows[table] - start), scale_factor, args.seed, output_dir, args.gen_format)
+        for table in chunk_sizes
+        for chunk_index, start in enumerate(range(0, source_rows[table], chunk_sizes[table]))
+    ]
+
+    logger.info(f"\n{'='*50}\n🏭 Generating TPC-H SF{scale_factor} as {args.gen_format} into {target} - {len(tasks)} chunks, {args.gen_parallelism} workers, seed {args.seed}\n{'='*50}")
+    start_time = time.time()
+    generated = {}
+    pending = iter(tasks)
+    with ProcessPoolExecutor(max_workers=args.gen_parallelism) as pool:
+        in_flight = set()
+        while True:
+            for task in pending:
+                in_flight.add(pool.submit(generate_tpch_part, task))
+                if len(in_flight) >= args.gen_parallelism * 2:
+                    break
+            if not in_flight:
+                break
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                for table, path, rows, size in future.result():
+                    if to_stage:
+                        upload_generated_part(path, f"{target.rstrip('/')}/{table}/", sql_tool, args.database, args.warehouse)
+                        os.remove(path)
+                    stats = generated.setdefault(table, {"rows": 0, "parts": 0, "bytes": 0})
+                    stats["rows"] += rows
+                    stats["parts"] += 1
+                    stats["bytes"] += size
+                    logger.info(f"📦 {os.path.basename(path)}: {rows:,} rows, {format_bytes(size)}")
+    if to_stage:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    wall_time = time.time() - start_time
+    total_rows = sum(stats["rows"] for stats in generated.values())
+    table_data = [
+        [table, f"{stats['rows']:,}", stats["parts"], format_bytes(stats["bytes"])]
+        for table, stats in sorted(generated.items())
+    ]
+    report = create_ascii_table(
+        table_data, ["Table", "Rows", "Parts", "Size"],
+        f"TPC-H SF{scale_factor} generated in {wall_time:.2f}s ({total_rows / wall_time:,.0f} rows/s):",
+    )
+    logger.info(f"\n{report}")
+    return generated
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Run SQL queries using bendsql or snowsql."
+    )
+    parser.add_argument("--database", help="Database name (required unless --scale-sweep or --resume is given)")
+    parser.add_argument(
+        "--warehouse",
+        default="COMPUTE_WH",
+        help="Warehouse name for snowsql",
+        required=False,
     )
     parser.add_argument(
         "--setup",
         action="store_true",
         help="Setup the database by executing the setup SQL",
     )
+    parser.add_argument(
+        "--setup-parallelism",
+        type=int,
+        default=1,
+        help="Load setup tables through N parallel workers, one table per worker (default: 1, serial)",
+    )
     parser.add_argument(
         "--runbend", action="store_true", help="Run only bendsql setup and action"
     )
     parser.add_argument(
         "--runsnow", action="store_true", help="Run only snowsql setup and action"
     )
+    parser.add_argument(
+        "--runboth", action="store_true", help="Run bendsql and snowsql concurrently and compare them side by side"
+    )
+    parser.add_argument(
+        "--warehouses",
+        help="Comma-separated identical warehouses to shard the queries across, longest expected query first: bendsql DSNs with --runbend, snowsql warehouse names with --runsnow",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=['cli', 'driver'],
+        default='cli',
+        help="Databend execution backend: one bendsql process per query (cli, default) or one persistent databend-driver session (driver)",
+    )
+    parser.add_argument(
+        "--snow-backend",
+        choices=['cli', 'session'],
+        default='cli',
+        help="Snowflake execution backend: one snowsql process per query (cli, default) or long-lived interactive snowsql sessions (session)",
+    )
     parser.add_argument(
         "--suspend",
         default=False,
         action="store_true",
         help="Restart the warehouse before each query",
     )
+    parser.add_argument(
+        "--warmup",
+        type=parse_non_negative_int,
+        default=0,
+        help="Number of unrecorded warmup runs per query (default: 0)",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=parse_positive_int,
+        default=1,
+        help="Number of measured runs per query; the median is reported (default: 1)",
+    )
+    parser.add_argument(
+        "--query-timeout",
+        type=float,
+        help="Cancel a query on the server after SECONDS and record it as TIMEOUT (default: no timeout)",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--query-timeout-override",
+        action="append",
+        default=[],
+        type=parse_query_timeout_override,
+        metavar="QUERY=SECONDS",
+        help="Per-query timeout overriding --query-timeout, e.g. 72=3600; 0 disables it (repeatable)",
+    )
+    parser.add_argument(
+        "--streams",
+        type=int,
+        default=0,
+        help="Run a TPC throughput test with N concurrent query streams after the power test (default: 0, disabled)",
+    )
+    parser.add_argument(
+        "--scale-factor",
+        type=parse_scale_factor,
+        help="Scale factor for TPC metrics and --generate (default: trailing number of --database)",
+    )
+    parser.add_argument(
+        "--generate",
+        metavar="TARGET",
+        help="Generate TPC-H data at --scale-factor into a local directory, or into a stage such as @tpch_stage/sf100 with --runbend/--runsnow, and exit",
+    )
+    parser.add_argument(
+        "--gen-format",
+        choices=['parquet', 'csv'],
+        default='parquet',
+        help="File format of --generate parts: parquet (snappy, default) or pipe-delimited csv",
+    )
+    parser.add_argument(
+        "--gen-parallelism",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes of --generate (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--gen-chunk-rows",
+        type=int,
+        default=1000000,
+        help="Rows per --generate part file, which bounds each worker's memory (default: 1000000)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of --generate and --qgen; the same seed reproduces the same data and query parameters (default: 0)",
+    )
+    parser.add_argument(
+        "--scale-sweep",
+        metavar="DATABASES",
+        help="Run the queries against each comma-separated database (e.g. tpch_1,tpch_10,tpch_100) and fit per-query scaling exponents; scale factors come from the trailing numbers",
+    )
+    parser.add_argument(
+        "--size-sweep",
+        metavar="SIZES",
+        help="Resize the warehouse to each comma-separated size (e.g. XSmall,Small,Medium,Large), rerun the queries at each and report speedup and parallel efficiency",
+    )
+    parser.add_argument(
+        "--restore-size",
+        metavar="SIZE",
+        type=parse_warehouse_size,
+        help="Warehouse size to restore after --size-sweep; required on Databend, whose current size cannot be queried (default on Snowflake: the size before the sweep)",
+    )
     parser.add_argument(
         "--case",
-        choices=['tpch', 'tpcds'],
+        choices=['tpch', 'tpcds', 'fetch', 'ingest'],
         default='tpch',
-        help="Specify the benchmark case: TPC-H (default) or TPC-DS",
+        help="Specify the benchmark case: TPC-H (default), TPC-DS, fetch (full large result sets from the TPC-H tables) or ingest (COPY INTO loads of the TPC-H tables from stage)",
+    )
+    parser.add_argument(
+        "--ingest-formats",
+        type=parse_ingest_formats,
+        default=parse_ingest_formats("csv,csv:gzip,parquet,ndjson:gzip"),
+        help="Comma-separated FORMAT[:COMPRESSION] variants loaded by --case ingest; formats csv, parquet, ndjson; compressions none, gzip, zstd, snappy (default: csv,csv:gzip,parquet,ndjson:gzip)",
+    )
+    parser.add_argument(
+        "--ingest-file-counts",
+        default="16",
+        help="Comma-separated numbers of files each --case ingest variant is staged as (default: 16; counts are targets, engines cut files by size)",
+    )
+    parser.add_argument(
+        "--ingest-tables",
+        default="lineitem,orders,customer,part,partsupp,supplier",
+        help="Comma-separated TPC-H tables loaded by --case ingest (default: all but nation and region)",
+    )
+    parser.add_argument(
+        "--ingest-stage",
+        default="benchsb_ingest",
+        help="Stage --case ingest unloads its variants to, created as an internal stage if missing (default: benchsb_ingest)",
+    )
+    parser.add_argument(
+        "--fetch-formats",
+        default="tsv,csv",
+        help="Comma-separated CLI result formats compared by --case fetch (default: tsv,csv; the driver backend uses the driver)",
+    )
+    parser.add_argument(
+        "--flamegraph",
+        action="store_true",
+        help="Enable flamegraph generation using EXPLAIN PERF",
+    )
+    parser.add_argument(
+        "--flamegraph-dir",
+        default="./flamegraphs",
+        help="Directory to store flamegraph HTML files (default: ./flamegraphs)",
+    )
+    parser.add_argument(
+        "--flamegraph-parallelism",
+        type=int,
+        default=4,
+        help="Number of concurrent EXPLAIN PERF runs in the flamegraph pass (default: 4)",
+    )
+
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Resume an interrupted run from log/runs/RUN_ID.json with its original settings, skipping the queries it already measured",
+    )
+
+    parser.add_argument(
+        "--no-explain",
+        action="store_true",
+        help="Skip the EXPLAIN pass that records every query's plan and flags plan changes against the previous run",
+    )
+    parser.add_argument(
+        "--qgen",
+        action="store_true",
+        help="Run the TPC-H query templates with qgen-style parameters drawn per iteration and per stream from --seed, instead of the fixed validation parameters (tpch case only)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve live run progress as OpenMetrics at http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Atomically rewrite live run progress to this textfile-collector file (e.g. /var/lib/node_exporter/benchsb.prom)",
+    )
+    parser.add_argument(
+        "--history-db",
+        default=os.path.join("log", "benchsb_history.db"),
+        help="SQLite store every run is appended to (default: log/benchsb_history.db)",
+    )
+    parser.add_argument(
+        "--history",
+        type=int,
+        metavar="QUERY",
+        help="Print the run history of one query of --case/--database from --history-db and exit",
+    )
+
+    parser.add_argument(
+        "--baseline",
+        help="Run id from --history-db to compare against, or 'latest' for the previous run of the same case, database and engine",
     )
     parser.add_argument(
-        "--flamegraph",
-        action="store_true",
-        help="Enable flamegraph generation using EXPLAIN PERF",
+        "--min-effect",
+        type=float,
+        default=0.05,
+        help="Minimum median slowdown/speedup, as a fraction, for a significant change (default: 0.05)",
     )
     parser.add_argument(
-        "--flamegraph-dir",
-        default="./flamegraphs",
-        help="Directory to store flamegraph HTML files (default: ./flamegraphs)",
+        "--fail-on-regression",
+        action="store_true",
+        help="Exit non-zero when a query or the suite geomean regresses against --baseline",
     )
 
     return parser.parse_args()
 
 
-def main():
-    # Setup logging - create log directory if it doesn't exist
-    log_dir = "log"
-    os.makedirs(log_dir, exist_ok=True)
-    log_filename = os.path.join(log_dir, f"benchsb_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler(sys.stdout)
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    case_name TEXT NOT NULL,
+    database_name TEXT NOT NULL,
+    warehouse TEXT,
+    engine TEXT NOT NULL,
+    backend TEXT,
+    warmup INTEGER,
+    iterations INTEGER,
+    suspend INTEGER,
+    server_version TEXT,
+    client_version TEXT,
+    settings_json TEXT,
+    args_json TEXT,
+    warehouse_size TEXT
+);
+CREATE TABLE IF NOT EXISTS query_samples (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    phase TEXT NOT NULL,
+    query_index INTEGER NOT NULL,
+    iteration INTEGER NOT NULL,
+    server_time REAL,
+    status TEXT NOT NULL,
+    error TEXT,
+    scan_rows INTEGER,
+    scan_bytes INTEGER,
+    scan_partitions INTEGER,
+    result_rows INTEGER,
+    result_bytes INTEGER,
+    peak_memory INTEGER,
+    spill_bytes INTEGER,
+    cpu_usage INTEGER,
+    parameters TEXT
+);
+CREATE TABLE IF NOT EXISTS query_plans (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    query_index INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    plan TEXT NOT NULL,
+    PRIMARY KEY (run_id, query_index)
+);
+CREATE INDEX IF NOT EXISTS idx_query_samples_query ON query_samples (query_index, run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_case ON runs (case_name, database_name, engine, started_at);
+"""
+
+
+def open_history_store(path):
+    """Open (and create if needed) the SQLite run-history store."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(HISTORY_SCHEMA)
+    # Stores created before the server metrics and qgen parameters existed lack their columns
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(query_samples)")}
+    for name in QUERY_LOG_METRICS:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE query_samples ADD COLUMN {name} INTEGER")
+    if "parameters" not in columns:
+        conn.execute("ALTER TABLE query_samples ADD COLUMN parameters TEXT")
+    if "warehouse_size" not in {row[1] for row in conn.execute("PRAGMA table_info(runs)")}:
+        conn.execute("ALTER TABLE runs ADD COLUMN warehouse_size TEXT")
+    return conn
+
+
+def collect_environment_metadata(sql_tool, database, warehouse):
+    """Collect server version, client version and non-default settings of an engine."""
+    if sql_tool == "bendsql":
+        return {
+            "server_version": get_databend_version(database),
+            "client_version": get_bendsql_version(),
+            "settings": get_system_settings(database),
+        }
+
+    try:
+        server_version = query_scalar("SELECT CURRENT_VERSION();", sql_tool, database, warehouse)
+    except Exception as e:
+        logger.error(f"Failed to get Snowflake version: {e}")
+        server_version = None
+    return {"server_version": server_version, "client_version": None, "settings": []}
+
+
+def record_run_history(path, args, run, metadata):
+    """Append one engine's run, with every sample, to the run-history store."""
+    sql_tool = run["sql_tool"]
+    conn = open_history_store(path)
+    try:
+        with conn:
+            # A resumed run replaces whatever an earlier attempt recorded
+            conn.execute("DELETE FROM query_samples WHERE run_id = ?", (run["run_id"],))
+            conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run["run_id"],
+                    run["started_at"],
+                    datetime.now().isoformat(timespec="seconds"),
+                    args.case,
+                    args.database,
+                    run["warehouse"],
+                    sql_tool,
+                    bend_backend if sql_tool == "bendsql" else snow_backend,
+                    args.warmup,
+                    args.iterations,
+                    int(args.suspend),
+                    metadata["server_version"],
+                    metadata["client_version"],
+                    json.dumps(metadata["settings"]),
+                    json.dumps(vars(args)),
+                    get_run_warehouse_size(args),
+                ),
+            )
+
+            rows = []
+            for phase, stats in (("setup", run["setup_stats"]), ("queries", run["queries_stats"])):
+                for result in stats.get("results", []):
+                    query_index = result["query_index"]
+                    no_metrics = (None,) * len(QUERY_LOG_METRICS)
+                    if "error" in result:
+                        rows.append((run["run_id"], phase, query_index, 0, None, result.get("status", "ERROR"), result["error"]) + no_metrics + (None,))
+                    elif result.get("samples"):
+                        sample_metrics = result.get("sample_metrics") or [None] * len(result["samples"])
+                        sample_parameters = result.get("query_parameters") or [None] * len(result["samples"])
+                        rows.extend(
+                            (run["run_id"], phase, query_index, iteration + 1, sample, "OK", None)
+                            + (tuple(metrics[name] for name in QUERY_LOG_METRICS) if metrics else no_metrics)
+                            + (json.dumps(parameters) if parameters else None,)
+                            for iteration, (sample, metrics, parameters) in enumerate(zip(result["samples"], sample_metrics, sample_parameters))
+                        )
+                    else:
+                        rows.append((run["run_id"], phase, query_index, 0, None, "NO_TIME", None) + no_metrics + (None,))
+            columns = ("run_id", "phase", "query_index", "iteration", "server_time", "status", "error") + QUERY_LOG_METRICS + ("parameters",)
+            conn.executemany(
+                f"INSERT INTO query_samples ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+            )
+            conn.execute("DELETE FROM query_plans WHERE run_id = ?", (run["run_id"],))
+            conn.executemany(
+                "INSERT INTO query_plans VALUES (?, ?, ?, ?)",
+                [
+                    (run["run_id"], query_index, plan["fingerprint"], plan["plan"])
+                    for query_index, plan in sorted(run["queries_stats"].get("plans", {}).items())
+                ],
+            )
+    finally:
+        conn.close()
+
+    logger.info(f"🗄️  Recorded run {run['run_id']} in {os.path.abspath(path)}")
+
+
+def print_query_history(path, case, database, query_index, engine=None, limit=50):
+    """Print the per-run median history of one query from the run-history store."""
+    conn = open_history_store(path)
+    try:
+        sql = """
+            SELECT r.run_id, r.started_at, r.engine, r.warehouse, r.server_version,
+                   s.server_time, s.status
+            FROM runs r JOIN query_samples s ON s.run_id = r.run_id
+            WHERE r.case_name = ? AND r.database_name = ? AND s.phase = 'queries' AND s.query_index = ?
+        """
+        params = [case, database, query_index]
+        if engine:
+            sql += " AND r.engine = ?"
+            params.append(engine)
+        sql += " ORDER BY r.started_at"
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    runs = {}
+    for run_id, started_at, run_engine, warehouse, server_version, server_time, status in rows:
+        entry = runs.setdefault(run_id, {
+            "started_at": started_at, "engine": run_engine, "warehouse": warehouse,
+            "server_version": server_version, "samples": [], "status": status,
+        })
+        if server_time is not None:
+            entry["samples"].append(server_time)
+
+    table_data = []
+    for run_id, entry in list(runs.items())[-limit:]:
+        samples = entry["samples"]
+        table_data.append([
+            run_id,
+            entry["started_at"],
+            entry["engine"],
+            entry["warehouse"],
+            entry["server_version"] or "-",
+            len(samples),
+            f"{statistics.median(samples):.2f}" if samples else entry["status"],
+        ])
+    logger.info("\n" + create_ascii_table(
+        table_data, ["Run", "Started", "Engine", "Warehouse", "Server Version", "Samples", "Median(s)"],
+        f"History of {case} Query {query_index} on {database}:",
+    ))
+
+
+def resolve_baseline_run(path, baseline, case, database, engine, exclude_run_id, warehouse_size=None):
+    """Resolve --baseline to a run id; "latest" is the previous run of the same case, database, engine and warehouse size."""
+    conn = open_history_store(path)
+    try:
+        if baseline == "latest":
+            row = conn.execute(
+                """
+                SELECT run_id FROM runs
+                WHERE case_name = ? AND database_name = ? AND engine = ? AND warehouse_size IS ? AND run_id != ?
+                ORDER BY started_at DESC LIMIT 1
+                """,
+                (case, database, engine, warehouse_size, exclude_run_id),
+            ).fetchone()
+        else:
+            row = conn.execute("SELECT run_id FROM runs WHERE run_id = ? AND engine = ?", (baseline, engine)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def load_run_samples(path, run_id):
+    """Return the measured query samples of a stored run, keyed by query index."""
+    conn = open_history_store(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT query_index, server_time FROM query_samples
+            WHERE run_id = ? AND phase = 'queries' AND status = 'OK'
+            ORDER BY query_index, iteration
+            """,
+            (run_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    samples = {}
+    for query_index, server_time in rows:
+        samples.setdefault(query_index, []).append(server_time)
+    return samples
+
+
+def resolve_previous_plan_run(path, case, database, engine, exclude_run_id, warehouse_size=None):
+    """Return the latest other run of the same case, database, engine and warehouse size that recorded plans."""
+    conn = open_history_store(path)
+    try:
+        row = conn.execute(
+            """
+            SELECT run_id FROM runs r
+            WHERE case_name = ? AND database_name = ? AND engine = ? AND warehouse_size IS ? AND run_id != ?
+              AND EXISTS (SELECT 1 FROM query_plans p WHERE p.run_id = r.run_id)
+            ORDER BY started_at DESC LIMIT 1
+            """,
+            (case, database, engine, warehouse_size, exclude_run_id),
+        ).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def load_run_plans(path, run_id):
+    """Return the stored query plans of a run, keyed by query index."""
+    conn = open_history_store(path)
+    try:
+        rows = conn.execute(
+            "SELECT query_index, fingerprint, plan FROM query_plans WHERE run_id = ?", (run_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {query_index: {"fingerprint": fingerprint, "plan": plan} for query_index, fingerprint, plan in rows}
+
+
+def bootstrap_median_ratio(current, baseline, confidence=0.95, resamples=1000, seed=0):
+    """Bootstrap a confidence interval for median(current) / median(baseline)."""
+    rng = random.Random(seed)
+    ratios = sorted(
+        statistics.median(rng.choices(current, k=len(current)))
+        / statistics.median(rng.choices(baseline, k=len(baseline)))
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return percentile(ratios, tail), percentile(ratios, 1 - tail)
+
+
+def bootstrap_suite_ratio(pairs, confidence=0.95, resamples=1000, seed=0):
+    """Bootstrap a confidence interval for the geomean of per-query median ratios."""
+    rng = random.Random(seed)
+    ratios = sorted(
+        geometric_mean(
+            statistics.median(rng.choices(current, k=len(current)))
+            / statistics.median(rng.choices(baseline, k=len(baseline)))
+            for current, baseline in pairs
+        )
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return percentile(ratios, tail), percentile(ratios, 1 - tail)
+
+
+def compare_with_baseline(current_samples, baseline_samples, min_effect, confidence=0.95):
+    """Compare each query's samples with a baseline run.
+
+    A query regresses (improves) when the bootstrap confidence interval of its
+    median ratio lies entirely above (below) 1 and the median ratio moves by
+    at least min_effect. The suite is judged the same way on the geomean of
+    the per-query ratios. Queries with fewer than MIN_COMPARISON_SAMPLES
+    samples on either side get no verdict and are left out of the suite.
+    """
+    queries = []
+    pairs = []
+    for query_index in sorted(set(current_samples) & set(baseline_samples)):
+        current = current_samples[query_index]
+        baseline = baseline_samples[query_index]
+        if statistics.median(current) <= 0 or statistics.median(baseline) <= 0:
+            continue
+
+        ratio = statistics.median(current) / statistics.median(baseline)
+        if min(len(current), len(baseline)) < MIN_COMPARISON_SAMPLES:
+            queries.append({
+                "query_index": query_index,
+                "baseline_median": statistics.median(baseline),
+                "current_median": statistics.median(current),
+                "ratio": ratio,
+                "ci_low": None,
+                "ci_high": None,
+                "verdict": "INSUFFICIENT SAMPLES",
+            })
+            continue
+        ci_low, ci_high = bootstrap_median_ratio(current, baseline, confidence)
+        if ci_low > 1 and ratio >= 1 + min_effect:
+            verdict = "REGRESSION"
+        elif ci_high < 1 and ratio <= 1 - min_effect:
+            verdict = "IMPROVEMENT"
+        else:
+            verdict = "-"
+        queries.append({
+            "query_index": query_index,
+            "baseline_median": statistics.median(baseline),
+            "current_median": statistics.median(current),
+            "ratio": ratio,
+            "ci_low": ci_low,
+            "ci_high": ci_high,
+            "verdict": verdict,
+        })
+        pairs.append((current, baseline))
+
+    suite_ratio = geometric_mean(q["ratio"] for q in queries if q["ci_low"] is not None)
+    suite_ci_low, suite_ci_high = bootstrap_suite_ratio(pairs, confidence) if pairs else (0.0, 0.0)
+    suite_regressed = bool(pairs) and suite_ci_low > 1 and suite_ratio >= 1 + min_effect
+
+    return {
+        "queries": queries,
+        "suite_ratio": suite_ratio,
+        "suite_ci_low": suite_ci_low,
+        "suite_ci_high": suite_ci_high,
+        "suite_regressed": suite_regressed,
+        "regressions": [q for q in queries if q["verdict"] == "REGRESSION"],
+        "improvements": [q for q in queries if q["verdict"] == "IMPROVEMENT"],
+        "insufficient": [q for q in queries if q["ci_low"] is None],
+    }
+
+
+def create_regression_report(comparison, baseline_run_id, run_id, min_effect):
+    """Create the baseline comparison table and verdict lines."""
+    table_data = [
+        [
+            q["query_index"],
+            f"{q['baseline_median']:.2f}",
+            f"{q['current_median']:.2f}",
+            f"{q['ratio']:.3f}",
+            f"[{q['ci_low']:.3f}, {q['ci_high']:.3f}]" if q["ci_low"] is not None else "-",
+            q["verdict"],
         ]
+        for q in comparison["queries"]
+    ]
+    table = create_ascii_table(
+        table_data, ["Query", "Baseline(s)", "Current(s)", "Ratio", "95% CI Ratio", "Verdict"],
+        f"Regression Check: {run_id} vs baseline {baseline_run_id} (min effect {min_effect:.0%}):",
     )
 
-    args = parse_arguments()
+    lines = [table]
+    if comparison["insufficient"]:
+        lines.append(
+            f"⚠️ Insufficient samples for queries {', '.join(str(q['query_index']) for q in comparison['insufficient'])}: "
+            f"no verdict below {MIN_COMPARISON_SAMPLES} samples per side, run both sides with --iterations >= {MIN_COMPARISON_SAMPLES}"
+        )
+    lines.append(f"Significant regressions: {', '.join(str(q['query_index']) for q in comparison['regressions']) or 'none'}")
+    lines.append(f"Significant improvements: {', '.join(str(q['query_index']) for q in comparison['improvements']) or 'none'}")
+    if comparison["insufficient"] and len(comparison["insufficient"]) == len(comparison["queries"]):
+        lines.append("Suite geomean ratio: insufficient samples")
+    else:
+        lines.append(
+            f"Suite geomean ratio: {comparison['suite_ratio']:.3f} "
+            f"[{comparison['suite_ci_low']:.3f}, {comparison['suite_ci_high']:.3f}]"
+            f"{' - REGRESSION' if comparison['suite_regressed'] else ''}"
+        )
+    return "\n".join(lines)
+
+
+def check_regressions(args, run):
+    """Compare a recorded run with its baseline; return True when it regressed."""
+    baseline_run_id = resolve_baseline_run(
+        args.history_db, args.baseline, args.case, args.database, run["sql_tool"], run["run_id"], get_run_warehouse_size(args)
+    )
+    if not baseline_run_id:
+        logger.warning(f"⚠️ No {run['sql_tool']} baseline run '{args.baseline}' found in {args.history_db}, skipping regression check")
+        return False
+
+    current_samples = {
+        r["query_index"]: r["samples"] for r in run["queries_stats"]["results"]
+        if "error" not in r and r.get("samples")
+    }
+    comparison = compare_with_baseline(current_samples, load_run_samples(args.history_db, baseline_run_id), args.min_effect)
+    report = create_regression_report(comparison, baseline_run_id, run["run_id"], args.min_effect)
+
+    logger.info(f"\n{report}")
+    with open(get_log_path("benchmark_summary.txt"), "a") as summary_file:
+        summary_file.write(f"{report}\n\n")
+
+    return bool(comparison["regressions"]) or comparison["suite_regressed"]
+
+
+def check_plan_changes(args, run):
+    """Flag queries whose plan fingerprint differs from the previous run of the same case.
+
+    Changed plans are listed with both runs' median times and their diffs
+    are written to log/plan_changes_<engine>.txt.
+    """
+    import difflib
+
+    plans = run["queries_stats"].get("plans")
+    if not plans:
+        return
+    previous_run_id = resolve_previous_plan_run(args.history_db, args.case, args.database, run["sql_tool"], run["run_id"], get_run_warehouse_size(args))
+    if not previous_run_id:
+        logger.info(f"🧭 No earlier {run['sql_tool']} plans for {args.case} on {args.database}, plan fingerprints recorded as the first reference")
+        return
+
+    previous_plans = load_run_plans(args.history_db, previous_run_id)
+    changed = sorted(
+        query_index for query_index, plan in plans.items()
+        if query_index in previous_plans and previous_plans[query_index]["fingerprint"] != plan["fingerprint"]
+    )
+    if not changed:
+        logger.info(f"🧭 No plan changes against run {previous_run_id} ({len(plans)} queries compared)")
+        return
+
+    previous_samples = load_run_samples(args.history_db, previous_run_id)
+    current_times = {r["query_index"]: r["server_time"] for r in run["queries_stats"]["results"] if "error" not in r and r["server_time"] is not None}
+    table_data = []
+    diffs = []
+    for query_index in changed:
+        previous_time = statistics.median(previous_samples[query_index]) if previous_samples.get(query_index) else None
+        current_time = current_times.get(query_index)
+        table_data.append([
+            query_index,
+            previous_plans[query_index]["fingerprint"],
+            plans[query_index]["fingerprint"],
+            f"{previous_time:.2f}" if previous_time is not None else "-",
+            f"{current_time:.2f}" if current_time is not None else "-",
+            f"{current_time / previous_time:.2f}x" if previous_time and current_time is not None else "-",
+        ])
+        diffs.append("\n".join(difflib.unified_diff(
+            normalize_plan(previous_plans[query_index]["plan"]).splitlines(),
+            normalize_plan(plans[query_index]["plan"]).splitlines(),
+            f"{previous_run_id} Query {query_index}", f"{run['run_id']} Query {query_index}", lineterm="",
+        )))
+    report = create_ascii_table(
+        table_data,
+        ["Query", "Previous Plan", "Plan", "Previous(s)", "Current(s)", "Ratio"],
+        f"⚠️ Plan Changes ({run['sql_tool']}) - {len(changed)} of {len(plans)} queries vs run {previous_run_id}:",
+    )
+
+    diff_path = get_log_path("plan_changes.txt", run["sql_tool"])
+    with open(diff_path, "w") as diff_file:
+        diff_file.write("\n\n".join(diffs) + "\n")
+    logger.info(f"\n{report}\nPlan diffs: {os.path.abspath(diff_path)}")
+    with open(get_log_path("benchmark_summary.txt"), "a") as summary_file:
+        summary_file.write(f"{report}\n\n")
+
+
+def get_log_path(filename, result_tag=None):
+    """Return the log directory path of a result file, tagged per engine when needed."""
+    if result_tag:
+        base, ext = os.path.splitext(filename)
+        filename = f"{base}_{result_tag}{ext}"
+    return os.path.join("log", filename)
+
 
+# Arguments a resumed run takes from its run-state file instead of the command line
+RESUME_SETTINGS = (
+    "database", "warehouse", "case", "setup", "setup_parallelism", "backend", "snow_backend",
+    "warehouses", "suspend", "warmup", "iterations", "query_timeout", "query_timeout_override", "streams",
+    "fetch_formats", "ingest_formats", "ingest_file_counts", "ingest_tables", "ingest_stage",
+    "scale_factor", "no_explain", "qgen", "seed", "flamegraph", "flamegraph_dir", "flamegraph_parallelism",
+)
+
+
+def get_run_state_path(run_id):
+    """Return the path of the checkpoint file of a run."""
+    return os.path.join("log", "runs", f"{run_id}.json")
+
+
+def save_run_state(run_state):
+    """Atomically replace the checkpoint file of a run with its current state."""
+    path = get_run_state_path(run_state["run_id"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(run_state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    # A crash leaves either the previous or the new checkpoint, never a torn one
+    os.replace(tmp_path, path)
+
+
+def load_run_state(run_id):
+    """Load the checkpoint file of a run to resume it."""
+    path = get_run_state_path(run_id)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No run state for run '{run_id}' at {path}")
+    with open(path) as f:
+        return json.load(f)
+
+
+def get_engine_config(sql_tool, args):
+    """Return the SQL directory and warehouse used with a SQL tool."""
     base_sql_dir = "sql"  # Base directory for SQL files
+    if sql_tool == "bendsql":
+        return os.path.join(base_sql_dir, "bend"), get_bendsql_warehouse_from_env()
+    return os.path.join(base_sql_dir, "snow"), args.warehouse
+
+
+def run_engine_benchmark(args, sql_tool, result_tag=None, run_state=None):
+    """Run the setup, queries and throughput phases against one engine.
+
+    Progress is checkpointed to a run-state file; passing a loaded run_state
+    resumes that run, skipping the phases and queries it already finished.
+    """
     database = args.database
+    sql_dir, warehouse = get_engine_config(sql_tool, args)
     overall_start_time = time.time()
+    if run_state is None:
+        started_at = datetime.now()
+        run_state = {
+            "run_id": f"{started_at.strftime('%Y%m%d_%H%M%S')}_{args.case}_{sql_tool}",
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "sql_tool": sql_tool,
+            "settings": {name: getattr(args, name) for name in RESUME_SETTINGS},
+            "status": "running",
+            "db_setup_time": 0,
+            "setup_stats": None,
+            "queries": [],
+            "throughput_report": None,
+        }
+        save_run_state(run_state)
+    else:
+        logger.info(f"🔁 Resuming run {run_state['run_id']}: {len(run_state['queries'])} queries checkpointed")
+    run_id = run_state["run_id"]
 
-    if args.runbend:
-        sql_tool = "bendsql"
-        sql_dir = os.path.join(base_sql_dir, "bend")
-        warehouse = get_bendsql_warehouse_from_env()
-    elif args.runsnow:
-        sql_tool = "snowsql"
-        sql_dir = os.path.join(base_sql_dir, "snow")
-        warehouse = args.warehouse
+    if sql_tool == "snowsql":
         # Disable caching of results
         execute_sql(
             "ALTER ACCOUNT SET USE_CACHED_RESULT=FALSE;", sql_tool, database, warehouse
         )
-    else:
-        logger.error("Please specify --runbend or --runsnow.")
-        sys.exit(1)
 
     logger.info(f"\n{'='*50}\nStarting benchmark with {sql_tool}\n{'='*50}")
+    logger.info(f"Run ID: {run_id} (state: {get_run_state_path(run_id)})")
     logger.info(f"Database: {database}")
     logger.info(f"Warehouse: {warehouse}")
+    logger.info(f"Backend: {bend_backend if sql_tool == 'bendsql' else snow_backend}")
     logger.info(f"Timestamp: {datetime.now()}")
     
     # Initialize flamegraph settings
+    flamegraph_enabled = args.flamegraph
     flamegraph_dir = None
 
-    if args.flamegraph:
+    if flamegraph_enabled:
         if sql_tool != "bendsql":
             logger.warning("⚠️  Flamegraph is only supported with bendsql (--runbend). Disabling flamegraph.")
-            args.flamegraph = False
+            flamegraph_enabled = False
         else:
             flamegraph_dir = setup_flamegraph_directory(args.flamegraph_dir, args.case)
             logger.info(f"🔥 Flamegraph enabled - Output directory: {flamegraph_dir}")
-            
-
     
     setup_stats = {"total_execution_time": 0, "total_wall_time": 0, "total_restart_time": 0, "successful_queries": 0, "total_queries": 0}
     db_setup_time = 0
     
-    if args.setup:
+    if args.setup and run_state["setup_stats"] is not None:
+        # Setup is checkpointed as a whole, its statements are not independent
+        logger.info("⏭️ Setup phase already completed in this run, skipping it")
+        setup_stats = run_state["setup_stats"]
+        db_setup_time = run_state["db_setup_time"]
+    elif args.setup:
         logger.info(f"\n{'='*50}\nStarting setup phase\n{'='*50}")
         db_setup_time = setup_database(database, sql_tool, warehouse)
         # Choose between TPC-H and TPC-DS setup files
         setup_file = os.path.join(sql_dir, "tpcds_setup.sql" if args.case == 'tpcds' else "setup.sql")
-        setup_stats = execute_sql_file(setup_file, sql_tool, database, warehouse, False, is_setup=True, flamegraph_enabled=args.flamegraph, flamegraph_dir=flamegraph_dir, benchmark_case=args.case)
+        if args.setup_parallelism > 1:
+            setup_stats = execute_setup_parallel(setup_file, sql_tool, database, warehouse, args.setup_parallelism)
+        else:
+            setup_stats = execute_sql_file(setup_file, sql_tool, database, warehouse, False, is_setup=True, flamegraph_enabled=flamegraph_enabled, flamegraph_dir=flamegraph_dir, benchmark_case=args.case, result_tag=result_tag)
         logger.info(f"Setup completed. Total execution time: {setup_stats['total_execution_time']:.2f}s, Wall time: {setup_stats['total_wall_time']:.2f}s")
+        run_state["setup_stats"] = setup_stats
+        run_state["db_setup_time"] = db_setup_time
+        save_run_state(run_state)
+
+    shards = None
+    expected_durations = None
+    if args.warehouses:
+        shards = get_shard_targets(sql_tool, args.warehouses)
+        expected_durations = load_expected_durations(args.history_db, args.case, database, sql_tool, get_run_warehouse_size(args))
+        logger.info(f"🔀 Warehouse shards: {', '.join(name for name, _ in shards)} ({len(expected_durations)} queries with history durations)")
 
     # Choose between TPC-H and TPC-DS queries
     queries_file = os.path.join(sql_dir, "tpcds_queries.sql" if args.case == 'tpcds' else "queries.sql")
-    queries_stats = execute_sql_file(queries_file, sql_tool, database, warehouse, args.suspend, is_setup=False, flamegraph_enabled=args.flamegraph, flamegraph_dir=flamegraph_dir, benchmark_case=args.case)
+    qgen = None
+    if args.qgen:
+        queries_file = os.path.join(sql_dir, "queries_template.sql")
+        qgen = {"seed": args.seed, "scale_factor": args.scale_factor or get_scale_factor(database)}
+        logger.info(f"🎲 qgen parameters from seed {qgen['seed']} at SF{qgen['scale_factor']}")
+    if args.case == 'fetch':
+        queries_file = os.path.join(sql_dir, "fetch_queries.sql")
+        formats = [f.strip() for f in args.fetch_formats.split(",") if f.strip()]
+        queries_stats = run_fetch_test(queries_file, sql_tool, database, warehouse, formats, args.warmup, args.iterations, result_tag)
+    elif args.case == 'ingest':
+        tables = [t.strip().lower() for t in args.ingest_tables.split(",") if t.strip()]
+        file_counts = [int(n) for n in args.ingest_file_counts.split(",") if n.strip()]
+        queries_stats = run_ingest_test(sql_tool, database, warehouse, tables, args.ingest_formats, file_counts, args.ingest_stage, args.warmup, args.iterations, result_tag)
+    else:
+        queries_stats = execute_sql_file(queries_file, sql_tool, database, warehouse, args.suspend, is_setup=False, flamegraph_enabled=flamegraph_enabled, flamegraph_dir=flamegraph_dir, benchmark_case=args.case, warmup=args.warmup, iterations=args.iterations, result_tag=result_tag, flamegraph_parallelism=args.flamegraph_parallelism, run_state=run_state, shards=shards, expected_durations=expected_durations, capture_plans=not args.no_explain, qgen=qgen)
     logger.info(f"Queries completed. Total execution time: {queries_stats['total_execution_time']:.2f}s, Wall time: {queries_stats['total_wall_time']:.2f}s")
 
-    overall_time = time.time() - overall_start_time
+    throughput_report = run_state["throughput_report"]
+    if throughput_report:
+        logger.info("⏭️ Throughput test already completed in this run, skipping it")
+    elif args.streams > 0:
+        throughput_stats = run_throughput_test(queries_file, args.streams, args.case, sql_tool, database, warehouse, result_tag=result_tag, qgen=qgen)
+        scale_factor = args.scale_factor or get_scale_factor(database)
+        load_time = setup_stats['total_wall_time'] if args.setup else None
+        metrics = compute_tpc_metrics(args.case, scale_factor, queries_stats, throughput_stats, load_time)
+        throughput_report = create_throughput_report(throughput_stats, metrics)
+        if queries_stats['successful_queries'] < queries_stats['total_queries'] or throughput_stats['successful_queries'] < throughput_stats['total_queries']:
+            logger.warning("⚠️ Some power or throughput queries failed, TPC metrics are not valid")
+        run_state["throughput_report"] = throughput_report
+        save_run_state(run_state)
+
+    run_state["status"] = "completed"
+    save_run_state(run_state)
+
+    return {
+        "run_id": run_id,
+        "started_at": run_state["started_at"],
+        "sql_tool": sql_tool,
+        "warehouse": warehouse,
+        "db_setup_time": db_setup_time,
+        "setup_stats": setup_stats,
+        "queries_stats": queries_stats,
+        "throughput_report": throughput_report,
+        "flamegraph_dir": flamegraph_dir,
+        "overall_time": time.time() - overall_start_time,
+    }
+
+
+def write_benchmark_summary(args, run):
+    """Log the final summary of one engine's run and append it to benchmark_summary.txt."""
+    database = args.database
+    sql_tool = run["sql_tool"]
+    warehouse = run["warehouse"]
+    db_setup_time = run["db_setup_time"]
+    setup_stats = run["setup_stats"]
+    queries_stats = run["queries_stats"]
+    throughput_report = run["throughput_report"]
+    flamegraph_dir = run["flamegraph_dir"]
+    overall_time = run["overall_time"]
     
     # Print overall summary
     logger.info(f"\n{'='*60}\nFINAL BENCHMARK SUMMARY - {sql_tool.upper()}\n{'='*60}")
+    logger.info(f"Run ID: {run['run_id']}")
     logger.info(f"Database: {database}")
     logger.info(f"Warehouse: {warehouse}")
     logger.info(f"Timestamp: {datetime.now()}")
@@ -886,10 +4505,15 @@ def main():
         logger.info(f"  - Server execution time: {setup_stats['total_execution_time']:.2f}s")
         logger.info(f"  - Warehouse restart time: {setup_stats['total_restart_time']:.2f}s")
         logger.info(f"  - Total wall time: {setup_stats['total_wall_time']:.2f}s")
+        if setup_stats.get('table_report'):
+            logger.info(f"\n{setup_stats['table_report']}")
     
     logger.info(f"\nQUERIES PHASE:")
     logger.info(f"  - Queries: {queries_stats['successful_queries']}/{queries_stats['total_queries']} successful")
+    if queries_stats.get('timed_out_queries'):
+        logger.info(f"  - Timed out: {', '.join(map(str, queries_stats['timed_out_queries']))}")
     logger.info(f"  - Server execution time: {queries_stats['total_execution_time']:.2f}s")
+    logger.info(f"  - Geometric mean query time: {queries_stats['geomean_time']:.2f}s")
     logger.info(f"  - Warehouse restart time: {queries_stats['total_restart_time']:.2f}s")
     logger.info(f"  - Total wall time: {queries_stats['total_wall_time']:.2f}s")
     
@@ -899,6 +4523,9 @@ def main():
     logger.info(f"  - Total server execution time: {total_server_time:.2f}s")
     logger.info(f"  - Total warehouse restart time: {total_restart_time:.2f}s")
     logger.info(f"  - Total benchmark time: {overall_time:.2f}s")
+    if sql_tool == "snowsql" and snow_backend == "session":
+        snowsql_login_time, snowsql_session_count = get_snowsql_login_time()
+        logger.info(f"  - Snowflake session login time: {snowsql_login_time:.2f}s ({snowsql_session_count} sessions)")
     logger.info(f"{'='*60}")
     
     # Generate comparison table
@@ -912,18 +4539,22 @@ def main():
     
     summary_table = create_ascii_table(data, headers, "Overall Benchmark Summary")
     logger.info(f"\n{summary_table}")
+    if throughput_report:
+        logger.info(f"\n{throughput_report}")
+    if queries_stats.get('case_report'):
+        logger.info(f"\n{queries_stats['case_report']}")
     
     # Add flamegraph summary if enabled
-    if args.flamegraph and flamegraph_dir:
+    flamegraph_stats = queries_stats.get('flamegraph_stats')
+    if flamegraph_dir and flamegraph_stats:
         # Get the flamegraph HTML file path
-        flamegraph_filename = get_flamegraph_filename(flamegraph_dir, args.case)
-        flamegraph_html_path = os.path.abspath(os.path.join(flamegraph_dir, flamegraph_filename))
+        flamegraph_html_path = os.path.abspath(flamegraph_stats['index_path'])
         
         logger.info(f"\n{'='*60}")
         logger.info(f"🔥 FLAMEGRAPH SUMMARY")
         logger.info(f"{'='*60}")
         logger.info(f"  - Flamegraph directory: {flamegraph_dir}")
-        logger.info(f"  - Generated flamegraphs: {queries_stats['successful_queries']} files")
+        logger.info(f"  - Generated flamegraphs: {flamegraph_stats['generated']} files")
         logger.info(f"  - Flamegraph HTML file: {flamegraph_html_path}")
         logger.info(f"\n🌐 Open the flamegraph file in your browser:")
         logger.info(f"   file://{flamegraph_html_path}")
@@ -932,23 +4563,15 @@ def main():
     
     # Create ASCII table for query times if queries were executed
     if 'results' in queries_stats:
-        table_data = []
-        for result in queries_stats['results']:
-            if "error" not in result:
-                table_data.append([result["query_index"], f"{result['server_time']:.2f}s"])
-        
-        # Sort by query index
-        table_data.sort(key=lambda x: x[0])
-        
-        # Create ASCII table
-        query_times_table = create_ascii_table(table_data, ["Query", "Time(s)"], "Query Execution Times:")
+        query_times_table = create_query_times_table(queries_stats['results'], "Query Execution Times:")
     else:
         query_times_table = "No query results available."
     
     # Write summary to file in log directory
-    summary_file_path = os.path.join(log_dir, "benchmark_summary.txt")
+    summary_file_path = get_log_path("benchmark_summary.txt")
     with open(summary_file_path, "a") as summary_file:
         summary_file.write(f"\n{'='*60}\nBENCHMARK SUMMARY - {sql_tool.upper()} - {datetime.now()}\n{'='*60}\n")
+        summary_file.write(f"Run ID: {run['run_id']}\n")
         summary_file.write(f"Database: {database}\n")
         summary_file.write(f"Warehouse: {warehouse}\n\n")
         
@@ -959,22 +4582,577 @@ def main():
             summary_file.write(f"  - Server execution time: {setup_stats['total_execution_time']:.2f}s\n")
             summary_file.write(f"  - Warehouse restart time: {setup_stats['total_restart_time']:.2f}s\n")
             summary_file.write(f"  - Total wall time: {setup_stats['total_wall_time']:.2f}s\n\n")
+            if setup_stats.get('table_report'):
+                summary_file.write(f"{setup_stats['table_report']}\n\n")
         
         summary_file.write(f"QUERIES PHASE:\n")
         summary_file.write(f"  - Queries: {queries_stats['successful_queries']}/{queries_stats['total_queries']} successful\n")
+        if queries_stats.get('timed_out_queries'):
+            summary_file.write(f"  - Timed out: {', '.join(map(str, queries_stats['timed_out_queries']))}\n")
         summary_file.write(f"  - Server execution time: {queries_stats['total_execution_time']:.2f}s\n")
+        summary_file.write(f"  - Geometric mean query time: {queries_stats['geomean_time']:.2f}s\n")
         summary_file.write(f"  - Warehouse restart time: {queries_stats['total_restart_time']:.2f}s\n")
         summary_file.write(f"  - Total wall time: {queries_stats['total_wall_time']:.2f}s\n\n")
         
         summary_file.write(f"OVERALL:\n")
         summary_file.write(f"  - Total server execution time: {total_server_time:.2f}s\n")
         summary_file.write(f"  - Total warehouse restart time: {total_restart_time:.2f}s\n")
-        summary_file.write(f"  - Total benchmark time: {overall_time:.2f}s\n\n")
+        summary_file.write(f"  - Total benchmark time: {overall_time:.2f}s\n")
+        if sql_tool == "snowsql" and snow_backend == "session":
+            summary_file.write(f"  - Snowflake session login time: {snowsql_login_time:.2f}s ({snowsql_session_count} sessions)\n")
+        summary_file.write("\n")
         
         # Add query times table to summary
         summary_file.write(f"{query_times_table}\n\n")
+        if throughput_report:
+            summary_file.write(f"{throughput_report}\n\n")
+        if queries_stats.get('case_report'):
+            summary_file.write(f"{queries_stats['case_report']}\n\n")
         summary_file.write(f"{'='*60}\n")
 
 
+def create_comparison_report(bend_stats, snow_stats):
+    """Create the side-by-side Databend vs Snowflake query table and write log/comparison.csv."""
+    def measured_times(stats):
+        return {
+            r["query_index"]: r["server_time"] for r in stats["results"]
+            if "error" not in r and r["server_time"] is not None
+        }
+
+    bend_times = measured_times(bend_stats)
+    snow_times = measured_times(snow_stats)
+    query_indexes = sorted(set(bend_times) | set(snow_times))
+
+    table_data = []
+    ratios = []
+    wins = {"bend": 0, "snow": 0}
+    with open(get_log_path("comparison.csv"), "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Query", "Bend(s)", "Snow(s)", "Ratio(bend/snow)", "Winner"])
+        for query_index in query_indexes:
+            bend_time = bend_times.get(query_index)
+            snow_time = snow_times.get(query_index)
+            ratio = None
+            if bend_time is not None and snow_time is not None:
+                winner = "tie" if bend_time == snow_time else ("bend" if bend_time < snow_time else "snow")
+                if bend_time > 0 and snow_time > 0:
+                    ratio = bend_time / snow_time
+                    ratios.append(ratio)
+            else:
+                # Whoever finished has won when the other engine failed
+                winner = "bend" if bend_time is not None else "snow"
+            if winner in wins:
+                wins[winner] += 1
+
+            csv_writer.writerow([query_index, bend_time, snow_time, ratio, winner])
+            table_data.append([
+                query_index,
+                f"{bend_time:.2f}" if bend_time is not None else "ERROR",
+                f"{snow_time:.2f}" if snow_time is not None else "ERROR",
+                f"{ratio:.2f}" if ratio is not None else "-",
+                winner,
+            ])
+
+    table = create_ascii_table(
+        table_data, ["Query", "Bend(s)", "Snow(s)", "Ratio(bend/snow)", "Winner"],
+        "Databend vs Snowflake Query Times:",
+    )
+    both = [q for q in query_indexes if q in bend_times and q in snow_times]
+    bend_geomean = geometric_mean(bend_times[q] for q in both)
+    snow_geomean = geometric_mean(snow_times[q] for q in both)
+    return f"""{table}
+Queries won: bend {wins['bend']}, snow {wins['snow']}
+Geometric mean (queries both engines ran): bend {bend_geomean:.2f}s, snow {snow_geomean:.2f}s
+Geomean ratio (bend/snow): {geometric_mean(ratios):.2f}
+"""
+
+
+def fit_scaling_exponent(points):
+    """Least-squares fit of time = c * SF^k on log-log axes, returns k or None.
+
+    points is a list of (scale factor, seconds); at least two distinct
+    scale factors with positive times are needed.
+    """
+    points = [(math.log(sf), math.log(t)) for sf, t in points if sf > 0 and t and t > 0]
+    if len({x for x, _ in points}) < 2:
+        return None
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return covariance / variance
+
+
+def compute_scaling(sweep):
+    """Fit the scaling exponent of every query of a sweep.
+
+    sweep maps scale factors to queries stats; returns {query number:
+    {"times": {sf: seconds}, "exponent": k or None, "superlinear": bool}}.
+    """
+    scaling = {}
+    for scale_factor, stats in sweep.items():
+        for r in stats["results"]:
+            if "error" not in r and r["server_time"] is not None:
+                scaling.setdefault(r["query_index"], {"times": {}})["times"][scale_factor] = r["server_time"]
+
+    for entry in scaling.values():
+        entry["exponent"] = fit_scaling_exponent(sorted(entry["times"].items()))
+        entry["superlinear"] = entry["exponent"] is not None and entry["exponent"] > SUPERLINEAR_EXPONENT
+    return scaling
+
+
+def create_scaling_report(scaling, scale_factors):
+    """Create the per-query scaling table and write log/scale_sweep.csv."""
+    headers = ["Query"] + [f"SF{sf}(s)" for sf in scale_factors] + ["Exponent k", "Scaling"]
+    table_data = []
+    with open(get_log_path("scale_sweep.csv"), "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(headers)
+        for query_index in sorted(scaling):
+            entry = scaling[query_index]
+            exponent = entry["exponent"]
+            verdict = "-" if exponent is None else ("SUPER-LINEAR" if entry["superlinear"] else "ok")
+            csv_writer.writerow(
+                [query_index] + [entry["times"].get(sf) for sf in scale_factors] + [exponent, verdict]
+            )
+            table_data.append(
+                [query_index]
+                + [f"{entry['times'][sf]:.2f}" if sf in entry["times"] else "ERROR" for sf in scale_factors]
+                + [f"{exponent:.2f}" if exponent is not None else "-", verdict]
+            )
+
+    superlinear = [q for q in sorted(scaling) if scaling[q]["superlinear"]]
+    table = create_ascii_table(table_data, headers, "Scaling (time ∝ SF^k):")
+    return f"""{table}
+Super-linear queries (k > {SUPERLINEAR_EXPONENT}): {', '.join(map(str, superlinear)) if superlinear else 'none'}
+"""
+
+
+def write_scaling_chart(path, scaling, scale_factors, title):
+    """Write a self-contained log-log SVG chart of query time against scale factor."""
+    width, height, margin = 900, 600, 70
+    times = [t for entry in scaling.values() for t in entry["times"].values() if t > 0]
+    if not times or len(scale_factors) < 2:
+        return None
+
+    min_x, max_x = math.log10(min(scale_factors)), math.log10(max(scale_factors))
+    min_y, max_y = math.floor(math.log10(min(times))), math.ceil(math.log10(max(times)))
+    if max_y == min_y:
+        max_y += 1
+
+    def x_pos(sf):
+        return margin + (math.log10(sf) - min_x) / (max_x - min_x) * (width - 2 * margin)
+
+    def y_pos(t):
+        return height - margin - (math.log10(t) - min_y) / (max_y - min_y) * (height - 2 * margin)
+
+    elements = [
+        f'<text x="{width / 2}" y="30" text-anchor="middle" font-size="18">{title}</text>',
+        f'<line x1="{margin}" y1="{height - margin}" x2="{width - margin}" y2="{height - margin}" stroke="black"/>',
+        f'<line x1="{margin}" y1="{margin}" x2="{margin}" y2="{height - margin}" stroke="black"/>',
+        f'<text x="{width / 2}" y="{height - 20}" text-anchor="middle">Scale factor (log)</text>',
+        f'<text x="20" y="{height / 2}" text-anchor="middle" transform="rotate(-90 20 {height / 2})">Server time, s (log)</text>',
+    ]
+    for sf in scale_factors:
+        elements.append(f'<text x="{x_pos(sf):.1f}" y="{height - margin + 20}" text-anchor="middle">SF{sf}</text>')
+    for exponent in range(min_y, max_y + 1):
+        y = y_pos(10 ** exponent)
+        elements.append(f'<line x1="{margin}" y1="{y:.1f}" x2="{width - margin}" y2="{y:.1f}" stroke="#ddd"/>')
+        elements.append(f'<text x="{margin - 8}" y="{y + 4:.1f}" text-anchor="end">{10 ** exponent:g}</text>')
+
+    for query_index in sorted(scaling):
+        entry = scaling[query_index]
+        points = [(sf, t) for sf, t in sorted(entry["times"].items()) if t > 0]
+        if len(points) < 2:
+            continue
+        color = "#d62728" if entry["superlinear"] else "#1f77b4"
+        coordinates = " ".join(f"{x_pos(sf):.1f},{y_pos(t):.1f}" for sf, t in points)
+        label = f"Q{query_index} k={entry['exponent']:.2f}"
+        elements.append(f'<polyline points="{coordinates}" fill="none" stroke="{color}" stroke-opacity="0.7"><title>{label}</title></polyline>')
+        last_sf, last_t = points[-1]
+        if entry["superlinear"]:
+            elements.append(f'<text x="{x_pos(last_sf) + 4:.1f}" y="{y_pos(last_t):.1f}" font-size="11" fill="{color}">{label}</text>')
+
+    with open(path, "w") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" font-size="12">\n')
+        f.write("\n".join(elements))
+        f.write("\n</svg>\n")
+    return path
+
+
+def run_scale_sweep(args, sql_tools):
+    """Run the query file against every --scale-sweep database and fit per-query scaling.
+
+    Every database is a regular, recorded run; returns True when one of them
+    regressed against --baseline.
+    """
+    databases = [database.strip() for database in args.scale_sweep.split(",") if database.strip()]
+    scale_factors = [get_scale_factor(database) for database in databases]
+    if len(set(scale_factors)) != len(scale_factors):
+        raise ValueError(f"--scale-sweep databases need distinct trailing scale factors, got {scale_factors}")
+
+    regressed = False
+    for sql_tool in sql_tools:
+        sweep = {}
+        for database, scale_factor in sorted(zip(databases, scale_factors), key=lambda item: item[1]):
+            logger.info(f"\n{'='*60}\n📈 Scale sweep - {sql_tool} - {database} (SF{scale_factor})\n{'='*60}")
+            sweep_args = argparse.Namespace(**vars(args))
+            sweep_args.database = database
+            result_tag = f"{sql_tool}_{database}" if len(sql_tools) > 1 else database
+            run = run_engine_benchmark(sweep_args, sql_tool, result_tag=result_tag)
+            record_run(sweep_args, run)
+            if args.baseline:
+                regressed = check_regressions(sweep_args, run) or regressed
+            sweep[scale_factor] = run["queries_stats"]
+
+        scaling = compute_scaling(sweep)
+        report = create_scaling_report(scaling, sorted(sweep))
+        chart_path = write_scaling_chart(
+            get_log_path("scale_sweep.svg", sql_tool if len(sql_tools) > 1 else None),
+            scaling, sorted(sweep), f"{args.case.upper()} scaling - {sql_tool}",
+        )
+        logger.info(f"\n{report}")
+        if chart_path:
+            logger.info(f"📈 Log-log chart: {os.path.abspath(chart_path)}")
+        with open(get_log_path("benchmark_summary.txt"), "a") as summary_file:
+            summary_file.write(f"\n{'='*60}\nSCALE SWEEP - {sql_tool.upper()} - {datetime.now()}\n{'='*60}\n")
+            summary_file.write(f"Databases: {', '.join(databases)}\n\n{report}\n")
+
+    return regressed
+
+
+def create_size_sweep_report(sweep, sizes):
+    """Create the per-query and suite speedup/efficiency tables and write log/size_sweep.csv.
+
+    sweep maps sizes to queries stats. Speedup and parallel efficiency are
+    relative to the first (smallest) size; a query stops scaling at the first
+    size whose efficiency against the previous size drops below
+    SIZE_SWEEP_MIN_EFFICIENCY.
+    """
+    base_size = sizes[0]
+    nodes = {size: WAREHOUSE_SIZE_NODES[normalize_warehouse_size(size)] for size in sizes}
+    times = {
+        size: {
+            r["query_index"]: r["server_time"] for r in sweep[size]["results"]
+            if "error" not in r and r["server_time"]
+        }
+        for size in sizes
+    }
+    query_indexes = sorted(set().union(*times.values()))
+
+    def efficiency(before, after, time_before, time_after):
+        return (time_before / time_after) / (nodes[after] / nodes[before])
+
+    headers = ["Query"] + [f"{size}(s)" for size in sizes] + [f"Speedup@{sizes[-1]}", f"Efficiency@{sizes[-1]}", "Stops Scaling At"]
+    table_data = []
+    with open(get_log_path("size_sweep.csv"), "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(
+            ["Query"] + [f"{size}(s)" for size in sizes]
+            + [f"Speedup {size}" for size in sizes[1:]] + [f"Efficiency {size}" for size in sizes[1:]]
+        )
+        for query_index in query_indexes:
+            query_times = [times[size].get(query_index) for size in sizes]
+            base_time = times[base_size].get(query_index)
+            speedups = [
+                base_time / times[size][query_index] if base_time and query_index in times[size] else None
+                for size in sizes[1:]
+            ]
+            efficiencies = [
+                efficiency(base_size, size, base_time, times[size][query_index])
+                if base_time and query_index in times[size] else None
+                for size in sizes[1:]
+            ]
+            csv_writer.writerow([query_index] + query_times + speedups + efficiencies)
+
+            stops_at = "-"
+            for before, after in zip(sizes, sizes[1:]):
+                if query_index in times[before] and query_index in times[after]:
+                    if efficiency(before, after, times[before][query_index], times[after][query_index]) < SIZE_SWEEP_MIN_EFFICIENCY:
+                        stops_at = after
+                        break
+            table_data.append(
+                [query_index]
+                + [f"{t:.2f}" if t is not None else "ERROR" for t in query_times]
+                + [f"{speedups[-1]:.2f}x" if speedups and speedups[-1] is not None else "-",
+                   f"{efficiencies[-1]:.0%}" if efficiencies and efficiencies[-1] is not None else "-",
+                   stops_at]
+            )
+
+    # The suite only counts queries every size measured
+    common = [q for q in query_indexes if all(q in times[size] for size in sizes)]
+    suite_times = {size: sum(times[size][q] for q in common) for size in sizes}
+    suite_data = []
+    sweet_spot = base_size
+    for size in sizes:
+        suite_efficiency = efficiency(base_size, size, suite_times[base_size], suite_times[size]) if suite_times[size] else None
+        # Credits are proportional to nodes x time
+        relative_cost = 1 / suite_efficiency if suite_efficiency else None
+        if suite_efficiency is not None and suite_efficiency >= SIZE_SWEEP_MIN_EFFICIENCY:
+            sweet_spot = size
+        suite_data.append([
+            size,
+            nodes[size],
+            f"{suite_times[size]:.2f}",
+            f"{suite_times[base_size] / suite_times[size]:.2f}x" if suite_times[size] else "-",
+            f"{suite_efficiency:.0%}" if suite_efficiency is not None else "-",
+            f"{relative_cost:.2f}" if relative_cost is not None else "-",
+        ])
+
+    query_table = create_ascii_table(table_data, headers, "Per-query Size Scaling:")
+    suite_table = create_ascii_table(
+        suite_data, ["Size", "Nodes", "Suite(s)", "Speedup", "Efficiency", "Relative Cost"],
+        f"Suite Size Scaling ({len(common)} queries measured at every size):",
+    )
+    return f"""{query_table}
+
+{suite_table}
+Price-performance sweet spot: {sweet_spot} (largest size with suite efficiency >= {SIZE_SWEEP_MIN_EFFICIENCY:.0%})
+"""
+
+
+def run_size_sweep(args, sql_tools):
+    """Resize the warehouse to every --size-sweep size and rerun the suite at each.
+
+    Every size is a regular, recorded run; returns True when one of them
+    regressed against --baseline.
+    """
+    sizes = list(dict.fromkeys(size.strip() for size in args.size_sweep.split(",") if size.strip()))
+    if not sizes:
+        raise ValueError("--size-sweep needs at least one warehouse size")
+    unknown = [size for size in sizes if normalize_warehouse_size(size) not in WAREHOUSE_SIZE_NODES]
+    if unknown:
+        raise ValueError(f"Unknown warehouse sizes in --size-sweep: {', '.join(unknown)}")
+    sizes.sort(key=lambda size: WAREHOUSE_SIZE_NODES[normalize_warehouse_size(size)])
+
+    # Refuse before resizing anything a warehouse that could not be restored
+    original_sizes = {}
+    for sql_tool in sql_tools:
+        _, warehouse = get_engine_config(sql_tool, args)
+        original_sizes[sql_tool] = args.restore_size or get_warehouse_size(sql_tool, warehouse, args.database)
+        if not original_sizes[sql_tool]:
+            raise ValueError(f"Current size of {sql_tool} warehouse {warehouse} is unknown, pass --restore-size to --size-sweep")
+
+    regressed = False
+    for sql_tool in sql_tools:
+        _, warehouse = get_engine_config(sql_tool, args)
+        original_size = original_sizes[sql_tool]
+
+        sweep = {}
+        try:
+            for size in sizes:
+                logger.info(f"\n{'='*60}\n📐 Size sweep - {sql_tool} - {warehouse} at {size}\n{'='*60}")
+                resize_warehouse(sql_tool, warehouse, args.database, size)
+                sweep_args = argparse.Namespace(**vars(args))
+                sweep_args.warehouse_size = size
+                result_tag = f"{sql_tool}_{size}" if len(sql_tools) > 1 else size
+                run = run_engine_benchmark(sweep_args, sql_tool, result_tag=result_tag)
+                record_run(sweep_args, run)
+                if args.baseline:
+                    regressed = check_regressions(sweep_args, run) or regressed
+                sweep[size] = run["queries_stats"]
+        finally:
+            # Only restore the size, the next user resumes the warehouse when needed
+            try:
+                resize_warehouse(sql_tool, warehouse, args.database, original_size, wait=False)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not restore {warehouse} to {original_size}: {e}")
+
+        report = create_size_sweep_report(sweep, [size for size in sizes if size in sweep])
+        logger.info(f"\n{report}")
+        with open(get_log_path("benchmark_summary.txt"), "a") as summary_file:
+            summary_file.write(f"\n{'='*60}\nSIZE SWEEP - {sql_tool.upper()} - {warehouse} - {datetime.now()}\n{'='*60}\n")
+            summary_file.write(f"Database: {args.database}\n\n{report}\n")
+
+    return regressed
+
+
+def record_run(args, run):
+    """Write the summary of a finished run and append it to the run history."""
+    write_benchmark_summary(args, run)
+    try:
+        check_plan_changes(args, run)
+    except Exception as e:
+        logger.error(f"❌ Failed to compare query plans: {e}")
+    try:
+        metadata = collect_environment_metadata(run["sql_tool"], args.database, run["warehouse"])
+        record_run_history(args.history_db, args, run, metadata)
+    except Exception as e:
+        logger.error(f"❌ Failed to record run history: {e}")
+
+
+def main():
+    global bend_backend, snow_backend, query_timeout, query_timeout_overrides, metrics_exporter
+
+    args = parse_arguments()
+
+    # Setup logging - create log directory if it doesn't exist
+    log_dir = "log"
+    os.makedirs(log_dir, exist_ok=True)
+    log_filename = os.path.join(log_dir, f"benchsb_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    # Engines (--runboth) and warehouse shards (--warehouses) log concurrently, tag lines with their thread
+    log_format = '%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s' if args.runboth or args.warehouses else '%(asctime)s - %(levelname)s - %(message)s'
+    logging.basicConfig(
+        level=logging.INFO,
+        format=log_format,
+        handlers=[
+            logging.FileHandler(log_filename),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    run_state = None
+    if args.resume:
+        try:
+            run_state = load_run_state(args.resume)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Cannot resume run: {e}")
+            sys.exit(1)
+        # Finish the run with the settings it was started with
+        for name, value in run_state["settings"].items():
+            setattr(args, name, value)
+        args.runbend = run_state["sql_tool"] == "bendsql"
+        args.runsnow = run_state["sql_tool"] == "snowsql"
+        args.runboth = False
+
+    bend_backend = args.backend
+    snow_backend = args.snow_backend
+    query_timeout = args.query_timeout or None
+    query_timeout_overrides = dict(args.query_timeout_override)
+
+    if not (args.database or args.scale_sweep or args.generate):
+        logger.error("Please specify --database, --scale-sweep or --generate.")
+        sys.exit(1)
+
+    if args.generate:
+        sql_tool = "bendsql" if args.runbend else "snowsql" if args.runsnow else None
+        try:
+            run_data_generation(args, sql_tool)
+        except (ValueError, RuntimeError) as e:
+            logger.error(f"❌ {e}")
+            sys.exit(1)
+        return
+
+    if args.history is not None:
+        engine = "bendsql" if args.runbend else "snowsql" if args.runsnow else None
+        print_query_history(args.history_db, args.case, args.database, args.history, engine)
+        return
+
+    if args.runboth and args.warehouses:
+        logger.error("--warehouses takes bendsql DSNs or snowsql warehouse names, use it with --runbend or --runsnow.")
+        sys.exit(1)
+
+    if args.case in ('fetch', 'ingest') and (args.streams > 0 or args.warehouses):
+        logger.error(f"--case {args.case} is not a query suite, it cannot be combined with --streams or --warehouses.")
+        sys.exit(1)
+
+    if args.case == 'tpch' and args.streams >= len(TPCH_STREAM_PERMUTATIONS):
+        logger.error(f"--streams {args.streams}: TPC-H Appendix A permutations are only shipped for up to {len(TPCH_STREAM_PERMUTATIONS) - 1} throughput streams.")
+        sys.exit(1)
+
+    if args.qgen and args.case != 'tpch':
+        logger.error("--qgen substitutes TPC-H query parameters, it only applies to --case tpch.")
+        sys.exit(1)
+
+    try:
+        if any(int(n) < 1 for n in args.ingest_file_counts.split(",") if n.strip()):
+            raise ValueError
+    except ValueError:
+        logger.error(f"--ingest-file-counts takes comma-separated positive integers, got '{args.ingest_file_counts}'.")
+        sys.exit(1)
+
+    if args.runboth:
+        sql_tools = ["bendsql", "snowsql"]
+    elif args.runbend:
+        sql_tools = ["bendsql"]
+    elif args.runsnow:
+        sql_tools = ["snowsql"]
+    else:
+        logger.error("Please specify --runbend, --runsnow or --runboth.")
+        sys.exit(1)
+
+    if args.scale_sweep and args.size_sweep:
+        logger.error("--scale-sweep and --size-sweep cannot be combined.")
+        sys.exit(1)
+
+    if args.restore_size and not args.size_sweep:
+        logger.error("--restore-size only applies to --size-sweep.")
+        sys.exit(1)
+
+    if args.metrics_port is not None or args.metrics_file:
+        try:
+            metrics_exporter = MetricsExporter(args.metrics_port, args.metrics_file)
+        except OSError as e:
+            logger.error(f"❌ Cannot start the metrics exporter: {e}")
+            sys.exit(1)
+
+    if args.scale_sweep or args.size_sweep:
+        try:
+            if args.scale_sweep:
+                regressed = run_scale_sweep(args, sql_tools)
+            else:
+                regressed = run_size_sweep(args, sql_tools)
+        except (ValueError, RuntimeError) as e:
+            logger.error(f"❌ {e}")
+            sys.exit(1)
+        finally:
+            close_driver_connections()
+            close_snowsql_sessions()
+        if regressed and args.fail_on_regression:
+            logger.error("❌ Performance regression detected against the baseline")
+            sys.exit(1)
+        return
+
+    engine_errors = {}
+    if len(sql_tools) == 1:
+        runs = [run_engine_benchmark(args, sql_tools[0], run_state=run_state)]
+    else:
+        # Run each engine in its own worker so both see the same time-of-day conditions
+        engine_runs = {}
+
+        def run_engine(sql_tool):
+            try:
+                engine_runs[sql_tool] = run_engine_benchmark(args, sql_tool, result_tag=sql_tool)
+            except Exception as e:
+                logger.error(f"Benchmark with {sql_tool} failed: {e}")
+                engine_errors[sql_tool] = e
+
+        workers = [threading.Thread(target=run_engine, args=(sql_tool,), name=sql_tool) for sql_tool in sql_tools]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        # Keep the history of an engine that finished even when the other failed
+        runs = [engine_runs[sql_tool] for sql_tool in sql_tools if sql_tool in engine_runs]
+
+    for run in runs:
+        record_run(args, run)
+
+    regressed = False
+    if args.baseline:
+        for run in runs:
+            regressed = check_regressions(args, run) or regressed
+
+    if len(runs) == 2:
+        comparison_report = create_comparison_report(runs[0]["queries_stats"], runs[1]["queries_stats"])
+        logger.info(f"\n{comparison_report}")
+        with open(get_log_path("benchmark_summary.txt"), "a") as summary_file:
+            summary_file.write(f"\n{'='*60}\nCOMPARISON - BENDSQL vs SNOWSQL - {datetime.now()}\n{'='*60}\n")
+            summary_file.write(f"Database: {args.database}\n\n")
+            summary_file.write(f"{comparison_report}\n")
+            summary_file.write(f"{'='*60}\n")
+
+    close_driver_connections()
+    close_snowsql_sessions()
+
+    if engine_errors:
+        logger.error(f"❌ Benchmark failed for {', '.join(engine_errors)}, no comparison written")
+        sys.exit(1)
+    if regressed and args.fail_on_regression:
+        logger.error("❌ Performance regression detected against the baseline")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,26 @@
+-- Fetch 1: 1M rows, narrow (1 column)
+select l_orderkey from lineitem limit 1000000;
+
+-- Fetch 2: 1M rows, medium (7 numeric/date columns)
+select l_orderkey, l_partkey, l_suppkey, l_quantity, l_extendedprice, l_discount, l_shipdate from lineitem limit 1000000;
+
+-- Fetch 3: 1M rows, wide (all 16 columns)
+select * from lineitem limit 1000000;
+
+-- Fetch 4: 10M rows, narrow (1 column)
+select l_orderkey from lineitem limit 10000000;
+
+-- Fetch 5: 10M rows, medium (7 numeric/date columns)
+select l_orderkey, l_partkey, l_suppkey, l_quantity, l_extendedprice, l_discount, l_shipdate from lineitem limit 10000000;
+
+-- Fetch 6: 10M rows, wide (all 16 columns)
+select * from lineitem limit 10000000;
+
+-- Fetch 7: 100M rows, narrow (1 column)
+select l_orderkey from lineitem limit 100000000;
+
+-- Fetch 8: 100M rows, medium (7 numeric/date columns)
+select l_orderkey, l_partkey, l_suppkey, l_quantity, l_extendedprice, l_discount, l_shipdate from lineitem limit 100000000;
+
+-- Fetch 9: 100M rows, wide (all 16 columns)
+select * from lineitem limit 100000000;
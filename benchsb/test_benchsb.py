@@ -0,0 +1,307 @@
+import argparse
+import math
+import os
+import random
+import re
+
+import pytest
+
+import benchsb
+
+
+def make_args(history_db, **overrides):
+    args = argparse.Namespace(
+        case="tpch", database="tpch_100", warmup=0, iterations=3, suspend=False,
+        history_db=history_db, baseline="latest", min_effect=0.05,
+    )
+    vars(args).update(overrides)
+    return args
+
+
+def make_run(run_id, started_at, samples):
+    return {
+        "run_id": run_id,
+        "started_at": started_at,
+        "sql_tool": "snowsql",
+        "warehouse": "wh",
+        "setup_stats": {},
+        "queries_stats": {
+            "results": [{"query_index": 1, "server_time": samples[1], "samples": samples}],
+            "plans": {},
+        },
+    }
+
+
+METADATA = {"server_version": None, "client_version": None, "settings": {}}
+
+
+def test_size_sweep_does_not_gate_against_itself(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "log").mkdir()
+    history_db = str(tmp_path / "history.db")
+
+    # An earlier sweep, smallest size first
+    for run_id, started_at, size, samples in (
+        ("sweep1_xsmall", "2026-01-01T00:00:00", "X-Small", [8.0, 8.1, 8.2]),
+        ("sweep1_large", "2026-01-01T01:00:00", "Large", [1.0, 1.1, 1.2]),
+    ):
+        args = make_args(history_db, warehouse_size=size)
+        benchsb.record_run_history(history_db, args, make_run(run_id, started_at, samples), METADATA)
+
+    # The first step of the next sweep is 8x slower than the previous run (the
+    # earlier Large) but no slower than the earlier XSmall
+    args = make_args(history_db, warehouse_size="XSMALL")
+    run = make_run("sweep2_xsmall", "2026-01-02T00:00:00", [8.0, 8.1, 8.2])
+    benchsb.record_run_history(history_db, args, run, METADATA)
+
+    assert benchsb.resolve_baseline_run(history_db, "latest", "tpch", "tpch_100", "snowsql", "sweep2_xsmall", "XSMALL") == "sweep1_xsmall"
+    assert not benchsb.check_regressions(args, run)
+    assert benchsb.load_expected_durations(history_db, "tpch", "tpch_100", "snowsql", "LARGE") == {1: 1.1}
+
+    # A plain run never uses a sweep step as its baseline
+    assert benchsb.resolve_baseline_run(history_db, "latest", "tpch", "tpch_100", "snowsql", "plain", None) is None
+
+
+def test_single_samples_give_no_verdict():
+    # One sample per side: a 20% slowdown of pure noise must not gate
+    comparison = benchsb.compare_with_baseline({1: [1.2], 2: [2.4, 2.5, 2.6]}, {1: [1.0], 2: [2.0, 2.1, 2.0]}, 0.05)
+
+    verdicts = {q["query_index"]: q["verdict"] for q in comparison["queries"]}
+    assert verdicts == {1: "INSUFFICIENT SAMPLES", 2: "REGRESSION"}
+    assert [q["query_index"] for q in comparison["insufficient"]] == [1]
+    assert comparison["suite_ratio"] == 2.5 / 2.0
+
+    comparison = benchsb.compare_with_baseline({1: [1.2]}, {1: [1.0]}, 0.05)
+    assert not comparison["regressions"] and not comparison["suite_regressed"]
+    assert "Suite geomean ratio: insufficient samples" in benchsb.create_regression_report(comparison, "a", "b", 0.05)
+
+
+def test_plan_fingerprint_keeps_alias_order():
+    plan = """HashJoin
+├── join type: INNER
+├── build keys: [{build}.n_nationkey (#{build_id})]
+├── probe keys: [{probe}.n_nationkey (#{probe_id})]
+├── estimated rows: {rows}
+├── TableScan(Build)
+│   ├── table: default.tpch_100.nation
+│   └── filters: [{build}.n_name = 'FRANCE']
+└── TableScan(Probe)
+    └── table: default.tpch_100.nation"""
+    before = plan.format(build="n1", probe="n2", build_id=3, probe_id=7, rows=25)
+    swapped = plan.format(build="n2", probe="n1", build_id=3, probe_id=7, rows=25)
+    reestimated = plan.format(build="n1", probe="n2", build_id=4, probe_id=9, rows=1024.5)
+
+    assert benchsb.get_plan_fingerprint(before) != benchsb.get_plan_fingerprint(swapped)
+    assert benchsb.get_plan_fingerprint(before) == benchsb.get_plan_fingerprint(reestimated)
+
+
+def test_sharded_run_records_failed_queries():
+    measured, failed = [], []
+
+    def measure(index, query, warehouse):
+        if index == 1:
+            raise RuntimeError("probe failed")
+        measured.append(index)
+
+    pending = [(index, f"select {index}") for index in range(5)]
+    benchsb.execute_sharded(pending, [("wh1", None), ("wh2", None)], {}, measure, lambda index, warehouse, e: failed.append(index))
+
+    assert sorted(measured) == [0, 2, 3, 4]
+    assert failed == [1]
+
+
+def test_snowsql_timing_parses_plain_output():
+    # snowsql -o friendly=false -o progress_bar=false -o timing=true
+    output = """+----------+
+| COUNT(*) |
+|----------|
+|   600572 |
++----------+
+1 Row(s) produced. Time Elapsed: 0.412s
+"""
+    assert benchsb.extract_snowsql_time(output) == "0.412"
+    assert benchsb.extract_snowsql_rows(output) == 1
+    assert benchsb.extract_snowsql_time("Goodbye!\n") is None
+
+
+def test_stream_permutations_past_appendix_a_are_refused():
+    assert benchsb.get_stream_permutation("tpch", 10, 22)[:3] == [6, 15, 18]
+    with pytest.raises(ValueError):
+        benchsb.get_stream_permutation("tpch", 11, 22)
+    # TPC-DS has no shipped table, its seeded order is reproducible
+    assert benchsb.get_stream_permutation("tpcds", 11, 99) == benchsb.get_stream_permutation("tpcds", 11, 99)
+
+
+def test_flamegraph_payload_goes_to_the_current_run(tmp_path):
+    current = "tpch_20260101_000000_flame.html"
+    (tmp_path / current).write_text("")
+    # A concurrent run created its index after this one
+    (tmp_path / "tpch_20260101_000001_flame.html").write_text("")
+
+    benchsb.update_flamegraph_index_incremental(str(tmp_path), current, 3, "SELECT 1", "<svg/>", 0.5)
+
+    assert (tmp_path / "tpch_20260101_000000_flame" / "query_03.js").exists()
+    assert "query_03.js" in (tmp_path / "tpch_20260101_000000_flame" / "manifest.js").read_text()
+    assert not (tmp_path / "tpch_20260101_000001_flame").exists()
+
+
+def test_databend_size_sweep_needs_and_restores_a_size(monkeypatch):
+    monkeypatch.setenv("BENDSQL_DSN", "databend://u:p@h:443/?warehouse=wh1")
+    resizes = []
+    monkeypatch.setattr(benchsb, "resize_warehouse", lambda sql_tool, warehouse, database, size, wait=True: resizes.append(size))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("query suite failed")
+
+    monkeypatch.setattr(benchsb, "run_engine_benchmark", fail)
+
+    args = make_args(None, size_sweep="XSmall,Large", restore_size=None)
+    with pytest.raises(ValueError):
+        benchsb.run_size_sweep(args, ["bendsql"])
+    assert resizes == []
+
+    args = make_args(None, size_sweep="XSmall,Large", restore_size="SMALL")
+    with pytest.raises(RuntimeError):
+        benchsb.run_size_sweep(args, ["bendsql"])
+    assert resizes == ["XSmall", "SMALL"]
+
+
+def load_templates(engine):
+    return benchsb.load_queries(os.path.join(os.path.dirname(__file__), "sql", engine, "queries_template.sql"))
+
+
+@pytest.mark.parametrize("engine", ["bend", "snow"])
+def test_qgen_fills_every_placeholder_reproducibly(engine):
+    templates = load_templates(engine)
+    assert len(templates) == 22
+
+    def render_all(seed):
+        qgen = {"seed": seed, "scale_factor": 100}
+        return [benchsb.render_query(template, number, qgen, stream_id=1) for number, template in enumerate(templates, 1)]
+
+    first = render_all(42)
+    assert first == render_all(42)
+    assert first != render_all(43)
+    for number, (query, parameters) in enumerate(first, 1):
+        assert not re.search(r"(?<![:\w]):\d+", query), f"Q{number} keeps a placeholder"
+        assert parameters == {f":{position}": value for position, value in enumerate(benchsb.generate_tpch_parameters(number, random.Random(f"qgen-42-1-{number}-0"), 100), 1)}
+
+    # Q22 country codes are two-digit strings, quoted in both IN lists
+    query, parameters = first[21]
+    codes = list(parameters.values())
+    assert len(set(codes)) == 7 and all(re.fullmatch(r"[1-3]\d", code) for code in codes)
+    for code in codes:
+        assert query.count(f"'{code}'") == 2
+
+
+def test_stream_permutations_follow_appendix_a():
+    assert benchsb.get_stream_permutation("tpch", 0, 22) == [14, 2, 9, 20, 6, 17, 18, 8, 21, 13, 3, 22, 16, 4, 11, 15, 1, 10, 19, 5, 7, 12]
+    assert benchsb.get_stream_permutation("tpch", 1, 22) == [21, 3, 18, 5, 11, 7, 6, 20, 17, 12, 16, 15, 13, 10, 2, 8, 14, 19, 9, 22, 1, 4]
+    orders = [benchsb.get_stream_permutation("tpch", stream_id, 22) for stream_id in range(11)]
+    assert all(sorted(order) == list(range(1, 23)) for order in orders)
+    assert len({tuple(order) for order in orders}) == 11
+    # A custom TPC-H file is not the spec suite, it gets a seeded order
+    assert sorted(benchsb.get_stream_permutation("tpch", 12, 3)) == [1, 2, 3]
+
+
+def test_tpch_metrics():
+    power_stats = {"results": [{"query_index": q, "server_time": 2.0} for q in range(1, 23)]}
+    throughput_stats = {"streams": 2, "query_count": 22, "throughput_time": 3600.0}
+
+    metrics = benchsb.compute_tpc_metrics("tpch", 100, power_stats, throughput_stats)
+
+    components = {name: (value, note) for name, value, note in metrics["components"]}
+    assert metrics["metric_name"] == "QphH@100GB"
+    assert components["Power@Size"][0] == "180000.0"
+    assert components["Throughput@Size"][0] == "4400.0"
+    assert metrics["composite"] == pytest.approx(math.sqrt(180000 * 4400))
+    assert all(note.startswith(benchsb.NON_COMPLIANT_METRIC) for _, note in components.values())
+    assert "seeded" not in metrics["composite_note"]
+
+
+def test_tpcds_metrics():
+    power_stats = {"total_wall_time": 3700.0, "total_restart_time": 100.0}
+    throughput_stats = {"streams": 4, "query_count": 99, "throughput_time": 7200.0}
+
+    metrics = benchsb.compute_tpc_metrics("tpcds", 1000, power_stats, throughput_stats, load_time=36000.0)
+
+    assert [row[:2] for row in metrics["components"]] == [["T_PT (h)", "4.0000"], ["T_TT (h)", "2.0000"], ["T_LD (h)", "0.4000"]]
+    assert metrics["composite"] == pytest.approx(1000 * 4 * 99 / (4 * 2 * 0.4) ** (1 / 3))
+    assert metrics["components"][2][2] == ""
+    assert metrics["composite_note"] == f"{benchsb.NON_COMPLIANT_METRIC}: no T_DM, seeded stream order"
+
+    report = benchsb.create_throughput_report({**throughput_stats, "stream_stats": []}, metrics)
+    assert re.search(r"QphDS@1000 .*non-compliant/indicative", report)
+
+
+def test_regression_gate_verdicts():
+    baseline = [1.0, 1.01, 0.99, 1.0, 1.02]
+    comparison = benchsb.compare_with_baseline(
+        {
+            1: [1.5, 1.52, 1.49, 1.51, 1.5],  # clearly slower
+            2: [0.5, 0.51, 0.49, 0.5, 0.52],  # clearly faster
+            3: [0.8, 1.3, 0.9, 1.2, 1.0],  # noise around the baseline
+            4: [1.03, 1.03, 1.035, 1.03, 1.04],  # significant but below min_effect
+        },
+        {1: baseline, 2: baseline, 3: baseline, 4: baseline},
+        0.05,
+    )
+
+    verdicts = {q["query_index"]: q["verdict"] for q in comparison["queries"]}
+    assert verdicts == {1: "REGRESSION", 2: "IMPROVEMENT", 3: "-", 4: "-"}
+    assert comparison["queries"][3]["ci_low"] > 1
+    assert [q["query_index"] for q in comparison["regressions"]] == [1]
+    assert [q["query_index"] for q in comparison["improvements"]] == [2]
+    assert not comparison["suite_regressed"]
+
+    comparison = benchsb.compare_with_baseline({1: [1.5, 1.52, 1.49], 2: [2.0, 2.1, 1.9]}, {1: baseline, 2: baseline}, 0.05)
+    assert comparison["suite_regressed"] and comparison["suite_ci_low"] > 1
+
+
+def test_normalize_plan_keeps_shape_only():
+    snowsql_plan = """+-------------------------------------------------------------+
+| content                                                     |
+|-------------------------------------------------------------|
+| GlobalStats:                                                |
+|     partitionsTotal=120                                     |
+| 1:0     ->Filter  LINEITEM.L_SHIPDATE <= '1998-09-02'       |
+|            ->TableScan  TPCH_100.LINEITEM  {partitions=120} |
++-------------------------------------------------------------+
+1 Row(s) produced. Time Elapsed: 0.101s
+"""
+    # Borders, the row count footer, literals and standalone numbers go;
+    # digits inside identifiers and the indentation stay
+    assert benchsb.normalize_plan(snowsql_plan) == "\n".join([
+        " content",
+        " GlobalStats:",
+        "     partitionsTotal=?",
+        " ?:? ->Filter LINEITEM.L_SHIPDATE <= '?'",
+        "            ->TableScan TPCH_100.LINEITEM {partitions=?}",
+    ])
+    assert benchsb.normalize_plan("Filter\n└── filters: [n1.n_name = 'it''s', l2.x > 0.05]") == "Filter\n└── filters: [n1.n_name = '?', l2.x > ?]"
+
+
+def test_argument_validators():
+    assert benchsb.parse_query_timeout_override(" 72 = 3600 ") == (72, 3600.0)
+    assert benchsb.parse_query_timeout_override("5=0") == (5, None)
+    assert benchsb.parse_positive_int("1") == 1
+    assert benchsb.parse_non_negative_int("0") == 0
+    assert benchsb.parse_scale_factor("100") == 100 and isinstance(benchsb.parse_scale_factor("100"), int)
+    assert benchsb.parse_scale_factor("0.1") == 0.1
+    assert benchsb.parse_warehouse_size("x-small") == "XSMALL"
+    assert benchsb.parse_warehouse_size("XXLarge") == "2XLARGE"
+    assert benchsb.parse_ingest_formats("CSV, csv:gzip,parquet,csv:none") == [("csv", "none"), ("csv", "gzip"), ("parquet", "snappy")]
+
+    for parse, value in (
+        (benchsb.parse_query_timeout_override, "72"),
+        (benchsb.parse_query_timeout_override, "q1=10"),
+        (benchsb.parse_positive_int, "0"),
+        (benchsb.parse_non_negative_int, "-1"),
+        (benchsb.parse_scale_factor, "0"),
+        (benchsb.parse_warehouse_size, "huge"),
+        (benchsb.parse_ingest_formats, "xml"),
+        (benchsb.parse_ingest_formats, "csv:lz4"),
+        (benchsb.parse_ingest_formats, ","),
+    ):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse(value)